@@ -0,0 +1,300 @@
+"""
+Log analysis engine for WolfsLogDebugger
+Classifies lines as errors and warnings, tracks build stages and critical lines, and can
+be fed incrementally so a growing log only pays for the lines that are new
+"""
+
+import re
+import itertools
+from typing import Any, Dict, Iterable, List, Optional
+
+from formats import ERROR, WARNING, LogFormat, detect_format, get_format, take_sample
+from logdiff import normalize
+from rules import get_rule_engine
+from timeline import Timeline, TimestampParser
+from traces import TraceDetector, find_block
+
+# Precompile regex patterns for performance
+EXCEPTION_NAME_PATTERN = re.compile(r'([a-zA-Z0-9_$.]+Exception|Error)')
+
+MAX_CRITICAL_LINES = 15
+# Warnings only become critical lines while there are fewer critical lines than this
+MAX_CRITICAL_BEFORE_WARNINGS = 10
+CONTEXT_LINES = 2
+# A stack trace starting this many lines after a critical line is still the one it reports
+TRACE_LOOKAHEAD = 2
+# Distinct error signatures tracked per log; once there are this many, only known ones are counted
+MAX_ERROR_SIGNATURES = 1000
+
+
+def classify_error_type(line: str) -> str:
+    """
+    Best-effort exception name or first word of an error line; the number of distinct
+    names decides the Critical/Error split of error_counts(). The error type shown to
+    users comes from the rules in rules.py instead.
+    """
+    # Java exception pattern
+    java_exception_match = EXCEPTION_NAME_PATTERN.search(line)
+    if java_exception_match:
+        return java_exception_match.group(1)
+    # Python exception pattern
+    if 'Traceback' in line:
+        return "Python Exception"
+    # Generic error pattern
+    if 'ERROR:' in line:
+        error_parts = line.split('ERROR:', 1)[1].strip().split()
+        if error_parts:
+            return error_parts[0]
+    # Shell/bash error
+    elif 'Command failed' in line or 'exit code' in line:
+        return "Shell Error"
+    return "Unknown Error"
+
+
+class LogAnalyzer:
+    """
+    Incremental analysis of one log.
+
+    feed() consumes lines appended after the ones already seen and returns just what
+    they changed; result() summarizes everything seen so far. Analyzing a complete
+    log is a single feed() followed by result().
+
+    Lines are parsed by the log's format (see formats.py): log_format names it, or it is
+    detected from the start of the first lines fed.
+    """
+
+    def __init__(self, file_id: str, lines: Optional[List[str]] = None, log_format: Optional[str] = None):
+        self.file_id = file_id
+        self.log_format: Optional[LogFormat] = get_format(log_format)() if log_format else None
+        # Shared with LOG_CACHE, so previews see new lines as soon as they're fed
+        self.lines = lines if lines is not None else []
+        self.error_lines: List[int] = []
+        self.warning_lines: List[int] = []
+        self.build_stages: Dict[str, Dict[str, int]] = {}
+        self.error_types: Dict[str, int] = {}
+        # Rule-based type (see rules.py) of every error line, and how often each occurs
+        self.error_line_types: Dict[int, str] = {}
+        self.error_type_counts: Dict[str, int] = {}
+        # Error lines grouped by normalized text, as logdiff.error_signatures() groups them
+        self.error_signatures: Dict[str, Dict[str, Any]] = {}
+        self.start_time: Optional[str] = None
+        self.end_time: Optional[str] = None
+        # Lines, errors and warnings over time, and the first and last time of each stage.
+        # Lines count towards the latest timestamp seen, from the line it changed on.
+        self.timeline = Timeline()
+        self.stage_times: Dict[str, List[int]] = {}
+        self._parse_timestamp = TimestampParser()
+        self._timestamp: Optional[str] = None
+        self._seconds: Optional[int] = None
+        self._seconds_line = 0
+        # Exception blocks (see traces.py) in order, and their start lines for lookups
+        self.stack_traces: List[Dict[str, Any]] = []
+        self._trace_starts: List[int] = []
+        self._trace_detector = TraceDetector()
+        self._critical_errors: List[Dict[str, Any]] = []
+        self._critical_warnings: List[Dict[str, Any]] = []
+        self._critical_count = 0
+
+    def feed(self, new_lines: Iterable[str], final: bool = False) -> Dict[str, Any]:
+        """
+        Analyze lines appended to the log; final marks the end of the log, closing a
+        stack trace that runs up to the last line
+
+        Returns:
+            Delta with the range of new lines, their error and warning line numbers,
+            new critical lines, the stack traces they completed, and the build stages
+            they touched
+        """
+        if self.log_format is None:
+            new_lines = iter(new_lines)
+            sample = take_sample(new_lines)
+            if sample:
+                self.log_format = detect_format(sample)()
+                new_lines = itertools.chain(sample, new_lines)
+        parse = self.log_format.parse if self.log_format is not None else None
+
+        first_line = len(self.lines)
+        error_lines = []
+        warning_lines = []
+        critical_lines = []
+        touched_stages = set()
+        stack_traces = []
+        classify_rule = get_rule_engine().classify
+        detect_trace = self._trace_detector.feed
+        timeline = self.timeline
+
+        for line in new_lines:
+            i = len(self.lines)
+            self.lines.append(line)
+
+            # Extend or close the open stack trace
+            block = detect_trace(i, line)
+            if block is not None:
+                stack_traces.append(block)
+
+            # Build stage, level and timestamp as the log's format has them
+            stage, level, timestamp = parse(line)
+            if timestamp:
+                if self.start_time is None:
+                    self.start_time = timestamp
+                self.end_time = timestamp
+                if timestamp != self._timestamp:
+                    self._timestamp = timestamp
+                    seconds = self._parse_timestamp(timestamp)
+                    if seconds is not None and seconds != self._seconds:
+                        if self._seconds is not None:
+                            timeline.add(self._seconds, lines=i - self._seconds_line)
+                        self._seconds, self._seconds_line = seconds, i
+
+            # Check for build stage
+            if stage is not None:
+                touched_stages.add(stage)
+                if stage not in self.build_stages:
+                    self.build_stages[stage] = {"start": i, "end": i, "errors": 0, "warnings": 0}
+                else:
+                    self.build_stages[stage]["end"] = i
+                if self._seconds is not None:
+                    times = self.stage_times.get(stage)
+                    if times is None:
+                        self.stage_times[stage] = [self._seconds, self._seconds]
+                    else:
+                        times[1] = self._seconds
+
+            # Check for errors
+            if level == ERROR:
+                error_lines.append(i)
+
+                # Update stage error count if we're in a stage
+                if stage is not None:
+                    self.build_stages[stage]["errors"] += 1
+                if self._seconds is not None:
+                    timeline.add(self._seconds, errors=1)
+
+                # Count error types for chart
+                error_type = classify_error_type(line)
+                self.error_types[error_type] = self.error_types.get(error_type, 0) + 1
+
+                rule_type = classify_rule(line) or "Unknown"
+                self.error_line_types[i] = rule_type
+                self.error_type_counts[rule_type] = self.error_type_counts.get(rule_type, 0) + 1
+
+                signature = normalize(line.strip())
+                entry = self.error_signatures.get(signature)
+                if entry is not None:
+                    entry["count"] += 1
+                elif len(self.error_signatures) < MAX_ERROR_SIGNATURES:
+                    self.error_signatures[signature] = {"signature": signature, "count": 1, "first_line": i,
+                                                        "example": line, "error_type": rule_type}
+
+                # Add to critical lines; errors always rank ahead of warnings
+                critical = {"line": i, "content": line, "timestamp": timestamp, "type": "error",
+                            "error_type": rule_type}
+                self._critical_count += 1
+                if len(self._critical_errors) < MAX_CRITICAL_LINES:
+                    self._critical_errors.append(critical)
+                    critical_lines.append(critical)
+
+            elif level == WARNING:
+                warning_lines.append(i)
+
+                # Update stage warning count if we're in a stage
+                if stage is not None:
+                    self.build_stages[stage]["warnings"] += 1
+                if self._seconds is not None:
+                    timeline.add(self._seconds, warnings=1)
+
+                # Only include warnings in critical lines if we don't have too many errors
+                if self._critical_count < MAX_CRITICAL_BEFORE_WARNINGS:
+                    critical = {"line": i, "content": line, "timestamp": timestamp, "type": "warning"}
+                    self._critical_count += 1
+                    self._critical_warnings.append(critical)
+                    critical_lines.append(critical)
+
+        if final:
+            block = self._trace_detector.close()
+            if block is not None:
+                stack_traces.append(block)
+        if self._seconds is not None:
+            timeline.add(self._seconds, lines=len(self.lines) - self._seconds_line)
+            self._seconds_line = len(self.lines)
+
+        self.error_lines.extend(error_lines)
+        self.warning_lines.extend(warning_lines)
+        self.stack_traces.extend(stack_traces)
+        self._trace_starts.extend(block["start"] for block in stack_traces)
+
+        return {
+            "start_line": first_line,
+            "end_line": len(self.lines),
+            "error_lines": error_lines,
+            "warning_lines": warning_lines,
+            "critical_lines": [self._with_context(critical) for critical in critical_lines],
+            "stack_traces": stack_traces,
+            "build_stages": {stage: dict(self.build_stages[stage]) for stage in touched_stages},
+            "error_counts": self.error_counts(),
+            "error_types": dict(self.error_type_counts),
+        }
+
+    def error_rows(self, delta: Optional[Dict[str, Any]] = None) -> List[tuple]:
+        """
+        (line_number, level) rows for log_errors, for one delta or the whole log
+        """
+        source = delta if delta is not None else {"error_lines": self.error_lines, "warning_lines": self.warning_lines}
+        return ([(i, "Error") for i in source["error_lines"]]
+                + [(i, "Warning") for i in source["warning_lines"]])
+
+    def error_counts(self) -> Dict[str, int]:
+        return {
+            "Critical": sum(1 for err_type in self.error_types
+                            if "Exception" in err_type or "Error" in err_type),
+            "Error": sum(1 for err_type in self.error_types
+                         if "Exception" not in err_type and "Error" not in err_type),
+            "Warning": len(self.warning_lines)
+        }
+
+    def critical_lines(self) -> List[Dict[str, Any]]:
+        """
+        Most important lines so far (errors first, then warnings) with surrounding context
+        """
+        critical = (self._critical_errors + self._critical_warnings)[:MAX_CRITICAL_LINES]
+        return [self._with_context(item) for item in critical]
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Analysis result for everything fed so far
+        """
+        return {
+            "file_id": self.file_id,
+            "line_count": len(self.lines),
+            "critical_lines": self.critical_lines(),
+            "error_counts": self.error_counts(),
+            "error_types": dict(self.error_type_counts),
+            "stack_trace_count": len(self.stack_traces),
+            "build_stages": {stage: dict(data) for stage, data in self.build_stages.items()},
+            "log_format": self.log_format.name if self.log_format is not None else None,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "timeline": self.timeline.summary(self.stage_times)
+        }
+
+    def stack_trace_at(self, line_num: int, lookahead: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        The completed stack trace containing line_num, or starting at most lookahead
+        lines after it
+        """
+        return find_block(self.stack_traces, self._trace_starts, line_num, lookahead)
+
+    def _with_context(self, critical: Dict[str, Any]) -> Dict[str, Any]:
+        # Get lines before and after
+        line_num = critical["line"]
+        with_context = dict(
+            critical,
+            context_before=self.lines[max(0, line_num - CONTEXT_LINES):line_num],
+            context_after=self.lines[line_num + 1:line_num + 1 + CONTEXT_LINES]
+        )
+        # Range of the stack trace the line belongs to, for the UI to fetch in full
+        block = self.stack_trace_at(line_num, TRACE_LOOKAHEAD)
+        if block is not None:
+            with_context["stack_trace"] = {"start": block["start"], "end": block["end"],
+                                           "exception": block["exception"]}
+        return with_context
@@ -1,65 +1,132 @@
-from flask import Flask, request, jsonify, render_template, session, g
-import re
+from flask import Flask, Response, request, jsonify, render_template, session, g
+from werkzeug.exceptions import HTTPException
+import base64
+import binascii
 import datetime
 import uuid
-import sqlite3
 import json
-import requests
-from urllib.parse import urlparse
 import os
-import certifi
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
-from urllib3.exceptions import InsecureRequestWarning
-import ssl
 import threading
-import markdown
-import bleach
+import io
+import itertools
+import time
+import tarfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
-requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
+import database
+from storage import create_storage
+from ingest import (CompressionError, LogFetchError, LogTooLargeError, detect_compression,
+                    iter_decompressed, iter_lines, open_url_stream, progressive_text_url)
+from analyzer import LogAnalyzer
+from formats import DEFAULT_FORMAT, ERROR, FORMATS, WARNING, get_format
+from tail import TailSession
+from jobs import JobRegistry
+from cache import LogCache, MappedLines, SharedLogStore
+from bulk import analyze_payload, check_archive, create_executor, is_archive, iter_archive
+from chatcontext import build_chat_context
+from metrics import (ANALYSIS_LINES, ANALYSIS_LINES_PER_SECOND, ANALYSIS_STAGE_SECONDS,
+                     CONTENT_TYPE as METRICS_CONTENT_TYPE, LOG_CACHE_ENTRIES, LOG_CACHE_REQUESTS, LOG_STORE_BYTES,
+                     REGISTRY)
+from profiling import Profiler, record_span, span
+import httpcache
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_for_testing')
 app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max upload
+app.config['MAX_DECOMPRESSED_SIZE'] = int(os.environ.get('MAX_DECOMPRESSED_SIZE', 1024 * 1024 * 1024))  # 1GB max log after decompressing an upload, and max unpacked size of a /bulk archive
+app.config['MAX_URL_LOG_SIZE'] = int(os.environ.get('MAX_URL_LOG_SIZE', 1024 * 1024 * 1024))  # 1GB max log fetched from a URL
+app.config['TAIL_POLL_INTERVAL'] = float(os.environ.get('TAIL_POLL_INTERVAL', 2))  # seconds between Jenkins progressiveText polls
+app.config['BULK_WORKERS'] = int(os.environ.get('BULK_WORKERS', 0)) or os.cpu_count()  # analysis processes for bulk ingestion
+app.config['BULK_COMMIT_BATCH'] = int(os.environ.get('BULK_COMMIT_BATCH', 50))  # logs saved per database transaction
+app.config['ASYNC_ANALYSIS_THRESHOLD'] = int(os.environ.get('ASYNC_ANALYSIS_THRESHOLD', 5 * 1024 * 1024))  # logs larger than this (bytes) are analyzed as background jobs
+app.config['ANALYSIS_WORKERS'] = int(os.environ.get('ANALYSIS_WORKERS', 2))  # threads running background analysis jobs
+app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'  # allow request profiling
+app.config['PROFILING_SAMPLE_RATE'] = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))  # percent of requests profiled without the X-Profile header
+app.config['PROFILING_MODE'] = os.environ.get('PROFILING_MODE', 'cprofile')  # 'cprofile' (pstats) or 'sampling' (folded stacks)
+app.config['PROFILING_KEEP'] = int(os.environ.get('PROFILING_KEEP', 20))  # slowest profiles kept for download
+app.config['LOG_CACHE_MAX_ENTRIES'] = int(os.environ.get('LOG_CACHE_MAX_ENTRIES', 256))  # analyzed logs kept in memory per worker process
+app.config['LOG_STORE_DIR'] = os.environ.get('LOG_STORE_DIR', '')  # line files shared by the worker processes (default: instance/log_store)
+app.config['LOG_STORE_MAX_BYTES'] = int(os.environ.get('LOG_STORE_MAX_BYTES', 1024 * 1024 * 1024))  # 1GB of line files before the least recently used are deleted
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 app.config['APP_NAME'] = 'WolfsLogDebugger'
 app.config['APP_DESCRIPTION'] = 'Advanced log analysis and debugging tool powered by AI'
-app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0  # Disable caching for static files
-app.config['DATABASE'] = os.path.join(app.root_path, 'logs.db')
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = None  # static caching is set by apply_cache_policy()
+app.config['RESPONSE_COMPRESSION'] = os.environ.get('RESPONSE_COMPRESSION', 'true').lower() == 'true'  # gzip/brotli responses; turn off when a proxy compresses
+app.config['DATABASE'] = os.environ.get('DATABASE_PATH', os.path.join(app.root_path, 'logs.db'))  # SQLite file shared by all worker processes
+app.config['STORAGE_BACKEND'] = os.environ.get('STORAGE_BACKEND', 'sqlite')  # 'sqlite' or 'postgres'
+app.config['DATABASE_URL'] = os.environ.get('DATABASE_URL', '')  # PostgreSQL DSN
+app.config['DATABASE_POOL_SIZE'] = int(os.environ.get('DATABASE_POOL_SIZE', 10))
+app.config['AUTO_ANALYSIS_MAX_ERRORS'] = int(os.environ.get('AUTO_ANALYSIS_MAX_ERRORS', 5))  # distinct error lines the LLM analyzes after an upload, 0 disables
+app.config['AUTO_ANALYSIS_WORKERS'] = int(os.environ.get('AUTO_ANALYSIS_WORKERS', 1))  # logs pre-analyzed at once per worker process
+app.config['AUTO_ANALYSIS_WAIT'] = float(os.environ.get('AUTO_ANALYSIS_WAIT', 90))  # seconds a click waits for a pre-analysis in progress
 
-# Precompile regex patterns for performance
-ERROR_PATTERN = re.compile(r'\b(ERROR|FAILED|Exception:)\b', re.IGNORECASE)
-TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}')
-BUILD_STAGE_PATTERN = re.compile(r'\[Stage : (.+?)\]')
-WARNING_PATTERN = re.compile(r'\b(WARNING|WARN:)\b', re.IGNORECASE)
+# Retention limits for stored logs and downloaded files; unset limits are not enforced
+app.config['RETENTION_MAX_AGE_DAYS'] = float(os.environ['RETENTION_MAX_AGE_DAYS']) if os.environ.get('RETENTION_MAX_AGE_DAYS') else None
+app.config['RETENTION_MAX_COUNT'] = int(os.environ['RETENTION_MAX_COUNT']) if os.environ.get('RETENTION_MAX_COUNT') else None
+app.config['RETENTION_MAX_BYTES'] = int(os.environ['RETENTION_MAX_BYTES']) if os.environ.get('RETENTION_MAX_BYTES') else None
+app.config['RETENTION_INTERVAL'] = int(os.environ.get('RETENTION_INTERVAL', 3600))  # seconds, 0 disables the background job
 
-# Simple in-memory cache for development
-LOG_CACHE = {}
+# Lines fed to the analyzer at a time (and between progress updates of background jobs)
+PROGRESS_LINES = 20000
+# A stack trace starting this many lines after an error line still belongs to it, as in
+# the scan extract_error_context() falls back to
+STACK_TRACE_LOOKAHEAD = 20
+
+# Lines of recently analyzed logs, per worker process
+LOG_CACHE = LogCache(app.config['LOG_CACHE_MAX_ENTRIES'])
+LOG_CACHE_ENTRIES.set_function(lambda: len(LOG_CACHE))
+LOG_STORE_BYTES.set_function(lambda: get_log_store().size())
+# Chat contexts (see chatcontext.py) of recently analyzed logs, per worker process
+CHAT_CONTEXTS = LogCache(app.config['LOG_CACHE_MAX_ENTRIES'])
+# Format name of each log previewed, so its lines are highlighted as they were analyzed
+LOG_FORMATS = LogCache(app.config['LOG_CACHE_MAX_ENTRIES'])
 SESSION_KEY = 'current_log'
 
-# Import LLM service
-try:
-    from llm_service import check_llm_status, extract_error_context, analyze_error, get_llm_analysis
-    LLM_STATUS = check_llm_status()
-    LLM_AVAILABLE = LLM_STATUS.get("available", False)
-    USING_FALLBACK_LLM = LLM_STATUS.get("using_fallback", False)
-    app.logger.info(f"LLM service status: {LLM_STATUS}")
-    if USING_FALLBACK_LLM:
-        app.logger.info("Using fallback LLM service (OpenAI API)")
-except ImportError as e:
-    app.logger.warning(f"LLM service import error: {e}")
-    LLM_AVAILABLE = False
-    USING_FALLBACK_LLM = False
-except Exception as e:
-    app.logger.warning(f"LLM service connection error: {e}")
-    LLM_AVAILABLE = False
-    USING_FALLBACK_LLM = False
+# Logs that are still growing (live builds), keyed by file_id
+TAIL_SESSIONS = {}
+_tail_lock = threading.Lock()
+
+# Background jobs (bulk ingestion, large uploads) and the pools that run them. Their
+# status is saved to storage so any worker process can answer polls.
+JOBS = JobRegistry(store=lambda: get_storage())
+_analysis_executor = None
+_executor_lock = threading.Lock()
+_job_executor = ThreadPoolExecutor(max_workers=app.config['ANALYSIS_WORKERS'], thread_name_prefix='analysis')
+
+# LLM pre-analysis of new logs' error lines, on few threads so it doesn't crowd out
+# interactive requests to the LLM. Lines queued for it have a future here, keyed by
+# (file_id, line_number), that is set running once their batch goes to the LLM; clicks
+# only wait for running ones.
+_auto_analysis_executor = ThreadPoolExecutor(max_workers=app.config['AUTO_ANALYSIS_WORKERS'], thread_name_prefix='auto-analysis')
+PENDING_ANALYSES = {}
+_pending_lock = threading.Lock()
+
+def llm_available():
+    """
+    Whether the LLM service (or its OpenAI fallback) can be used. The status is probed
+    on first use and cached by llm_service rather than checked at import, so startup
+    never waits on the LLM.
+    """
+    try:
+        from llm_service import get_llm_status
+    except ImportError as e:
+        app.logger.warning(f"LLM service import error: {e}")
+        return False
+    return get_llm_status().get("available", False)
+
+def warm_llm_status():
+    """Probe the LLM on a background thread so the first request finds the status cached"""
+    threading.Thread(target=llm_available, name='llm-status', daemon=True).start()
 
 # Create a custom SSL context using system certificates
 def create_ssl_context(verify=True):
     if not verify:
         return False
-        
+    
+    import ssl
+    import certifi
     context = ssl.create_default_context()
     
     # Try to load system certificates
@@ -88,6 +155,10 @@ def create_ssl_context(verify=True):
     return True  # Fall back to requests' default behavior
 
 def create_session(verify=True):
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
     session = requests.Session()
     retry = Retry(
         total=3,
@@ -103,14 +174,24 @@ def create_session(verify=True):
     
     return session
 
-def get_db():
-    if 'db' not in g:
-        g.db = sqlite3.connect(
-            app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
-        )
-        g.db.row_factory = sqlite3.Row
-    return g.db
+_storage = None
+_storage_lock = threading.Lock()
+
+def get_storage():
+    """Return the configured storage backend, creating it on first use"""
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(
+                    app.config['STORAGE_BACKEND'],
+                    sqlite_path=app.config['DATABASE'],
+                    sqlite_schema=os.path.join(app.root_path, 'schema.sql'),
+                    database_url=app.config['DATABASE_URL'],
+                    postgres_schema=os.path.join(app.root_path, 'schema_postgres.sql'),
+                    pool_size=app.config['DATABASE_POOL_SIZE']
+                )
+    return _storage
 
 def init_db():
     """Initialize the database with schema"""
@@ -119,16 +200,10 @@ def init_db():
         os.makedirs(app.instance_path, exist_ok=True)
         
         with app.app_context():
-            # Get database connection
-            db = get_db()
-            
-            # Read schema file
-            with app.open_resource('schema.sql') as f:
-                db.executescript(f.read().decode('utf8'))
-                
-            # Commit changes
-            db.commit()
-            app.logger.info("Database initialized successfully")
+            # Create tables and apply pending migrations for the configured backend
+            storage = get_storage()
+            storage.init_schema()
+            app.logger.info(f"Database initialized successfully ({storage.name} storage)")
     except Exception as e:
         app.logger.error(f"Error initializing database: {str(e)}")
         import traceback
@@ -136,281 +211,382 @@ def init_db():
 
 @app.teardown_appcontext
 def close_db(error):
-    db = g.pop('db', None)
-    if db is not None:
-        db.close()
+    # The connection outlives the request; just make sure it isn't left mid-transaction
+    database.release_connection(app.config['DATABASE'])
+
+def get_retention_policy():
+    from retention import RetentionPolicy
+    return RetentionPolicy(
+        max_age_days=app.config['RETENTION_MAX_AGE_DAYS'],
+        max_count=app.config['RETENTION_MAX_COUNT'],
+        max_bytes=app.config['RETENTION_MAX_BYTES']
+    )
+
+def evict_logs(log_ids):
+    """Drop deleted logs from the in-memory caches and the shared line store"""
+    for log_id in log_ids:
+        LOG_CACHE.pop(log_id, None)
+        CHAT_CONTEXTS.pop(log_id, None)
+        LOG_FORMATS.pop(log_id, None)
+        get_log_store().delete(log_id)
+        tail_session = TAIL_SESSIONS.pop(log_id, None)
+        if tail_session is not None:
+            tail_session.stop()
+
+def run_retention_job():
+    """Apply the configured retention policy to the database and downloaded files"""
+    from retention import run_retention
+    return run_retention(
+        get_storage(),
+        get_retention_policy(),
+        download_dir=app.instance_path,
+        on_deleted=evict_logs
+    )
+
+_retention_scheduler = None
+
+def get_retention_scheduler():
+    """Return the background retention scheduler, creating it on first use"""
+    global _retention_scheduler
+    if _retention_scheduler is None:
+        from retention import RetentionScheduler
+        _retention_scheduler = RetentionScheduler(
+            run_retention_job,
+            app.config['RETENTION_INTERVAL'],
+            # Only one worker process per host runs the job
+            lock_path=os.path.join(app.instance_path, 'retention.lock')
+        )
+    return _retention_scheduler
+
+# Endpoints that can be profiled, with X-Profile: 1 or by sampling
+PROFILED_ENDPOINTS = {'analyze', 'chat', 'llm_analyze'}
+
+PROFILER = Profiler(
+    sample_rate=app.config['PROFILING_SAMPLE_RATE'],
+    keep=app.config['PROFILING_KEEP'],
+    mode=app.config['PROFILING_MODE']
+)
+
+@app.before_request
+def start_profile():
+    if app.config['PROFILING_ENABLED'] and request.endpoint in PROFILED_ENDPOINTS:
+        forced = request.headers.get('X-Profile', '').lower() in ('1', 'true')
+        g.profile = PROFILER.start(request.method, request.path, forced=forced)
+
+@app.after_request
+def finish_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        PROFILER.stop(profile, response.status_code)
+        response.headers['X-Profile-Id'] = profile.id
+    return response
+
+@app.teardown_request
+def abandon_profile(error):
+    # after_request doesn't run for unhandled exceptions
+    profile = g.pop('profile', None)
+    if profile is not None:
+        PROFILER.stop(profile, 500)
+
+# Content fingerprints of static/, added to static URLs so assets can be cached for a year
+STATIC_ASSETS = httpcache.StaticAssets(app.static_folder)
+
+@app.url_defaults
+def fingerprint_static(endpoint, values):
+    if endpoint == 'static' and 'filename' in values:
+        version = STATIC_ASSETS.version(values['filename'])
+        if version:
+            values.setdefault('v', version)
 
 @app.after_request
-def add_cache_control(response):
-    # Add cache control headers to prevent 304 responses
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
-    response.headers["Pragma"] = "no-cache"
-    response.headers["Expires"] = "0"
+def apply_cache_policy(response):
+    """
+    Cache fingerprinted static assets for a year and anything a view didn't give a
+    policy (see httpcache.cached()) not at all, answer matching If-None-Match with 304,
+    and compress what's left
+    """
+    static_version = None
+    if request.endpoint == 'static':
+        version = STATIC_ASSETS.version((request.view_args or {}).get('filename', ''))
+        if version and request.args.get('v') == version:
+            static_version = version
+            response.headers["Cache-Control"] = httpcache.STATIC_IMMUTABLE
+    elif "Cache-Control" not in response.headers:
+        response.headers["Cache-Control"] = httpcache.NO_STORE
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+    
+    response = httpcache.conditional(request, response)
+    if not app.config['RESPONSE_COMPRESSION'] or not httpcache.is_compressible(response):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = httpcache.choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    if static_version:
+        filename = request.view_args['filename']
+        return httpcache.encode_response(response, encoding, STATIC_ASSETS.compressed(filename, static_version, encoding))
+    if not response.is_streamed and response.content_length and response.content_length >= httpcache.MIN_COMPRESS_SIZE:
+        return httpcache.encode_response(response, encoding)
     return response
 
 def fetch_log_from_url(url, skip_ssl_verify=False):
     """
-    Fetch log content from a URL and save it locally
+    Stream log lines from a URL, saving the download locally as it arrives.
+    
+    Returns an iterator of lines and the expected size in bytes (None if unknown).
+    The body is read (and the size limit enforced) as the analyzer consumes the
+    lines, so the whole log is never held as one string.
     """
-    try:
-        session = requests.Session()
-        
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=3,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        session.mount("http://", adapter)
-        session.mount("https://", adapter)
-        
-        # Handle SSL verification
-        verify = not skip_ssl_verify
-        if not verify:
-            # Disable SSL warnings if verification is disabled
-            requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
-            # Create unverified SSL context
-            ssl._create_default_https_context = ssl._create_unverified_context
-        
-        # Make the request
-        app.logger.info(f"Fetching log from URL: {url}")
-        response = session.get(url, verify=verify, timeout=30)
-        response.raise_for_status()
-        
-        # Get the content
-        log_content = response.text
-        
-        # Download the file to the server
-        file_path = os.path.join(app.instance_path, f"download_{uuid.uuid4()}.log")
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(log_content)
-        
-        app.logger.info(f"Log downloaded and saved to {file_path}")
-        
-        return log_content
-        
-    except requests.exceptions.RequestException as e:
-        app.logger.error(f"Error fetching URL {url}: {str(e)}")
-        raise Exception(f"Failed to fetch log from URL: {str(e)}")
+    file_path = os.path.join(app.instance_path, f"download_{uuid.uuid4()}.log")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    
+    app.logger.info(f"Fetching log from URL: {url}")
+    stream = open_url_stream(
+        url,
+        verify=not skip_ssl_verify,
+        max_bytes=app.config['MAX_URL_LOG_SIZE'],
+        save_path=file_path
+    )
+    return iter_lines(stream), stream.length
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
-def analyze_log(log_content):
+def analyze_log(log_content, progress=None, name=None, log_format=None):
     """
     Analyze a log file to identify errors, warnings, and other patterns
+    
+    log_content is either the full text or an iterable of lines (e.g. a streamed download).
+    progress, if given, is called as progress(lines, chars) every PROGRESS_LINES lines.
+    name is the log's name in its chat context.
+    log_format names the log's format (see formats.py); by default it is detected.
     """
+    file_id = str(uuid.uuid4())
+    analysis_started = time.perf_counter()
     try:
-        lines = log_content.splitlines()
-        file_id = str(uuid.uuid4())
+        line_source = log_content.splitlines() if isinstance(log_content, str) else log_content
         
         # Store in cache for preview and other operations
-        LOG_CACHE[file_id] = lines
-        
-        # Find error and warning lines
-        error_lines = []
-        warning_lines = []
-        build_stages = {}
-        timestamps = []
-        error_types = {}
-        critical_lines = []
-        
-        # Patterns for error and stage detection
-        stage_pattern = re.compile(r'^\[([^\]]+)\]')
-        timestamp_pattern = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')
-        
-        # Analyze each line
-        for i, line in enumerate(lines):
-            # Extract timestamp if present
-            timestamp_match = timestamp_pattern.search(line)
-            if timestamp_match:
-                timestamps.append(timestamp_match.group(0))
-            
-            # Check for build stage
-            stage_match = stage_pattern.search(line)
-            if stage_match:
-                stage = stage_match.group(1)
-                if stage not in build_stages:
-                    build_stages[stage] = {"start": i, "end": i, "errors": 0, "warnings": 0}
-                else:
-                    build_stages[stage]["end"] = i
-            
-            # Check for errors
-            if ERROR_PATTERN.search(line):
-                error_lines.append(i)
-                
-                # Update stage error count if we're in a stage
-                for stage, data in build_stages.items():
-                    if data["start"] <= i <= data["end"]:
-                        data["errors"] += 1
-                
-                # Try to determine error type
-                error_type = "Unknown Error"
-                
-                # Java exception pattern
-                java_exception_match = re.search(r'([a-zA-Z0-9_$.]+Exception|Error)', line)
-                if java_exception_match:
-                    error_type = java_exception_match.group(1)
-                # Python exception pattern
-                elif 'Traceback' in line:
-                    error_type = "Python Exception"
-                # Generic error pattern
-                elif 'ERROR:' in line:
-                    error_parts = line.split('ERROR:', 1)
-                    if len(error_parts) > 1:
-                        error_type = error_parts[1].strip().split()[0]
-                # Shell/bash error
-                elif 'Command failed' in line or 'exit code' in line:
-                    error_type = "Shell Error"
-                
-                # Count error types for chart
-                error_types[error_type] = error_types.get(error_type, 0) + 1
-                
-                # Add to critical lines
-                timestamp = timestamp_match.group(0) if timestamp_match else None
-                critical_lines.append({
-                    "line": i,
-                    "content": line,
-                    "timestamp": timestamp,
-                    "type": "error"
-                })
-                
-                # Save error line to database
-                try:
-                    db = get_db()
-                    db.execute(
-                        'INSERT INTO log_errors (log_id, line_number, level) VALUES (?, ?, ?)',
-                        (file_id, i, "Error")
-                    )
-                    db.commit()
-                except Exception as e:
-                    app.logger.error(f"Error saving error line to database: {str(e)}")
-                
-            elif WARNING_PATTERN.search(line):
-                warning_lines.append(i)
-                
-                # Update stage warning count if we're in a stage
-                for stage, data in build_stages.items():
-                    if data["start"] <= i <= data["end"]:
-                        data["warnings"] += 1
-                
-                # Only include warnings in critical lines if we don't have too many errors
-                if len(critical_lines) < 10:
-                    timestamp = timestamp_match.group(0) if timestamp_match else None
-                    critical_lines.append({
-                        "line": i,
-                        "content": line,
-                        "timestamp": timestamp,
-                        "type": "warning"
-                    })
-                    
-                # Save warning line to database
-                try:
-                    db = get_db()
-                    db.execute(
-                        'INSERT INTO log_errors (log_id, line_number, level) VALUES (?, ?, ?)',
-                        (file_id, i, "Warning")
-                    )
-                    db.commit()
-                except Exception as e:
-                    app.logger.error(f"Error saving warning line to database: {str(e)}")
+        analyzer = LogAnalyzer(file_id, log_format=log_format)
+        LOG_CACHE[file_id] = analyzer.lines
         
-        # Sort critical lines by importance (errors first, then warnings)
-        critical_lines.sort(key=lambda x: 0 if x["type"] == "error" else 1)
+        # Feed in chunks so classification time excludes reading a streamed source
+        line_source = iter(line_source)
+        chars = 0
+        classify_seconds = 0.0
+        while True:
+            chunk = list(itertools.islice(line_source, PROGRESS_LINES))
+            if not chunk:
+                break
+            started = time.perf_counter()
+            analyzer.feed(chunk)
+            classify_seconds += time.perf_counter() - started
+            if progress is not None:
+                chars += sum(len(line) + 1 for line in chunk)
+                progress(len(analyzer.lines), chars)
+        # Close a stack trace that runs up to the last line
+        analyzer.feed([], final=True)
         
-        # Limit critical lines to most important ones
-        critical_lines = critical_lines[:15]
+        ANALYSIS_STAGE_SECONDS.observe(classify_seconds, stage='classify')
+        record_span('analyze_log.classify', classify_seconds)
+        ANALYSIS_LINES.inc(len(analyzer.lines))
+        if classify_seconds > 0:
+            ANALYSIS_LINES_PER_SECOND.observe(len(analyzer.lines) / classify_seconds)
         
-        # Add context to critical lines - Get 2 lines before and after
-        for i, critical in enumerate(critical_lines):
-            line_num = critical["line"]
-            context_before = []
-            context_after = []
-            
-            # Get lines before
-            for j in range(max(0, line_num - 2), line_num):
-                context_before.append(lines[j])
-                
-            # Get lines after
-            for j in range(line_num + 1, min(len(lines), line_num + 3)):
-                context_after.append(lines[j])
-                
-            critical_lines[i]["context_before"] = context_before
-            critical_lines[i]["context_after"] = context_after
-        
-        # Build the analysis result
-        analysis = {
-            "error_count": len(error_lines),
-            "warning_count": len(warning_lines),
-            "error_counts": {
-                "Critical": sum(1 for err_type, count in error_types.items() 
-                              if "Exception" in err_type or "Error" in err_type),
-                "Error": sum(1 for err_type, count in error_types.items() 
-                           if "Exception" not in err_type and "Error" not in err_type),
-                "Warning": len(warning_lines)
-            },
-            "error_types": error_types,
-            "build_stages": build_stages,
-            "critical_lines": critical_lines,
-            "start_time": timestamps[0] if timestamps else None,
-            "end_time": timestamps[-1] if timestamps else None,
-        }
+        # Save all error and warning lines, and the stack trace ranges, in one batch each
+        try:
+            with ANALYSIS_STAGE_SECONDS.time(stage='persist'):
+                get_storage().save_log_errors(file_id, analyzer.error_rows())
+                if analyzer.stack_traces:
+                    get_storage().save_stack_traces(file_id, analyzer.stack_traces)
+        except Exception as e:
+            app.logger.error(f"Error saving error lines to database: {str(e)}")
         
-        return {
-            "file_id": file_id,
-            "line_count": len(lines),
-            "critical_lines": critical_lines,
-            "error_counts": analysis["error_counts"],
-            "build_stages": analysis["build_stages"],
-            "start_time": analysis["start_time"],
-            "end_time": analysis["end_time"]
-        }
+        share_lines(file_id, analyzer.lines)
+        result = analyzer.result()
+        LOG_FORMATS[file_id] = result['log_format'] or DEFAULT_FORMAT
+        save_chat_context(file_id, name or 'Unknown', analyzer, result)
+        return result
         
+    except (LogFetchError, LogTooLargeError, CompressionError):
+        LOG_CACHE.pop(file_id, None)
+        raise
     except Exception as e:
+        LOG_CACHE.pop(file_id, None)
         app.logger.error(f"Error analyzing log: {str(e)}")
         import traceback
         app.logger.error(traceback.format_exc())
         return {
             "error": f"Failed to analyze log: {str(e)}"
         }
+    finally:
+        record_span('analyze_log', time.perf_counter() - analysis_started)
 
-def save_log_to_db(file_id, log_content):
-    db = get_db()
-    db.execute(
-        'INSERT INTO logs (file_id, log_content) VALUES (?, ?)',
-        (file_id, log_content)
-    )
-    db.commit()
-    app.logger.info("Log saved to database")
+_log_store = None
+_log_store_lock = threading.Lock()
+
+def get_log_store():
+    """Return the line store shared by the worker processes, creating it on first use"""
+    global _log_store
+    if _log_store is None:
+        with _log_store_lock:
+            if _log_store is None:
+                _log_store = SharedLogStore(
+                    app.config['LOG_STORE_DIR'] or os.path.join(app.instance_path, 'log_store'),
+                    max_bytes=app.config['LOG_STORE_MAX_BYTES']
+                )
+    return _log_store
+
+def share_lines(file_id, lines):
+    """Save a finished log's lines to the shared store so any worker process can serve them"""
+    try:
+        with ANALYSIS_STAGE_SECONDS.time(stage='share'):
+            get_log_store().put(file_id, lines)
+    except Exception as e:
+        app.logger.error(f"Error saving lines of {file_id} to the shared log store: {str(e)}")
+
+def save_chat_context(file_id, name, analyzer, result=None):
+    """Build the chat context of a finished log, keep it for chat and save it to storage"""
+    try:
+        with ANALYSIS_STAGE_SECONDS.time(stage='chat_context'):
+            context = build_chat_context(name, result or analyzer.result(),
+                                         analyzer.error_signatures.values(), analyzer.stack_traces)
+            CHAT_CONTEXTS[file_id] = context
+            get_storage().save_chat_context(file_id, context)
+    except Exception as e:
+        app.logger.error(f"Error saving chat context of {file_id}: {str(e)}")
+
+def get_chat_context(file_id):
+    """
+    Chat context of a log, or None if it doesn't exist. A live log's is built from its
+    analyzer on every call; logs saved before chat contexts existed get theirs built
+    from the stored analysis on first use.
+    """
+    context = CHAT_CONTEXTS.get(file_id)
+    if context is not None:
+        return context
+    
+    tail_session = TAIL_SESSIONS.get(file_id)
+    if tail_session is not None and not tail_session.done:
+        analyzer = tail_session.analyzer
+        return build_chat_context(tail_session.name, analyzer.result(),
+                                  analyzer.error_signatures.values(), analyzer.stack_traces)
+    
+    storage = get_storage()
+    context = storage.get_chat_context(file_id)
+    if context is None:
+        record = storage.get_log(file_id)
+        if record is None or not isinstance(record["content"], dict):
+            return None
+        context = build_chat_context(record["file_name"], record["content"],
+                                     stack_traces=storage.get_stack_traces(file_id))
+        storage.save_chat_context(file_id, context)
+    CHAT_CONTEXTS[file_id] = context
+    return context
+
+def get_cached_lines(file_id):
+    """
+    Lines of a log from LOG_CACHE, or from the shared store if another worker process
+    analyzed it, or None if neither has it; lookups are counted for the cache hit
+    rate metric
+    """
+    lines = LOG_CACHE.get(file_id)
+    if lines is not None:
+        LOG_CACHE_REQUESTS.inc(result='hit')
+        return lines
+    lines = get_log_store().get(file_id)
+    LOG_CACHE_REQUESTS.inc(result='shared' if lines is not None else 'miss')
+    return lines
 
 def save_log_analysis_to_db(file_id, file_name, source_type, error_count, warning_count, content):
     """
     Save log analysis results to the database
     """
     try:
-        db = get_db()
-        db.execute(
-            '''INSERT INTO log_files 
-               (log_id, file_name, source_type, error_count, warning_count, content) 
-               VALUES (?, ?, ?, ?, ?, ?)''',
-            (file_id, file_name, source_type, error_count, warning_count, json.dumps(content))
-        )
-        db.commit()
+        get_storage().save_log_analysis(file_id, file_name, source_type, error_count, warning_count, content)
         app.logger.info(f"Log analysis saved to database with ID: {file_id}")
         return True
     except Exception as e:
         app.logger.error(f"Error saving log analysis to database: {str(e)}")
         return False
 
+def finish_analysis(analysis_result, name, source):
+    """
+    Store a completed analysis and start background error analysis
+    """
+    analysis_id = save_log_analysis_to_db(analysis_result['file_id'], name, source, analysis_result['error_counts']['Error'], analysis_result['error_counts']['Warning'], analysis_result)
+    analysis_result['id'] = analysis_id
+    
+    # Pre-analyze the error lines users see first, so clicking one is answered at once.
+    # Whether the LLM is up is checked on the auto-analysis thread, not this request's.
+    error_lines = [critical['line'] for critical in analysis_result['critical_lines'] if critical['type'] == 'error']
+    if error_lines and app.config['AUTO_ANALYSIS_MAX_ERRORS'] > 0:
+        auto_analyze_errors(analysis_result['file_id'], error_lines)
+    
+    return analysis_result
+
+def run_analysis_job(job, log_content, name, source, total_size, log_format=None):
+    """
+    Analyze a large log in the background, reporting lines processed and percent done
+    """
+    def report(lines, chars):
+        progress = {"lines_processed": lines}
+        if total_size:
+            progress["percent"] = min(99.0, round(100.0 * chars / total_size, 1))
+        job.update(progress=progress)
+    
+    job.start()
+    try:
+        analysis_result = analyze_log(log_content, progress=report, name=name, log_format=log_format)
+        if 'error' in analysis_result:
+            job.finish(error=analysis_result['error'])
+            return
+        job.update(
+            result=finish_analysis(analysis_result, name, source),
+            progress={"lines_processed": analysis_result['line_count'], "percent": 100.0}
+        )
+        job.finish()
+    except Exception as e:
+        app.logger.error(f"Analysis job {job.id} failed: {str(e)}")
+        job.finish(error=str(e))
+
+def requested_log_format(data):
+    """
+    Log format named by a request's 'format' field: None to detect it (no format, or
+    'auto'), False if there's no such format
+    """
+    log_format = data.get('format') or 'auto'
+    if log_format == 'auto':
+        return None
+    return log_format if log_format in FORMATS else False
+
+@app.route('/formats')
+def list_formats():
+    """Log formats /analyze, /bulk and /tail accept as 'format', in detection order"""
+    return jsonify([
+        {"name": name, "description": format_class.description}
+        for name, format_class in FORMATS.items()
+    ])
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
+    """
+    Analyze an uploaded file or a log URL. Logs above ASYNC_ANALYSIS_THRESHOLD (or any
+    log when async=true) are analyzed in the background: the response is 202 with a
+    job ID to poll at /jobs/<job_id>. format names the log's format (see /formats)
+    instead of detecting it.
+    """
     try:
         log_content = None
         source = None
+        size = None
+        
+        log_format = requested_log_format(request.form)
+        if log_format is False:
+            return jsonify({"error": f"Unknown log format: {request.form['format']}"}), 400
         
         if 'file' in request.files:
             file = request.files['file']
@@ -418,10 +594,21 @@ def analyze():
             if file.filename == '':
                 return jsonify({"error": "No file selected"}), 400
                 
-            # Read file content
-            log_content = file.read().decode('utf-8', errors='replace')
+            # Read file content; compressed uploads are decompressed as the analyzer reads them
+            raw = file.read()
+            compression = detect_compression(raw[:4])
+            if compression:
+                log_content = iter_lines(iter_decompressed(
+                    io.BytesIO(raw), compression, max_bytes=app.config['MAX_DECOMPRESSED_SIZE']
+                ))
+                # The decompressed size isn't known up front, so progress has no percent
+                progress_total = None
+            else:
+                log_content = raw.decode('utf-8', errors='replace')
+                progress_total = len(log_content)
             source = 'file'
             name = file.filename
+            size = len(raw)
             
         elif 'url' in request.form:
             url = request.form['url']
@@ -429,43 +616,357 @@ def analyze():
             if not url:
                 return jsonify({"error": "No URL provided"}), 400
                 
-            # Fetch log from URL
-            response = fetch_log_from_url(url)
-            
-            if 'error' in response:
-                return jsonify(response), 400
-                
-            log_content = response
+            # Stream log from URL straight into the analyzer
+            skip_ssl_verify = request.form.get('skip_ssl_verify', '').lower() in ('true', 'on', '1')
+            log_content, size = fetch_log_from_url(url, skip_ssl_verify=skip_ssl_verify)
+            progress_total = size
             source = 'url'
             name = url
             
         else:
             return jsonify({"error": "No file or URL provided"}), 400
+        
+        requested = request.form.get('async', '').lower()
+        if requested in ('true', '1'):
+            run_async = True
+        elif requested in ('false', '0'):
+            run_async = False
+        else:
+            run_async = size is not None and size > app.config['ASYNC_ANALYSIS_THRESHOLD']
+        
+        if run_async:
+            job = JOBS.create('analysis')
+            job.update(progress={"lines_processed": 0, "percent": 0.0 if progress_total else None})
+            _job_executor.submit(run_analysis_job, job, log_content, name, source, progress_total, log_format)
+            return jsonify({
+                "job_id": job.id,
+                "status_url": f"/jobs/{job.id}",
+                "events_url": f"/jobs/{job.id}/events"
+            }), 202
             
         # Analyze log content
-        analysis_result = analyze_log(log_content)
+        analysis_result = analyze_log(log_content, name=name, log_format=log_format)
         
         if 'error' in analysis_result:
             return jsonify(analysis_result), 500
-            
-        # Store analysis in database
-        analysis_id = save_log_analysis_to_db(analysis_result['file_id'], name, source, analysis_result['error_counts']['Error'], analysis_result['error_counts']['Warning'], analysis_result)
-        analysis_result['id'] = analysis_id
-        
-        # Automatically analyze error lines in the background
-        if 'error_lines' in analysis_result and analysis_result['error_lines']:
-            file_id = analysis_result['file_id']
-            threading.Thread(
-                target=auto_analyze_errors,
-                args=(file_id, analysis_result['error_lines'])
-            ).start()
         
-        return jsonify(analysis_result)
+        return jsonify(finish_analysis(analysis_result, name, source))
         
+    except LogTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except LogFetchError as e:
+        return jsonify({"error": str(e)}), 502
+    except CompressionError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         app.logger.error(f"Analysis error: {str(e)}")
         return jsonify({"error": f"Failed to analyze log: {str(e)}"}), 500
 
+def persist_tail_delta(tail_session, delta):
+    """Save the error lines and stack traces of a live log delta and refresh its stored summary"""
+    storage = get_storage()
+    storage.save_log_errors(tail_session.file_id, tail_session.analyzer.error_rows(delta))
+    if delta['stack_traces']:
+        storage.save_stack_traces(tail_session.file_id, delta['stack_traces'])
+    storage.update_log_analysis(
+        tail_session.file_id,
+        delta['error_counts']['Error'],
+        delta['error_counts']['Warning'],
+        tail_session.analyzer.result()
+    )
+    if delta['done']:
+        share_lines(tail_session.file_id, tail_session.analyzer.lines)
+        save_chat_context(tail_session.file_id, tail_session.name, tail_session.analyzer)
+
+def get_tail_session(file_id):
+    """
+    Return the live session for file_id, turning an already analyzed log into one
+    (by replaying its cached lines with the stored name and log format) so it can be
+    appended to
+    """
+    with _tail_lock:
+        tail_session = TAIL_SESSIONS.get(file_id)
+        lines = get_cached_lines(file_id) if tail_session is None else None
+        if isinstance(lines, (list, MappedLines)):
+            name, log_format = file_id, None
+            try:
+                record = get_storage().get_log(file_id)
+            except Exception as e:
+                app.logger.error(f"Error loading log {file_id} to reopen it: {str(e)}")
+                record = None
+            if record is not None:
+                name = record['file_name'] or name
+                if isinstance(record['content'], dict) and record['content'].get('log_format') in FORMATS:
+                    log_format = record['content']['log_format']
+
+            analyzer = LogAnalyzer(file_id, log_format=log_format)
+            analyzer.feed(lines)
+            LOG_CACHE[file_id] = analyzer.lines
+            tail_session = TAIL_SESSIONS[file_id] = TailSession(analyzer, name, on_delta=persist_tail_delta)
+        return tail_session
+
+@app.route('/tail', methods=['POST'])
+def start_tail():
+    """
+    Start analyzing a live log. With a Jenkins build URL the console is followed
+    through progressiveText; otherwise lines are pushed to /log/<file_id>/append.
+    """
+    try:
+        data = request.get_json(silent=True) or request.form
+        url = data.get('url', '')
+        name = data.get('name') or url or 'Live log'
+        log_format = requested_log_format(data)
+        if log_format is False:
+            return jsonify({"error": f"Unknown log format: {data['format']}"}), 400
+        
+        analyzer = LogAnalyzer(str(uuid.uuid4()), log_format=log_format)
+        tail_session = TailSession(analyzer, name, on_delta=persist_tail_delta)
+        with _tail_lock:
+            LOG_CACHE[analyzer.file_id] = analyzer.lines
+            TAIL_SESSIONS[analyzer.file_id] = tail_session
+        save_log_analysis_to_db(analyzer.file_id, name, 'url' if url else 'live', 0, 0, analyzer.result())
+        
+        if url:
+            skip_ssl_verify = str(data.get('skip_ssl_verify', '')).lower() in ('true', 'on', '1')
+            tail_session.follow(
+                progressive_text_url(url),
+                interval=app.config['TAIL_POLL_INTERVAL'],
+                verify=not skip_ssl_verify
+            )
+        
+        return jsonify({
+            "file_id": analyzer.file_id,
+            "name": name,
+            "live": True
+        }), 201
+    except Exception as e:
+        app.logger.error(f"Error starting live analysis: {str(e)}")
+        return jsonify({"error": f"Failed to start live analysis: {str(e)}"}), 500
+
+@app.route('/log/<file_id>/append', methods=['POST'])
+def append_log(file_id):
+    """
+    Append text to a log and analyze only the new lines. Pass ?final=true with the
+    last piece to mark the log complete.
+    """
+    tail_session = get_tail_session(file_id)
+    if tail_session is None:
+        return jsonify({"error": "Log file not found"}), 404
+    
+    text = request.form['content'] if 'content' in request.form else request.get_data(as_text=True)
+    final = request.args.get('final', '').lower() in ('true', '1')
+    try:
+        return jsonify(tail_session.append(text, final=final))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+@app.route('/log/<file_id>/deltas')
+def log_deltas(file_id):
+    """Analysis deltas of a live log after the given sequence number"""
+    tail_session = TAIL_SESSIONS.get(file_id)
+    if tail_session is None:
+        return jsonify({"error": "No live analysis for this log"}), 404
+    return jsonify(tail_session.deltas_since(request.args.get('since', 0, type=int)))
+
+def get_analysis_executor():
+    """Return the process pool used for bulk analysis, starting it on first use"""
+    global _analysis_executor
+    if _analysis_executor is None:
+        with _executor_lock:
+            if _analysis_executor is None:
+                _analysis_executor = create_executor(app.config['BULK_WORKERS'])
+    return _analysis_executor
+
+def run_bulk_job(job, uploads, log_format=None):
+    """
+    Analyze uploaded logs in the process pool and save the results in batches. Archives
+    are unpacked one member at a time as workers free up, so only about two logs per
+    worker are held in memory waiting to be analyzed. Workers write the lines to the
+    shared log store themselves, so the logs aren't copied back to this process.
+    """
+    job.start()
+    try:
+        executor = get_analysis_executor()
+        store = get_log_store()
+        max_bytes = app.config['MAX_DECOMPRESSED_SIZE']
+        max_pending = 2 * app.config['BULK_WORKERS']
+        futures = {}
+        batch = []
+        
+        def collect(done):
+            nonlocal batch
+            for future in done:
+                name = futures.pop(future)
+                try:
+                    analyzed = future.result()
+                except Exception as e:
+                    app.logger.error(f"Bulk analysis of {name} failed: {str(e)}")
+                    job.add_error(name, str(e))
+                    continue
+                
+                result = analyzed['result']
+                LOG_FORMATS[analyzed['file_id']] = result['log_format'] or DEFAULT_FORMAT
+                batch.append({
+                    "file_id": analyzed['file_id'],
+                    "file_name": name,
+                    "source_type": 'bulk',
+                    "error_count": result['error_counts']['Error'],
+                    "warning_count": result['error_counts']['Warning'],
+                    "content": result,
+                    "error_rows": analyzed['error_rows'],
+                    "stack_traces": analyzed['stack_traces'],
+                    "chat_context": analyzed['chat_context']
+                })
+                if len(batch) >= app.config['BULK_COMMIT_BATCH']:
+                    save_bulk_batch(job, batch)
+                    batch = []
+        
+        for filename, data in uploads:
+            members = iter_archive(filename, data, max_bytes) if is_archive(filename) else [(filename, data)]
+            try:
+                for name, content in members:
+                    if len(futures) >= max_pending:
+                        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    futures[executor.submit(analyze_payload, name, content, store, max_bytes, log_format)] = name
+            except (LogTooLargeError, zipfile.BadZipFile, tarfile.TarError) as e:
+                app.logger.error(f"Bulk archive {filename} failed: {str(e)}")
+                job.add_error(filename, str(e))
+        collect(as_completed(list(futures)))
+        
+        if batch:
+            save_bulk_batch(job, batch)
+        job.finish()
+    except Exception as e:
+        app.logger.error(f"Bulk job {job.id} failed: {str(e)}")
+        job.finish(error=str(e))
+
+def save_bulk_batch(job, batch):
+    """Commit one batch of bulk results and record them on the job"""
+    try:
+        get_storage().save_analyses(batch)
+    except Exception as e:
+        app.logger.error(f"Error saving bulk batch to database: {str(e)}")
+        for record in batch:
+            LOG_CACHE.pop(record['file_id'], None)
+            get_log_store().delete(record['file_id'])
+            job.add_error(record['file_name'], f"Failed to save analysis: {str(e)}")
+        return
+    
+    job.add_results([{
+        "file_id": record['file_id'],
+        "name": record['file_name'],
+        "line_count": record['content']['line_count'],
+        "error_counts": record['content']['error_counts']
+    } for record in batch])
+
+@app.route('/bulk', methods=['POST'])
+def bulk_analyze():
+    """
+    Queue many logs for analysis at once: several 'files' parts and/or zip/tar archives.
+    Returns a job ID to poll at /jobs/<job_id>.
+    """
+    try:
+        log_format = requested_log_format(request.form)
+        if log_format is False:
+            return jsonify({"error": f"Unknown log format: {request.form['format']}"}), 400
+        
+        # Archives are only checked here (by their headers) and unpacked by the job
+        uploads = []
+        total = 0
+        for file in request.files.getlist('files') + request.files.getlist('file'):
+            if not file.filename:
+                continue
+            data = file.read()
+            if is_archive(file.filename):
+                total += check_archive(file.filename, data, app.config['MAX_DECOMPRESSED_SIZE'])
+            else:
+                total += 1
+            uploads.append((file.filename, data))
+        
+        if not total:
+            return jsonify({"error": "No files provided"}), 400
+        
+        job = JOBS.create('bulk', total=total)
+        threading.Thread(target=run_bulk_job, args=(job, uploads, log_format), daemon=True).start()
+        
+        return jsonify({
+            "job_id": job.id,
+            "total": job.total,
+            "status_url": f"/jobs/{job.id}"
+        }), 202
+    except LogTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        return jsonify({"error": f"Invalid archive: {str(e)}"}), 400
+    except HTTPException:
+        raise
+    except Exception as e:
+        app.logger.error(f"Bulk upload error: {str(e)}")
+        return jsonify({"error": f"Failed to queue logs: {str(e)}"}), 500
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Progress and results of a background job"""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-sent events with a job's status whenever it changes, until it finishes"""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    def generate():
+        nonlocal job
+        last = None
+        while True:
+            # A job running in another worker process is only seen through its saved status
+            job = JOBS.get(job_id) or job
+            status = job.to_dict()
+            status.pop('elapsed_seconds')
+            if status != last:
+                yield f"data: {json.dumps(status)}\n\n"
+                last = status
+            if job.done:
+                return
+            time.sleep(0.5)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={"X-Accel-Buffering": "no"})
+
+@app.route('/metrics')
+def metrics():
+    """Performance metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/profiles')
+def list_profiles():
+    """Kept request profiles, slowest first"""
+    if not app.config['PROFILING_ENABLED']:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    return jsonify([profile.to_dict() for profile in PROFILER.profiles()])
+
+@app.route('/profiles/<profile_id>')
+def get_profile(profile_id):
+    """Span breakdown and top functions of one request profile"""
+    profile = PROFILER.get(profile_id) if app.config['PROFILING_ENABLED'] else None
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(dict(profile.to_dict(), top_functions=Profiler.summary(profile)))
+
+@app.route('/profiles/<profile_id>/download')
+def download_profile(profile_id):
+    """Raw profile: a pstats file (cprofile mode) or folded stacks for flame graphs (sampling mode)"""
+    profile = PROFILER.get(profile_id) if app.config['PROFILING_ENABLED'] else None
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+    response = Response(profile.data, mimetype='application/octet-stream' if profile.mode == 'cprofile' else 'text/plain')
+    response.headers['Content-Disposition'] = f'attachment; filename="{profile.filename}"'
+    return response
+
 @app.route('/llm/status', methods=['GET'])
 def llm_status():
     """
@@ -473,8 +974,8 @@ def llm_status():
     """
     try:
         # Import here to avoid errors if LLM dependencies are missing
-        from llm_service import check_llm_status
-        status = check_llm_status()
+        from llm_service import get_llm_status
+        status = get_llm_status(refresh=True)
         app.logger.info(f"LLM service available: {status}")
         return jsonify(status)
     except ImportError as e:
@@ -495,17 +996,17 @@ def llm_status():
 @app.route('/llm/analyze/<file_id>/<int:line_number>', methods=['GET'])
 def llm_analyze(file_id, line_number):
     """
-    Analyze an error line using LLM
+    Analyze an error line using LLM. The response's status says where the result came
+    from: 'precomputed' (auto-analysis after upload), 'joined' (an auto-analysis that
+    was still running) or 'computed' (analyzed for this request).
     """
     try:
-        # Check if file_id exists in cache
-        if file_id not in LOG_CACHE:
+        # Get the log lines
+        log_lines = get_cached_lines(file_id)
+        if log_lines is None:
             return jsonify({
                 "error": "Log file not found in cache. Please re-upload the file."
             }), 404
-            
-        # Get the log lines
-        log_lines = LOG_CACHE[file_id]
         
         # Validate line number
         if line_number < 0 or line_number >= len(log_lines):
@@ -513,27 +1014,39 @@ def llm_analyze(file_id, line_number):
                 "error": f"Invalid line number: {line_number}. Log has {len(log_lines)} lines."
             }), 400
         
-        # Extract error context
-        from llm_service import extract_error_context, analyze_error
-        context = extract_error_context(log_lines, line_number)
-        if "error" in context:
-            return jsonify({
-                "error": context["error"]
-            }), 400
-            
-        # Analyze error with LLM
-        analysis = analyze_error(context)
+        # Answer with the line's auto-analysis when it has one, or is getting one
+        with span('llm.precomputed'):
+            analysis, status = get_precomputed_analysis(file_id, line_number)
         
-        if "error" in analysis:
-            return jsonify({
-                "error": analysis["error"]
-            }), 500
+        if analysis is None:
+            # Extract error context
+            from llm_service import extract_error_context, analyze_error
+            with ANALYSIS_STAGE_SECONDS.time(stage='context'), span('llm.context'):
+                stack_trace = find_stack_trace(file_id, line_number, STACK_TRACE_LOOKAHEAD)
+                context = extract_error_context(log_lines, line_number, stack_trace=stack_trace)
+            if "error" in context:
+                return jsonify({
+                    "error": context["error"]
+                }), 400
+                
+            # Analyze error with LLM
+            analysis = analyze_error(context)
+            
+            if "error" in analysis:
+                return jsonify({
+                    "error": analysis["error"]
+                }), 500
+            
+            # Keep it, so the next click on this line is answered at once
+            store_error_solution(file_id, line_number, log_lines[line_number], json.dumps(analysis))
+            status = 'computed'
         
         # Return the analysis result
         return jsonify({
             "line_number": line_number,
             "error_line": log_lines[line_number],
-            "result": analysis
+            "result": analysis,
+            "status": status
         })
         
     except Exception as e:
@@ -544,183 +1057,412 @@ def llm_analyze(file_id, line_number):
             "error": f"Error analyzing with LLM: {str(e)}"
         }), 500
 
+def find_stack_trace(file_id, line_number, lookahead=0):
+    """
+    Stored stack trace block containing line_number or starting within lookahead lines
+    after it, or None (also when the lookup fails, so callers can fall back to scanning)
+    """
+    try:
+        return get_storage().get_stack_trace(file_id, line_number, lookahead)
+    except Exception as e:
+        app.logger.error(f"Error looking up stack trace: {str(e)}")
+        return None
+
+def get_line_hashes(file_id, lines):
+    """
+    Normalized line hashes of a log for diffs (see logdiff.py), cached in the shared
+    store once the log is finished
+    """
+    from logdiff import line_hashes
+    store = get_log_store()
+    hashes = store.get_hashes(file_id)
+    if hashes is not None and len(hashes) == len(lines):
+        return hashes
+    with ANALYSIS_STAGE_SECONDS.time(stage='hash'), span('diff.hash'):
+        hashes = line_hashes(lines)
+    if not is_live_log(file_id) and file_id in store:
+        try:
+            store.put_hashes(file_id, hashes)
+        except Exception as e:
+            app.logger.error(f"Error saving line hashes of {file_id}: {str(e)}")
+    return hashes
+
+@app.route('/diff/<base_id>/<target_id>')
+def diff_logs(base_id, target_id):
+    """
+    What changed in target_id compared to base_id (e.g. the last green build): new,
+    disappeared and changed error signatures, the first region where the logs
+    diverge, and the lines only one of them has (up to ?max_lines= of each)
+    """
+    max_lines = min(max(request.args.get('max_lines', 500, type=int), 0), 5000)
+    try:
+        logs = {}
+        for role, file_id in (('base', base_id), ('target', target_id)):
+            lines = get_cached_lines(file_id)
+            record = get_storage().get_log(file_id)
+            if lines is None or record is None:
+                return jsonify({"error": f"Log not found: {file_id}"}), 404
+            logs[role] = (file_id, lines, record)
+        
+        # Unchanged until one of the logs grows, which even a finished one can if it is
+        # reopened by an append, so the ETag (with both lengths) is always revalidated
+        cache_control = httpcache.REVALIDATE
+        etag = httpcache.make_etag('diff', base_id, target_id, len(logs['base'][1]), len(logs['target'][1]), max_lines)
+        if httpcache.is_not_modified(request, etag):
+            return httpcache.not_modified(etag, cache_control)
+        
+        from logdiff import diff_logs as compute_diff
+        arguments = {}
+        for role, (file_id, lines, record) in logs.items():
+            arguments[f"{role}_lines"] = lines
+            arguments[f"{role}_hashes"] = get_line_hashes(file_id, lines)
+            arguments[f"{role}_errors"] = [line for line, level in record["errors"] if level == "Error"]
+        with ANALYSIS_STAGE_SECONDS.time(stage='diff'), span('diff.compare'):
+            result = compute_diff(max_lines=max_lines, **arguments)
+        
+        result.update(base_id=base_id, target_id=target_id)
+        return httpcache.cached(jsonify(result), etag, cache_control)
+    
+    except Exception as e:
+        app.logger.error(f"Error diffing logs: {str(e)}")
+        return jsonify({"error": f"Failed to diff logs: {str(e)}"}), 500
+
+@app.route('/log/<file_id>/traces')
+def list_stack_traces(file_id):
+    """Line ranges, exception types and root-cause frames of every stack trace in a log"""
+    try:
+        return jsonify({
+            "file_id": file_id,
+            "stack_traces": get_storage().get_stack_traces(file_id)
+        })
+    except Exception as e:
+        app.logger.error(f"Error listing stack traces: {str(e)}")
+        return jsonify({"error": f"Failed to list stack traces: {str(e)}"}), 500
+
+@app.route('/log/<file_id>/traces/<int:line_number>')
+def get_stack_trace(file_id, line_number):
+    """
+    The whole stack trace containing line_number (or starting within ?lookahead= lines
+    after it) with its lines, e.g. to expand an error in the UI
+    """
+    lookahead = min(max(request.args.get('lookahead', 0, type=int), 0), STACK_TRACE_LOOKAHEAD)
+    block = find_stack_trace(file_id, line_number, lookahead)
+    if block is None:
+        return jsonify({"error": "No stack trace at this line"}), 404
+    
+    lines = get_cached_lines(file_id)
+    if lines is None:
+        return jsonify({"error": "Log session expired"}), 404
+    
+    cache_control = log_cache_policy(file_id, block['end'] + 1, len(lines))
+    etag = httpcache.make_etag(file_id, 'trace', block['start'], block['end'], len(lines))
+    if httpcache.is_not_modified(request, etag):
+        return httpcache.not_modified(etag, cache_control)
+    
+    return httpcache.cached(jsonify(dict(block, lines=lines[block['start']:block['end'] + 1])), etag, cache_control)
+
 @app.route('/log-context/<file_id>/<int:start>/<int:end>')
 def get_log_context(file_id, start, end):
-    if file_id not in LOG_CACHE:
+    lines = get_cached_lines(file_id)
+    if lines is None:
         return jsonify({'error': 'Log session expired'}), 404
     
-    lines = LOG_CACHE[file_id]
     start = max(0, start)
     end = min(len(lines), end)
     
-    return jsonify({
+    cache_control = log_cache_policy(file_id, end, len(lines))
+    etag = httpcache.make_etag(file_id, 'context', start, end, len(lines))
+    if httpcache.is_not_modified(request, etag):
+        return httpcache.not_modified(etag, cache_control)
+    
+    return httpcache.cached(jsonify({
         'lines': lines[start:end],
         'start': start,
         'end': end,
         'total_lines': len(lines)
-    })
+    }), etag, cache_control)
+
+def is_live_log(file_id):
+    """Whether file_id is a live log that is still being appended to"""
+    tail_session = TAIL_SESSIONS.get(file_id)
+    return tail_session is not None and not tail_session.done
+
+def log_cache_policy(file_id, end, total):
+    """
+    Caching policy for a range of a log's lines ending at end, of total lines. Lines
+    never change once written, but a live log grows and /log/<file_id>/append can
+    reopen a finished one, so a range reaching the end of the log is revalidated.
+    """
+    if is_live_log(file_id) or end >= total:
+        return httpcache.REVALIDATE
+    return httpcache.IMMUTABLE
 
 @app.route('/log/<file_id>/preview')
 def log_preview(file_id):
     """Get a preview of the log file content with pagination"""
     try:
-        if file_id not in LOG_CACHE:
+        lines = get_cached_lines(file_id)
+        if lines is None:
             return jsonify({
                 "error": "Log file not found"
             }), 404
             
-        lines = LOG_CACHE[file_id]
         position = int(request.args.get('position', 0))
         
         # Calculate start and end positions
         start_line = max(0, position)
         end_line = min(len(lines), start_line + 40)  # Show 40 lines at a time
         
+        # The lines of a range never change, so a client scrolling back already has them
+        cache_control = log_cache_policy(file_id, end_line, len(lines))
+        etag = httpcache.make_etag(file_id, 'preview', start_line, len(lines))
+        if httpcache.is_not_modified(request, etag):
+            return httpcache.not_modified(etag, cache_control)
+        
         # Get the preview lines
         preview_lines = lines[start_line:end_line]
         
-        # Get error and warning lines
+        # Get error and warning lines, parsed by the log's format like the analysis was
         error_lines = []
         warning_lines = []
         
-        for i in range(start_line, end_line):
-            line = lines[i] if i < len(lines) else ""
-            if is_error_line(line):
+        parse = get_format(get_log_format(file_id))().parse
+        for i, line in enumerate(preview_lines, start_line):
+            level = parse(line)[1]
+            if level == ERROR:
                 error_lines.append(i)
-            elif is_warning_line(line):
+            elif level == WARNING:
                 warning_lines.append(i)
         
-        return jsonify({
+        return httpcache.cached(jsonify({
             "start_line": start_line,
             "end_line": end_line,
             "total_lines": len(lines),
             "lines": preview_lines,
             "error_lines": error_lines,
             "warning_lines": warning_lines
-        })
+        }), etag, cache_control)
     except Exception as e:
         app.logger.error(f"Error getting log preview: {str(e)}")
         return jsonify({
             "error": f"Failed to get log preview: {str(e)}"
         }), 500
 
-# Helper functions for error and warning detection
-def is_error_line(line):
-    """Check if a line contains an error pattern"""
-    return ERROR_PATTERN.search(line) is not None
+def get_log_format(file_id):
+    """
+    Name of the format a log was analyzed in: its live analyzer's, or the one in its
+    stored analysis; DEFAULT_FORMAT for logs analyzed before formats existed
+    """
+    tail_session = TAIL_SESSIONS.get(file_id)
+    if tail_session is not None and tail_session.analyzer.log_format is not None:
+        return tail_session.analyzer.log_format.name
+    
+    log_format = LOG_FORMATS.get(file_id)
+    if log_format is None:
+        log_format = DEFAULT_FORMAT
+        try:
+            record = get_storage().get_log(file_id)
+        except Exception as e:
+            app.logger.error(f"Error loading the log format of {file_id}: {str(e)}")
+            return log_format
+        if record is None:
+            # Still being analyzed: look again once the analysis is stored
+            return log_format
+        if isinstance(record['content'], dict):
+            log_format = record['content'].get('log_format') or DEFAULT_FORMAT
+        LOG_FORMATS[file_id] = log_format
+    return log_format if log_format in FORMATS else DEFAULT_FORMAT
+
+# Page size of /history when not given, and the largest allowed
+HISTORY_PAGE_SIZE = 10
+MAX_HISTORY_PAGE_SIZE = 100
+
+def encode_history_cursor(position):
+    """Opaque cursor for the page after the log at position (see LogStorage.get_history)"""
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode('utf-8')).decode('ascii')
+
+def decode_history_cursor(cursor):
+    """
+    Raises:
+        ValueError: The cursor wasn't made by encode_history_cursor()
+    """
+    try:
+        upload_time, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (TypeError, ValueError, UnicodeError, binascii.Error) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(upload_time, str) or not isinstance(log_id, str):
+        raise ValueError("Invalid cursor")
+    return upload_time, log_id
+
+def parse_history_day(name):
+    """
+    The YYYY-MM-DD date in request argument name, or None if it isn't given
 
-def is_warning_line(line):
-    """Check if a line contains a warning pattern"""
-    return WARNING_PATTERN.search(line) is not None
+    Raises:
+        ValueError: The argument isn't a date
+    """
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
 
 @app.route('/history')
 def get_history():
-    with get_db() as db:
-        try:
-            cursor = db.cursor()
-            cursor.execute('''
-                SELECT log_id, file_name, source_type, upload_time, error_count, warning_count 
-                FROM log_files
-                ORDER BY upload_time DESC
-                LIMIT 10
-            ''')
-            
-            records = cursor.fetchall()
-            history = []
-            
-            for record in records:
-                history.append({
-                    'id': record[0],
-                    'file_name': record[1],
-                    'source_type': record[2],
-                    'upload_time': record[3],
-                    'error_count': record[4],
-                    'warning_count': record[5]
-                })
-                
-            return jsonify(history)
-            
-        except sqlite3.Error as e:
-            app.logger.error(f"Database error retrieving history: {str(e)}")
-            return jsonify([])
+    """
+    Analyzed logs, newest first. Supports ?limit=, ?source=, ?name= (part of the file
+    name) and ?since=/?until= (dates, inclusive); the cursor for the next page, if
+    there is one, is in the X-Next-Cursor header and is passed back as ?cursor=.
+    """
+    try:
+        limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), MAX_HISTORY_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        before = decode_history_cursor(cursor) if cursor else None
+        since = parse_history_day('since')
+        until = parse_history_day('until')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        # One extra record tells whether there is a next page
+        records = get_storage().get_history(
+            limit=limit + 1,
+            before=before,
+            source_type=request.args.get('source'),
+            name=request.args.get('name'),
+            since=since.isoformat() if since else None,
+            until=(until + datetime.timedelta(days=1)).isoformat() if until else None
+        )
+        history = []
+        
+        for record in records[:limit]:
+            history.append({
+                'id': record['log_id'],
+                'file_name': record['file_name'],
+                'source_type': record['source_type'],
+                'upload_time': record['upload_time'],
+                'error_count': record['error_count'],
+                'warning_count': record['warning_count']
+            })
+        
+        response = jsonify(history)
+        if len(records) > limit:
+            response.headers['X-Next-Cursor'] = encode_history_cursor(records[limit - 1]['position'])
+        return response
+        
+    except Exception as e:
+        app.logger.error(f"Database error retrieving history: {str(e)}")
+        return jsonify([])
+
+@app.route('/history/summary')
+def get_history_summary():
+    """
+    Totals per day and per job and the most frequent error types, from the summary
+    tables kept up to date as logs are saved. Supports ?since=/?until= (dates,
+    inclusive), ?top= error types and ?jobs= jobs.
+    """
+    try:
+        since = parse_history_day('since')
+        until = parse_history_day('until')
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        summary = get_storage().get_history_summary(
+            since=since.isoformat() if since else None,
+            until=until.isoformat() if until else None,
+            top_error_types=min(max(request.args.get('top', 10, type=int), 1), 100),
+            jobs=min(max(request.args.get('jobs', 20, type=int), 1), 1000)
+        )
+        summary["totals"] = {
+            field: sum(day[field] for day in summary["days"]) for field in ("logs", "errors", "warnings")
+        }
+        return jsonify(summary)
+    except Exception as e:
+        app.logger.error(f"Database error retrieving history summary: {str(e)}")
+        return jsonify({"error": f"Failed to retrieve history summary: {str(e)}"}), 500
+
+@app.route('/history/summary/rebuild', methods=['POST'])
+def rebuild_history_summary():
+    """Recompute the history summaries from the stored logs, e.g. after retention deleted some"""
+    try:
+        return jsonify({"logs": get_storage().rebuild_history_summary()})
+    except Exception as e:
+        app.logger.error(f"Error rebuilding history summary: {str(e)}")
+        return jsonify({"error": f"Failed to rebuild history summary: {str(e)}"}), 500
 
 @app.route('/log/<log_id>')
 def get_log_by_id(log_id):
     """Get a log analysis by its ID from the database"""
     try:
-        with get_db() as db:
-            cursor = db.cursor()
-            
-            # Get the log file record
-            cursor.execute('''
-                SELECT log_id, file_name, source_type, upload_time, error_count, warning_count, content 
-                FROM log_files 
-                WHERE log_id = ?
-            ''', (log_id,))
-            
-            log_record = cursor.fetchone()
-            
-            if not log_record:
-                return jsonify({"error": "Log not found"}), 404
-                
-            # Get the error lines
-            cursor.execute('''
-                SELECT line_number, level
-                FROM log_errors
-                WHERE log_id = ?
-            ''', (log_id,))
-            
-            error_lines = cursor.fetchall()
-            
-            # Process the stored data
-            lines = json.loads(log_record[6])  # Content column
-            
-            # Store in cache for preview and other operations
-            file_id = log_record[0]
-            LOG_CACHE[file_id] = lines
-            
-            # Count errors by type
-            error_counts = {"Error": 0, "Warning": 0, "Info": 0}
-            error_lines_list = []
-            warning_lines_list = []
-            
-            for line_number, level in error_lines:
-                if level in error_counts:
-                    error_counts[level] += 1
-                
-                if level == "Error":
-                    error_lines_list.append(line_number)
-                elif level == "Warning":
-                    warning_lines_list.append(line_number)
-            
-            # Prepare the result
-            result = {
-                "file_id": file_id,
-                "name": log_record[1],
-                "source_type": log_record[2],
-                "upload_time": log_record[3],
-                "line_count": len(lines),
-                "error_counts": error_counts,
-                "error_lines": error_lines_list,
-                "warning_lines": warning_lines_list
-            }
+        # Get the log file record with its error lines
+        log_record = get_storage().get_log(log_id)
+        
+        if not log_record:
+            return jsonify({"error": "Log not found"}), 404
+        
+        # The stored content is the analysis, not the lines: previews and context read
+        # the lines from the cache or the shared store, and 404 once they're gone
+        file_id = log_record["log_id"]
+        content = log_record["content"] if isinstance(log_record["content"], dict) else {}
+        line_count = content.get("line_count")
+        if line_count is None:
+            lines = get_cached_lines(file_id)
+            line_count = len(lines) if lines is not None else 0
+        
+        # Count errors by type
+        error_counts = {"Error": 0, "Warning": 0, "Info": 0}
+        error_lines_list = []
+        warning_lines_list = []
+        
+        for line_number, level in log_record["errors"]:
+            if level in error_counts:
+                error_counts[level] += 1
             
-            return jsonify(result)
+            if level == "Error":
+                error_lines_list.append(line_number)
+            elif level == "Warning":
+                warning_lines_list.append(line_number)
+        
+        # Prepare the result
+        result = {
+            "file_id": file_id,
+            "name": log_record["file_name"],
+            "source_type": log_record["source_type"],
+            "upload_time": log_record["upload_time"],
+            "line_count": line_count,
+            "error_counts": error_counts,
+            "error_lines": error_lines_list,
+            "warning_lines": warning_lines_list
+        }
+        
+        return jsonify(result)
     
     except Exception as e:
         app.logger.error(f"Error retrieving log by ID: {str(e)}")
         return jsonify({"error": f"Failed to retrieve log: {str(e)}"}), 500
 
-def store_analysis(source, analysis):
-    db = get_db()
-    db.execute(
-        'INSERT INTO log_history (source, name, error_count, warning_count, summary, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
-        (source, 'Log Analysis', analysis['error_counts']['Error'], analysis['error_counts']['Warning'],
-         json.dumps({'error_counts': analysis['error_counts'], 'critical_lines': analysis['critical_lines']}),
-         datetime.datetime.now())
-    )
-    db.commit()
-    app.logger.info("Analysis saved to database")
+@app.route('/retention', methods=['GET'])
+def retention_status():
+    """Show the retention policy and the result of the last background run"""
+    return jsonify({
+        "policy": get_retention_policy().model_dump(),
+        "interval": app.config['RETENTION_INTERVAL'],
+        "last_report": get_retention_scheduler().last_report
+    })
+
+@app.route('/retention/run', methods=['POST'])
+def retention_run():
+    """Run the retention job now and report what was reclaimed"""
+    try:
+        report = run_retention_job()
+        get_retention_scheduler().last_report = report
+        return jsonify(report)
+    except Exception as e:
+        app.logger.error(f"Retention run failed: {str(e)}")
+        return jsonify({"error": f"Retention run failed: {str(e)}"}), 500
 
 @app.route('/chat', methods=['POST'])
 def chat():
@@ -741,31 +1483,15 @@ def chat():
         context = None
         if file_id:
             try:
-                # Get log analysis from database
-                db = get_db()
-                cursor = db.cursor()
-                cursor.execute(
-                    "SELECT analysis FROM log_analysis WHERE file_id = ?", 
-                    (file_id,)
-                )
-                result = cursor.fetchone()
-                
-                if result and result[0]:
-                    analysis = json.loads(result[0])
-                    
-                    # Create a context for the LLM
-                    context = {
-                        "log_name": analysis.get("name", "Unknown"),
-                        "error_count": analysis.get("error_counts", {}).get("Error", 0),
-                        "warning_count": analysis.get("error_counts", {}).get("Warning", 0),
-                        "build_stages": analysis.get("build_stages", {}),
-                        "critical_lines": analysis.get("critical_lines", [])[:5]  # Limit to 5 critical lines
-                    }
+                context_started = time.perf_counter()
+                context = get_chat_context(file_id)
+                ANALYSIS_STAGE_SECONDS.observe(time.perf_counter() - context_started, stage='context')
+                record_span('llm.context', time.perf_counter() - context_started)
             except Exception as e:
                 app.logger.error(f"Error getting log context: {str(e)}")
         
         # Check if LLM is available
-        if not LLM_AVAILABLE:
+        if not llm_available():
             return jsonify({
                 "response": "I'm sorry, the AI service is currently unavailable. Please try again later."
             })
@@ -778,11 +1504,7 @@ def chat():
             prompt = f"""You are an AI assistant helping with Jenkins log analysis. 
             
 The user has analyzed a log file with the following information:
-- Log name: {context['log_name']}
-- Error count: {context['error_count']}
-- Warning count: {context['warning_count']}
-- Build stages: {json.dumps(context['build_stages'], indent=2)}
-- Some critical lines: {json.dumps(context['critical_lines'], indent=2)}
+{context['text']}
 
 The user's message is: "{message}"
 
@@ -800,6 +1522,9 @@ Provide a helpful response. If you don't know the answer, say so.
         # Get response from LLM
         llm_response = get_llm_analysis(prompt)
         
+        import bleach
+        import markdown
+        
         # Check if the response contains HTML tags
         contains_html = '<ul>' in llm_response or '<ol>' in llm_response or '<li>' in llm_response
         
@@ -827,77 +1552,176 @@ def store_chat_message(file_id, user_message, llm_message):
     Store chat messages in the database
     """
     try:
-        db = get_db()
-        db.execute(
-            'INSERT INTO chat_history (file_id, user_message, llm_message) VALUES (?, ?, ?)',
-            (file_id, user_message, llm_message)
-        )
-        db.commit()
+        get_storage().store_chat_message(file_id, user_message, llm_message)
     except Exception as e:
         app.logger.error(f"Failed to store chat message: {str(e)}")
 
 def auto_analyze_errors(file_id, error_lines):
     """
-    Automatically analyze error lines and store solutions
+    Queue the LLM analysis of a log's error lines, returning the lines it covers. Only
+    the first AUTO_ANALYSIS_MAX_ERRORS distinct errors are analyzed; lines repeating one
+    of them (same normalized text) share its solution.
     """
-    if not error_lines or not file_id in LOG_CACHE:
-        return
+    if not error_lines:
+        return []
     
-    lines = LOG_CACHE[file_id]
+    lines = get_cached_lines(file_id)
+    if lines is None:
+        return []
     
-    for error_line_num in error_lines[:5]:  # Limit to first 5 errors to avoid overloading
-        if error_line_num < len(lines):
-            error_text = lines[error_line_num]
-            
-            # Get context around the error
-            start_idx = max(0, error_line_num - 5)
-            end_idx = min(len(lines), error_line_num + 5)
-            context = "\n".join(lines[start_idx:end_idx])
-            
-            # Create prompt for error analysis
-            prompt = f"""
-You are a Jenkins log error analyzer. 
-Analyze this error and provide a precise solution:
+    from logdiff import normalize
+    
+    # Line numbers of each distinct error, in the order first seen
+    groups = {}
+    for error_line_num in error_lines:
+        if error_line_num >= len(lines):
+            continue
+        signature = normalize(lines[error_line_num].strip())
+        if signature in groups:
+            groups[signature].append(error_line_num)
+        elif len(groups) < app.config['AUTO_ANALYSIS_MAX_ERRORS']:
+            groups[signature] = [error_line_num]
+    groups = list(groups.values())
+    
+    with _pending_lock:
+        for numbers in groups:
+            for error_line_num in numbers:
+                PENDING_ANALYSES.setdefault((file_id, error_line_num), Future())
+    _auto_analysis_executor.submit(run_auto_analysis, file_id, groups)
+    return [error_line_num for numbers in groups for error_line_num in numbers]
 
-Error line: {error_text}
+def run_auto_analysis(file_id, groups):
+    """
+    Analyze the errors queued by auto_analyze_errors() and store their solutions, as
+    the JSON /llm/analyze returns as its result, if the LLM is available. The errors go
+    to the LLM in batches, and each batch's lines are released to waiting clicks as
+    soon as it's done. Errors clicked while still queued are left to the click.
+    """
+    remaining = list(groups)
+    try:
+        if not llm_available():
+            return
+        from llm_service import LLM_BATCH_SIZE, analyze_errors, extract_error_context
+        
+        lines = get_cached_lines(file_id)
+        if lines is None:
+            return
+        
+        while remaining:
+            batch = start_pending_analyses(file_id, remaining[:LLM_BATCH_SIZE])
+            if batch:
+                with ANALYSIS_STAGE_SECONDS.time(stage='context'):
+                    contexts = [
+                        extract_error_context(lines, numbers[0],
+                                              stack_trace=find_stack_trace(file_id, numbers[0], STACK_TRACE_LOOKAHEAD))
+                        for numbers in batch
+                    ]
+                
+                for numbers, analysis in zip(batch, analyze_errors(contexts)):
+                    if "error" in analysis:
+                        app.logger.error(f"Auto-analysis of line {numbers[0]} in {file_id} failed: {analysis['error']}")
+                    else:
+                        for error_line_num in numbers:
+                            store_error_solution(file_id, error_line_num, lines[error_line_num], json.dumps(analysis))
+                    release_pending_analyses(file_id, numbers, analysis)
+            remaining = remaining[LLM_BATCH_SIZE:]
+    except Exception as e:
+        app.logger.error(f"Auto-analysis of {file_id} failed: {str(e)}")
+    finally:
+        # Clicks waiting on lines that weren't analyzed analyze them themselves
+        for numbers in remaining:
+            release_pending_analyses(file_id, numbers, None)
 
-Context:
-{context}
+def start_pending_analyses(file_id, groups):
+    """
+    Mark the lines of groups as going to the LLM, so clicks on them wait for the result,
+    and return the groups that still have a line nobody clicked while it was queued
+    """
+    started = []
+    with _pending_lock:
+        for numbers in groups:
+            futures = [PENDING_ANALYSES.get((file_id, line_number)) for line_number in numbers]
+            futures = [future for future in futures if future is not None]
+            for future in futures:
+                future.set_running_or_notify_cancel()
+            if futures:
+                started.append(numbers)
+    return started
 
-Provide a concrete solution for this error. Be specific and practical. If possible, include code examples or commands that could fix the issue.
-"""
-            
-            # Call LLM service
-            solution = get_llm_analysis(prompt)
-            
-            # Store solution in database
-            store_error_solution(file_id, error_line_num, error_text, solution)
+def release_pending_analyses(file_id, line_numbers, analysis):
+    """Hand the pre-analysis of lines (None if there's none) to the clicks waiting for it"""
+    with _pending_lock:
+        futures = [PENDING_ANALYSES.pop((file_id, line_number), None) for line_number in line_numbers]
+    for future in futures:
+        if future is not None:
+            future.set_result(analysis)
+
+def get_precomputed_analysis(file_id, line_number):
+    """
+    The auto-analysis of an error line, waiting up to AUTO_ANALYSIS_WAIT seconds if it's
+    with the LLM. A line still queued behind other logs is taken off the queue instead,
+    for the caller to analyze now rather than wait its turn.
+
+    Returns:
+        (analysis, status) with status 'precomputed' for a stored solution or 'joined'
+        for one that was in progress, or (None, None) if there's neither
+    """
+    with _pending_lock:
+        future = PENDING_ANALYSES.get((file_id, line_number))
+        if future is not None and not future.running():
+            del PENDING_ANALYSES[(file_id, line_number)]
+            future.cancel()
+            return None, None
+    if future is not None:
+        try:
+            analysis = future.result(timeout=app.config['AUTO_ANALYSIS_WAIT'])
+        except FutureTimeoutError:
+            analysis = None
+        if analysis is not None and "error" not in analysis:
+            return analysis, 'joined'
+        return None, None
+    
+    try:
+        solution = get_storage().get_error_solution(file_id, line_number)
+    except Exception as e:
+        app.logger.error(f"Failed to look up error solution: {str(e)}")
+        return None, None
+    try:
+        analysis = json.loads(solution) if solution else None
+    except ValueError:
+        analysis = None  # free text from before solutions were stored as JSON
+    if isinstance(analysis, dict) and "error_summary" in analysis:
+        return analysis, 'precomputed'
+    return None, None
 
 def store_error_solution(file_id, line_number, error_text, solution):
     """
     Store error solutions in the database
     """
     try:
-        db = get_db()
-        db.execute(
-            'INSERT INTO error_solutions (file_id, line_number, error_text, solution) VALUES (?, ?, ?, ?)',
-            (file_id, line_number, error_text, solution)
-        )
-        db.commit()
+        get_storage().store_error_solution(file_id, line_number, error_text, solution)
     except Exception as e:
         app.logger.error(f"Failed to store error solution: {str(e)}")
 
-def save_analysis_to_db(source, name, analysis):
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute(
-        'INSERT INTO log_history (source, name, error_count, warning_count, summary, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
-        (source, name, analysis['error_counts']['Error'], analysis['error_counts']['Warning'],
-         json.dumps({'error_counts': analysis['error_counts'], 'critical_lines': analysis['critical_lines']}),
-         datetime.datetime.now())
-    )
-    db.commit()
-    return cursor.lastrowid
+def create_app(config=None):
+    """
+    Prepare the app to serve requests: apply config overrides, create the schema and
+    start the background work. Used by the development server and by each worker
+    process of a WSGI server (see wsgi.py and gunicorn.conf.py).
+    """
+    if config:
+        app.config.update(config)
+    
+    # Initialize database
+    with app.app_context():
+        init_db()
+    
+    # Start background retention if any limit is configured
+    if get_retention_policy().is_enabled() and app.config['RETENTION_INTERVAL'] > 0:
+        get_retention_scheduler().start()
+    
+    warm_llm_status()
+    return app
 
 if __name__ == '__main__':
     # Parse command line arguments
@@ -907,9 +1731,7 @@ if __name__ == '__main__':
     parser.add_argument('--https', action='store_true', help='Run with HTTPS')
     args = parser.parse_args()
     
-    # Initialize database
-    with app.app_context():
-        init_db()
+    create_app()
     
     # Check if SSL certificates exist
     cert_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'certs', 'cert.pem')
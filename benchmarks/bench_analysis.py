@@ -0,0 +1,89 @@
+"""
+Micro-benchmarks of the analysis pipeline on a synthetic log
+
+Usage:
+    python benchmarks/bench_analysis.py [--lines 100000] [--repeat 5] [--requests 200]
+                                        [--output results.json] [loggen options]
+
+Times analyze_log() end to end, the analyzer on its own, extract_error_context() and the
+/log/<id>/preview and /log-context endpoints.
+"""
+
+import os
+import random
+import argparse
+import tempfile
+
+from harness import emit, measure
+from loggen import add_spec_arguments, generate_log, spec_from_args
+
+
+def lines_per_second(stats, line_count):
+    return round(line_count / (stats["mean_ms"] / 1000), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_spec_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each whole-log benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='Calls of each per-line benchmark')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    from app import LOG_CACHE, analyze_log, app, init_db
+    from analyzer import LogAnalyzer
+    from llm_service import extract_error_context
+
+    spec = spec_from_args(args)
+    text = generate_log(spec)
+    lines = text.splitlines()
+    rng = random.Random(spec.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'logs.db')
+        app.config['LOG_STORE_DIR'] = os.path.join(tmp, 'log_store')
+        init_db()
+
+        def run_analyze_log():
+            result = analyze_log(text)
+            LOG_CACHE.pop(result['file_id'], None)
+
+        analyze_stats = measure(run_analyze_log, args.repeat)
+        classify_stats = measure(lambda: LogAnalyzer('bench').feed(lines), args.repeat)
+
+        result = analyze_log(text)
+        file_id = result['file_id']
+        analyzer = LogAnalyzer(file_id)
+        analyzer.feed(lines)
+        error_lines = analyzer.error_lines or [0]
+
+        context_stats = measure(lambda: extract_error_context(lines, rng.choice(error_lines)), args.requests)
+
+        client = app.test_client()
+
+        def get(url):
+            response = client.get(url)
+            assert response.status_code == 200, (url, response.status_code)
+
+        preview_stats = measure(lambda: get(f'/log/{file_id}/preview?position={rng.randrange(len(lines))}'),
+                                args.requests)
+
+        def get_context():
+            start = rng.randrange(len(lines))
+            get(f'/log-context/{file_id}/{start}/{start + 100}')
+
+        log_context_stats = measure(get_context, args.requests)
+
+        emit('analysis', {
+            "log": {"lines": len(lines), "bytes": len(text.encode('utf-8')),
+                    "error_lines": len(analyzer.error_lines), "warning_lines": len(analyzer.warning_lines)},
+            "analyze_log": dict(analyze_stats, lines_per_second=lines_per_second(analyze_stats, len(lines))),
+            "classify": dict(classify_stats, lines_per_second=lines_per_second(classify_stats, len(lines))),
+            "extract_error_context": context_stats,
+            "preview_endpoint": preview_stats,
+            "log_context_endpoint": log_context_stats,
+        }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark /history, /history/summary and /log/<id> latency against a large logs.db
+
+Usage:
+    python benchmarks/bench_history.py [--logs 100000] [--requests 200] [--untuned] [--output results.json]
+
+--untuned skips the pragmas and index migrations so the two setups can be compared (and
+so has no summary tables to time).
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+
+from harness import emit, latency_stats
+
+import database
+
+
+def populate(conn, log_count, errors_per_log=20):
+    """Insert log_count synthetic log_files rows with errors_per_log log_errors each"""
+    content = json.dumps([f"[Pipeline] line {i} ERROR: something failed" for i in range(50)])
+    log_ids = []
+    batch = 5000
+    for offset in range(0, log_count, batch):
+        files = []
+        errors = []
+        for n in range(offset, min(log_count, offset + batch)):
+            log_id = str(uuid.uuid4())
+            log_ids.append(log_id)
+            upload_time = f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d} 00:{n // 60 % 60:02d}:{n % 60:02d}"
+            files.append((log_id, f"build-{n}.log", "file", upload_time, errors_per_log, 0, content))
+            errors.extend((log_id, line, "Error") for line in range(errors_per_log))
+        conn.executemany(
+            'INSERT INTO log_files (log_id, file_name, source_type, upload_time, error_count, warning_count, content) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', files)
+        conn.executemany('INSERT INTO log_errors (log_id, line_number, level) VALUES (?, ?, ?)', errors)
+        conn.commit()
+    return log_ids
+
+
+def timed(client, url, count):
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.get(url() if callable(url) else url)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.status_code
+    return latency_stats(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logs', type=int, default=100000, help='Number of stored logs')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint')
+    parser.add_argument('--untuned', action='store_true', help='Disable pragmas and index migrations')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    if args.untuned:
+        database.SQLITE_PRAGMAS.clear()
+        database.MIGRATIONS.clear()
+
+    from app import app, init_db
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'logs.db')
+        init_db()
+
+        conn = database.connect(app.config['DATABASE'])
+        start = time.perf_counter()
+        log_ids = populate(conn, args.logs)
+        conn.close()
+        populate_s = time.perf_counter() - start
+
+        client = app.test_client()
+        # A page deep into the history, reached by its cursor
+        response = client.get('/history?limit=100')
+        for _ in range(20):
+            response = client.get(f"/history?limit=100&cursor={response.headers['X-Next-Cursor']}")
+        deep_page = f"/history?limit=100&cursor={response.headers['X-Next-Cursor']}"
+
+        results = {
+            "logs": args.logs,
+            "tuned": not args.untuned,
+            "populate_s": round(populate_s, 2),
+            "history": timed(client, '/history', args.requests),
+            "history_deep_page": timed(client, deep_page, args.requests),
+            "history_filtered": timed(client, '/history?since=2024-03-01&until=2024-03-31&name=build-1', args.requests),
+            "log_by_id": timed(client, lambda: f'/log/{random.choice(log_ids)}', args.requests),
+        }
+        if not args.untuned:
+            # Rows were inserted directly, so the summaries are built the way an upgrade does
+            from app import get_storage
+            start = time.perf_counter()
+            get_storage().rebuild_history_summary()
+            results["summary_rebuild_s"] = round(time.perf_counter() - start, 2)
+            results["summary"] = timed(client, '/history/summary?since=2024-01-01&until=2024-12-31', args.requests)
+        emit('history', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+End-to-end load test of the Flask app with a mock LLM server
+
+Usage:
+    python benchmarks/bench_load.py [--clients 8] [--duration 30] [--llm-latency 0.2]
+                                    [--lines 20000] [--output results.json] [loggen options]
+
+Serves the app on a local port and has concurrent clients upload logs, page through
+previews, read the history and ask the (mock) LLM about errors, served by a mock LLM
+on --llm-port.
+"""
+
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from harness import emit, latency_stats
+from loggen import add_spec_arguments, generate_log, spec_from_args
+from mock_llm import start_mock_llm
+
+# Relative frequency of each request type
+SCENARIO_WEIGHTS = {
+    "analyze": 1,
+    "preview": 10,
+    "history": 4,
+    "llm_analyze": 2,
+    "chat": 1,
+}
+
+
+class LoadClient:
+    """One simulated user working against the app"""
+
+    def __init__(self, base_url, log_text, seed):
+        self.base_url = base_url
+        self.log_text = log_text
+        self.rng = random.Random(seed)
+        self.session = requests.Session()
+        self.file_id = None
+        self.line_count = 0
+        self.error_lines = []
+
+    def analyze(self):
+        response = self.session.post(f"{self.base_url}/analyze",
+                                     files={'file': ('bench.log', self.log_text)},
+                                     data={'async': 'false'})
+        if response.status_code == 200:
+            result = response.json()
+            self.file_id = result['file_id']
+            self.line_count = result['line_count']
+            self.error_lines = [line['line'] for line in result['critical_lines'] if line['type'] == 'error']
+        return response
+
+    def preview(self):
+        position = self.rng.randrange(max(1, self.line_count))
+        return self.session.get(f"{self.base_url}/log/{self.file_id}/preview", params={'position': position})
+
+    def history(self):
+        return self.session.get(f"{self.base_url}/history")
+
+    def llm_analyze(self):
+        line = self.rng.choice(self.error_lines or [0])
+        return self.session.get(f"{self.base_url}/llm/analyze/{self.file_id}/{line}")
+
+    def chat(self):
+        return self.session.post(f"{self.base_url}/chat",
+                                 json={'message': 'Why did this build fail?', 'file_id': self.file_id})
+
+
+def run_client(client, deadline, samples, errors, lock):
+    scenarios = list(SCENARIO_WEIGHTS)
+    weights = [SCENARIO_WEIGHTS[name] for name in scenarios]
+    while time.perf_counter() < deadline:
+        name = 'analyze' if client.file_id is None else client.rng.choices(scenarios, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = getattr(client, name)()
+            ok = response.status_code < 500
+        except requests.RequestException:
+            ok = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            samples.setdefault(name, []).append(elapsed_ms)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_spec_arguments(parser, lines=20000)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='Seconds the mock LLM takes to answer')
+    parser.add_argument('--llm-port', type=int, default=11434, help='Port for the mock LLM server')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    llm_server = start_mock_llm(args.llm_port, args.llm_latency)
+    os.environ['LLM_API_URL'] = f"http://127.0.0.1:{args.llm_port}/api/chat"
+
+    from werkzeug.serving import make_server
+    from app import app, init_db
+
+    log_text = generate_log(spec_from_args(args))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app.config['DATABASE'] = os.path.join(tmp, 'logs.db')
+        app.config['LOG_STORE_DIR'] = os.path.join(tmp, 'log_store')
+        init_db()
+
+        server = make_server('127.0.0.1', 0, app, threaded=True)
+        threading.Thread(target=server.serve_forever, name='bench-app', daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+
+        samples, errors, lock = {}, {}, threading.Lock()
+        clients = [LoadClient(base_url, log_text, seed=args.seed + n) for n in range(args.clients)]
+        started = time.perf_counter()
+        deadline = started + args.duration
+        with ThreadPoolExecutor(max_workers=args.clients) as executor:
+            futures = [executor.submit(run_client, client, deadline, samples, errors, lock) for client in clients]
+            for future in futures:
+                future.result()
+        elapsed = time.perf_counter() - started
+
+        server.shutdown()
+        llm_server.shutdown()
+
+    total = sum(len(values) for values in samples.values())
+    emit('load', {
+        "clients": args.clients,
+        "duration_s": round(elapsed, 2),
+        "llm_latency_s": args.llm_latency,
+        "log_lines": args.lines,
+        "requests": total,
+        "requests_per_second": round(total / elapsed, 1),
+        "errors": errors,
+        "endpoints": {name: dict(latency_stats(values), errors=errors.get(name, 0))
+                      for name, values in sorted(samples.items())},
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
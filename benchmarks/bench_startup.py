@@ -0,0 +1,78 @@
+"""
+Benchmark cold start: importing app.py in a fresh interpreter
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 10] [--max-seconds 1.0] [--output results.json]
+
+The LLM is pointed at an unroutable address, so an import that waits on it shows up as
+a multi-second outlier. Exits with status 1 if the median import takes longer than
+--max-seconds or a module listed in DEFERRED_MODULES is loaded at import.
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+from harness import REPO_ROOT, emit, latency_stats
+
+# Modules that should only be imported on first use
+DEFERRED_MODULES = ('requests', 'pydantic', 'markdown', 'bleach', 'llm_service', 'retention')
+
+# Unroutable address: connecting to it hangs until the timeout instead of failing fast
+UNREACHABLE_LLM = 'http://10.255.255.1:11434/api/chat'
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.app.test_client().get('/')
+first_request = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (first_request - imported) * 1000,
+    "modules": sorted(name for name in %r if name in sys.modules),
+}))
+"""
+
+
+def run_once(env):
+    result = subprocess.run([sys.executable, '-c', PROBE % (DEFERRED_MODULES,)], cwd=REPO_ROOT, env=env,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Fresh interpreters to start')
+    parser.add_argument('--max-seconds', type=float, default=1.0, help='Allowed median import time')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    env = dict(os.environ, LLM_API_URL=UNREACHABLE_LLM, PYTHONDONTWRITEBYTECODE='1')
+    runs = [run_once(env) for _ in range(args.runs)]
+    eager_modules = sorted({name for run in runs for name in run["modules"]})
+
+    import_stats = latency_stats([run["import_ms"] for run in runs])
+    emit('startup', {
+        "import": import_stats,
+        "first_request": latency_stats([run["first_request_ms"] for run in runs]),
+        "eager_modules": eager_modules,
+    }, args.output)
+
+    failed = False
+    if import_stats["p50_ms"] > args.max_seconds * 1000:
+        print(f"FAIL median import took {import_stats['p50_ms']}ms (limit {args.max_seconds * 1000:.0f}ms)")
+        failed = True
+    if eager_modules:
+        print(f"FAIL modules loaded at import: {', '.join(eager_modules)}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Benchmark /analyze throughput against the number of gunicorn worker processes
+
+Usage:
+    python benchmarks/bench_workers.py [--workers 1 2 4] [--clients 8] [--duration 20]
+                                       [--lines 20000] [--output results.json] [loggen options]
+
+Starts gunicorn with gunicorn.conf.py once per worker count, on a fresh database, and
+has concurrent clients upload the same synthetic log with async=false. Scaling
+efficiency is requests/sec relative to one worker, divided by the worker count; it
+can't exceed the number of CPUs the machine has.
+
+Near-linear scaling (efficiency of about 1 per worker) can only be shown on a machine
+with at least as many CPUs as workers. Runs with more workers than CPUs are marked
+"oversubscribed" and a line after the results says the scaling wasn't measured.
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from harness import REPO_ROOT, emit, latency_stats
+from loggen import add_spec_arguments, generate_log, spec_from_args
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(workers, port, data_dir):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}",
+               DATABASE_PATH=os.path.join(data_dir, 'logs.db'),
+               LOG_STORE_DIR=os.path.join(data_dir, 'log_store'), LOG_LEVEL='warning',
+               # Never reached: analysis doesn't talk to the LLM
+               LLM_API_URL='http://127.0.0.1:9/api/chat')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+        try:
+            requests.get(f"{base_url}/history", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("gunicorn didn't start within 60s")
+
+
+def run_client(base_url, log_text, deadline, samples, errors, lock):
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = session.post(f"{base_url}/analyze", files={'file': ('bench.log', log_text)},
+                              data={'async': 'false'}).status_code == 200
+        except requests.RequestException:
+            ok = False
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with lock:
+            if ok:
+                samples.append(elapsed_ms)
+            else:
+                errors[0] += 1
+
+
+def measure_workers(workers, args, log_text):
+    with tempfile.TemporaryDirectory() as tmp:
+        process, base_url = start_gunicorn(workers, free_port(), tmp)
+        try:
+            # Warm every worker up before timing
+            for _ in range(workers * 2):
+                requests.post(f"{base_url}/analyze", files={'file': ('warmup.log', log_text)},
+                              data={'async': 'false'})
+
+            samples, errors, lock = [], [0], threading.Lock()
+            started = time.perf_counter()
+            deadline = started + args.duration
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                futures = [executor.submit(run_client, base_url, log_text, deadline, samples, errors, lock)
+                           for _ in range(args.clients)]
+                for future in futures:
+                    future.result()
+            elapsed = time.perf_counter() - started
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+    return {
+        "workers": workers,
+        "requests": len(samples),
+        "errors": errors[0],
+        "requests_per_second": round(len(samples) / elapsed, 2),
+        "latency": latency_stats(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_spec_arguments(parser, lines=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Worker counts to compare')
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds to run per worker count')
+    parser.add_argument('--output', help='Also write the JSON results to this file')
+    args = parser.parse_args()
+
+    log_text = generate_log(spec_from_args(args))
+    runs = [measure_workers(workers, args, log_text) for workers in args.workers]
+
+    baseline = runs[0]["requests_per_second"] / runs[0]["workers"]
+    cpus = os.cpu_count() or 1
+    for run in runs:
+        run["scaling_efficiency"] = round(run["requests_per_second"] / (baseline * run["workers"]), 2) if baseline else None
+        run["oversubscribed"] = run["workers"] > cpus
+
+    emit('workers', {
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "log_lines": args.lines,
+        "cpus": cpus,
+        "runs": runs,
+    }, args.output)
+
+    oversubscribed = [run["workers"] for run in runs if run["oversubscribed"]]
+    if oversubscribed:
+        print(f"NOT MEASURED scaling with {', '.join(map(str, oversubscribed))} workers: only {cpus} CPU(s); "
+              f"run on a machine with at least {max(oversubscribed)} CPUs")
+
+
+if __name__ == '__main__':
+    main()
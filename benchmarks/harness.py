@@ -0,0 +1,142 @@
+"""
+Shared helpers for the benchmarks: timing, latency percentiles and JSON result files
+
+Usage (regression check):
+    python benchmarks/harness.py compare BASELINE.json CURRENT.json [--tolerance 0.1]
+
+Exits with status 1 if any lines/sec figure dropped, or any p99 latency rose, by more
+than the tolerance.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+import statistics
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# Metric name suffixes and whether higher values are better
+HIGHER_IS_BETTER = ('lines_per_second', 'requests_per_second')
+LOWER_IS_BETTER = ('p99_ms',)
+
+
+def latency_stats(samples_ms: List[float]) -> Dict[str, float]:
+    """p50/p90/p99/mean/max of latency samples in milliseconds"""
+    samples = sorted(samples_ms)
+    if not samples:
+        return {"count": 0}
+
+    def percentile(p):
+        return round(samples[min(len(samples) - 1, max(0, int(round(p * len(samples))) - 1))], 3)
+
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples), 3),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Call func repeat times (after warmup calls) and return latency_stats of the calls"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return latency_stats(samples)
+
+
+def environment() -> Dict[str, Any]:
+    """Where and on what code the benchmark ran, stored with the results"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def emit(name: str, results: Dict[str, Any], output: Optional[str] = None) -> Dict[str, Any]:
+    """Print the results as JSON and write them to output if given"""
+    document = {"benchmark": name, "environment": environment(), "results": results}
+    text = json.dumps(document, indent=2)
+    print(text)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    return document
+
+
+def _flatten(value: Any, prefix: str = '') -> Dict[str, float]:
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else key))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: value}
+    return {}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """
+    Regressions of current against baseline, as human readable messages
+    """
+    before = _flatten(baseline.get("results", baseline))
+    after = _flatten(current.get("results", current))
+    regressions = []
+    for key, old in before.items():
+        new = after.get(key)
+        if new is None or not old:
+            continue
+        if key.endswith(HIGHER_IS_BETTER) and new < old * (1 - tolerance):
+            regressions.append(f"{key}: {old} -> {new} ({(new - old) / old:+.1%})")
+        elif key.endswith(LOWER_IS_BETTER) and new > old * (1 + tolerance):
+            regressions.append(f"{key}: {old} -> {new} ({(new - old) / old:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compare_parser = subparsers.add_parser('compare', help='Report regressions of CURRENT against BASELINE')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--tolerance', type=float, default=0.1,
+                                help='Allowed relative change before it counts as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = compare(baseline, current, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print("No regressions")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
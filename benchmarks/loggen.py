@@ -0,0 +1,126 @@
+"""
+Synthetic Jenkins console log generator for the benchmarks
+
+Usage:
+    python benchmarks/loggen.py OUTPUT [--lines 100000] [--error-density 0.01] [--stages 8]
+                                       [--trace-depth 20] [--line-length 120] [--seed 1]
+
+The same options and seed always produce the same log.
+"""
+
+import os
+import random
+import argparse
+import datetime
+from typing import Iterator, List
+
+STAGE_NAMES = ['Checkout', 'Build', 'Unit Tests', 'Integration Tests', 'Static Analysis',
+               'Package', 'Publish', 'Deploy', 'Smoke Tests', 'Cleanup']
+PACKAGES = ['com.example.build', 'com.example.service', 'org.apache.maven.plugin', 'org.gradle.api']
+EXCEPTIONS = ['java.lang.NullPointerException', 'java.io.IOException', 'java.net.ConnectException',
+              'java.lang.IllegalStateException', 'org.springframework.BeanCreationException']
+ERROR_MESSAGES = ['ERROR: Failed to execute goal org.apache.maven.plugins:maven-surefire-plugin',
+                  'ERROR: script returned exit code 1', 'npm ERR! code ELIFECYCLE',
+                  'FAILED: test_checkout_flow (tests.test_cart.CartTest)',
+                  'ERROR: Connection refused while pushing image']
+WARNING_MESSAGES = ['WARNING: deprecated API usage in build.gradle', 'WARN: retrying download (attempt 2)',
+                    'WARNING: No test report files were found']
+FILLER = 'lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt'
+
+
+class LogSpec:
+    """Shape of a synthetic log"""
+
+    def __init__(self, lines: int = 100000, error_density: float = 0.01, stages: int = 8,
+                 trace_depth: int = 20, line_length: int = 120, seed: int = 1):
+        self.lines = lines
+        self.error_density = error_density  # fraction of lines starting an error
+        self.stages = max(1, min(stages, len(STAGE_NAMES)))
+        self.trace_depth = trace_depth  # stack frames following an exception
+        self.line_length = line_length  # approximate length of ordinary lines
+        self.seed = seed
+
+
+def _pad(rng: random.Random, text: str, length: int) -> str:
+    if len(text) >= length:
+        return text
+    start = rng.randrange(len(FILLER))
+    filler = (FILLER[start:] + ' ' + FILLER) * (length // len(FILLER) + 1)
+    return text + ' ' + filler[:length - len(text) - 1]
+
+
+def _stack_trace(rng: random.Random, depth: int) -> List[str]:
+    exception = rng.choice(EXCEPTIONS)
+    trace = [f"{exception}: unexpected state in worker {rng.randrange(100)}"]
+    for frame in range(depth):
+        package = rng.choice(PACKAGES)
+        trace.append(f"\tat {package}.Worker{frame % 7}.run(Worker{frame % 7}.java:{rng.randrange(10, 900)})")
+        if depth > 4 and frame == depth // 2:
+            trace.append(f"Caused by: {rng.choice(EXCEPTIONS)}: nested failure")
+    return trace
+
+
+def generate_lines(spec: LogSpec) -> Iterator[str]:
+    """Yield spec.lines lines of a Jenkins pipeline console log"""
+    rng = random.Random(spec.seed)
+    clock = datetime.datetime(2024, 1, 1, 10, 0, 0)
+    stage_length = max(1, spec.lines // spec.stages)
+    produced = 0
+    stage = None
+
+    while produced < spec.lines:
+        previous_stage = stage
+        stage = STAGE_NAMES[min(produced // stage_length, spec.stages - 1)]
+        clock += datetime.timedelta(milliseconds=rng.randrange(1, 500))
+        timestamp = clock.strftime('%Y-%m-%d %H:%M:%S')
+        roll = rng.random()
+
+        if stage != previous_stage:
+            block = ['[Pipeline] stage', f'[Pipeline] {{ ({stage})']
+        elif roll < spec.error_density:
+            if rng.random() < 0.5 and spec.trace_depth:
+                block = [f"[{stage}] {timestamp} ERROR: build step failed"] + _stack_trace(rng, spec.trace_depth)
+            else:
+                block = [f"[{stage}] {timestamp} {rng.choice(ERROR_MESSAGES)}"]
+        elif roll < spec.error_density * 3:
+            block = [f"[{stage}] {timestamp} {rng.choice(WARNING_MESSAGES)}"]
+        else:
+            block = [_pad(rng, f"[{stage}] {timestamp} INFO step {produced}", spec.line_length)]
+
+        for line in block[:spec.lines - produced]:
+            yield line
+        produced += len(block)
+
+
+def generate_log(spec: LogSpec) -> str:
+    return '\n'.join(generate_lines(spec)) + '\n'
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser, lines: int = 100000) -> None:
+    parser.add_argument('--lines', type=int, default=lines, help='Number of log lines')
+    parser.add_argument('--error-density', type=float, default=0.01, help='Fraction of lines starting an error')
+    parser.add_argument('--stages', type=int, default=8, help='Number of pipeline stages')
+    parser.add_argument('--trace-depth', type=int, default=20, help='Stack frames per exception')
+    parser.add_argument('--line-length', type=int, default=120, help='Approximate length of ordinary lines')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+
+
+def spec_from_args(args: argparse.Namespace) -> LogSpec:
+    return LogSpec(lines=args.lines, error_density=args.error_density, stages=args.stages,
+                   trace_depth=args.trace_depth, line_length=args.line_length, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('output', help='File to write the log to')
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    with open(args.output, 'w') as f:
+        for line in generate_lines(spec_from_args(args)):
+            f.write(line + '\n')
+    print(f"Wrote {args.lines} lines ({os.path.getsize(args.output)} bytes) to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Mock LLM server for the benchmarks
+
+Speaks enough of the Ollama API (/api/version, /api/chat) and the OpenAI chat completions
+API (/v1/chat/completions) for llm_service, answering after a fixed latency.
+
+Usage:
+    python benchmarks/mock_llm.py [--port 11434] [--latency 0.2]
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANALYSIS = {
+    "error_summary": "Build step failed",
+    "probable_cause": "A dependency could not be resolved",
+    "suggested_fix": "Check the repository configuration and retry the build",
+    "additional_context": "Generated by the mock LLM server",
+}
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        if self.path == '/api/version':
+            self._send({"version": "mock"})
+        else:
+            self._send({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        time.sleep(self.latency)
+        content = json.dumps(ANALYSIS)
+        if self.path == '/api/chat':
+            self._send({"model": "mock", "message": {"role": "assistant", "content": content}, "done": True})
+        elif self.path == '/v1/chat/completions':
+            self._send({"choices": [{"message": {"role": "assistant", "content": content}}]})
+        else:
+            self._send({"error": "not found"}, status=404)
+
+    def _send(self, body, status=200):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_llm(port: int = 11434, latency: float = 0.0) -> ThreadingHTTPServer:
+    """Serve the mock LLM on a background thread; call shutdown() on the result to stop it"""
+    handler = type('Handler', (MockLLMHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='mock-llm', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=0.2, help='Seconds before each chat response')
+    args = parser.parse_args()
+
+    server = start_mock_llm(args.port, args.latency)
+    print(f"Mock LLM listening on http://127.0.0.1:{args.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Bulk ingestion for WolfsLogDebugger
+Unpacks multi-file uploads and archives and analyzes the logs in a process pool.
+
+Worker processes only run analyze_payload(): they write each log's lines to the shared
+line store but never touch the database or the LLM service, and results are persisted
+by the caller.
+"""
+
+import io
+import os
+import uuid
+import tarfile
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterator, Optional, Tuple
+
+from analyzer import LogAnalyzer
+from cache import SharedLogStore
+from chatcontext import build_chat_context
+from ingest import LogTooLargeError, detect_compression, iter_decompressed, iter_limited, iter_lines
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+
+def is_archive(filename: str) -> bool:
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _archive_members(filename: str, archive) -> Iterator[Tuple[str, int, Callable[[], BinaryIO]]]:
+    """(name, declared size, opener) of every regular file in an open zip or tar archive"""
+    if filename.lower().endswith('.zip'):
+        for info in archive.infolist():
+            if not info.is_dir():
+                yield info.filename, info.file_size, lambda info=info: archive.open(info)
+    else:
+        for member in archive:
+            if member.isfile():
+                yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+
+def _open_archive(filename: str, data: bytes):
+    if filename.lower().endswith('.zip'):
+        return zipfile.ZipFile(io.BytesIO(data))
+    return tarfile.open(fileobj=io.BytesIO(data), mode='r:*')
+
+
+def check_archive(filename: str, data: bytes, max_bytes: Optional[int] = None) -> int:
+    """
+    Number of regular files in a zip or tar archive, from its headers alone
+
+    Raises:
+        LogTooLargeError: The members' declared sizes add up to more than max_bytes
+    """
+    count = total = 0
+    with _open_archive(filename, data) as archive:
+        for name, size, _ in _archive_members(filename, archive):
+            count += 1
+            total += size
+            if max_bytes is not None and total > max_bytes:
+                raise LogTooLargeError(f"Unpacked archive {filename} exceeds the {max_bytes} byte limit")
+    return count
+
+
+def iter_archive(filename: str, data: bytes, max_bytes: Optional[int] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (member name, content) for every regular file in a zip or tar archive. Members
+    are read one at a time through ingest.iter_limited(), and the sizes in the headers
+    aren't trusted: reading stops as soon as the members add up to more than max_bytes.
+
+    Raises:
+        LogTooLargeError: The archive unpacks to more than max_bytes (e.g. a zip bomb)
+    """
+    total = 0
+    with _open_archive(filename, data) as archive:
+        for name, size, open_member in _archive_members(filename, archive):
+            if max_bytes is not None and total + size > max_bytes:
+                raise LogTooLargeError(f"Unpacked archive {filename} exceeds the {max_bytes} byte limit")
+            with open_member() as member:
+                content = b''.join(iter_limited(member, max_bytes, f"Unpacked archive {filename}", total))
+            total += len(content)
+            yield name, content
+
+
+def analyze_payload(name: str, data: bytes, store: SharedLogStore, max_bytes: Optional[int] = None,
+                    log_format: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze one log in a worker process. Compressed logs (gzip, bzip2, zstd) are
+    decompressed as they are analyzed, up to max_bytes of decompressed data. log_format
+    names the log's format; by default it is detected.
+
+    The decoded lines are written to store here rather than sent back, so only the
+    analysis crosses back to the parent process.
+
+    Returns:
+        The new file ID, analysis result, log_errors rows, stack traces and chat context
+    """
+    analyzer = LogAnalyzer(str(uuid.uuid4()), log_format=log_format)
+    compression = detect_compression(data[:4])
+    if compression:
+        analyzer.feed(iter_lines(iter_decompressed(io.BytesIO(data), compression, max_bytes)), final=True)
+    else:
+        analyzer.feed(data.decode('utf-8', errors='replace').splitlines(), final=True)
+    result = analyzer.result()
+    store.put(analyzer.file_id, analyzer.lines)
+    return {
+        "file_id": analyzer.file_id,
+        "file_name": name,
+        "result": result,
+        "error_rows": analyzer.error_rows(),
+        "stack_traces": analyzer.stack_traces,
+        "chat_context": build_chat_context(name, result, analyzer.error_signatures.values(), analyzer.stack_traces),
+    }
+
+
+def create_executor(max_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Process pool for analysis. Workers are spawned rather than forked so they don't
+    inherit the web server's threads, locks and open database connections.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context('spawn')
+    )
@@ -0,0 +1,324 @@
+"""
+Log line caches for WolfsLogDebugger
+Lines of analyzed logs for previews, context and LLM analysis: a bounded in-process cache
+and an on-disk store that every worker process on the node reads through mmap
+"""
+
+import os
+import mmap
+import time
+import uuid
+import array
+import struct
+import logging
+import itertools
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Logs kept per worker process before the least recently used are dropped
+DEFAULT_MAX_ENTRIES = 256
+# Bytes of line files kept by the shared store before the least recently used are deleted
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+# Line files the shared store keeps mapped per process between requests
+DEFAULT_MAX_MAPPED = 256
+
+# Line file layout: header (magic, version, line count), line_count + 1 native uint64
+# offsets into the text, then the UTF-8 encoded lines without separators. Files never
+# leave the node, so native byte order lets readers use the offsets in place.
+HEADER = struct.Struct('=4sIQ')
+MAGIC = b'WLLC'
+VERSION = 1
+# Lines that aren't valid UTF-8 (lone surrogates) still round-trip
+ENCODING_ERRORS = 'surrogatepass'
+# A line file read within this many seconds of its last use isn't touched again
+TOUCH_INTERVAL = 60
+# Line files, and the native uint64 normalized line hashes log diffs compute from them
+LINES_SUFFIX = '.lines'
+HASHES_SUFFIX = '.hashes'
+
+
+class LogCache:
+    """
+    Lines of recently analyzed logs keyed by file_id, evicting the least recently used
+    once more than max_entries logs are held.
+
+    Supports the dict operations app.py uses (get, pop, in, [], len) so it can replace
+    the plain dict LOG_CACHE was. Each worker process has its own. app.py keeps the
+    chat contexts of logs in one as well.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, file_id: str, default: Any = None) -> Optional[List[str]]:
+        with self._lock:
+            lines = self._entries.get(file_id)
+            if lines is None:
+                return default
+            self._entries.move_to_end(file_id)
+            return lines
+
+    def __getitem__(self, file_id: str) -> List[str]:
+        lines = self.get(file_id)
+        if lines is None:
+            raise KeyError(file_id)
+        return lines
+
+    def __setitem__(self, file_id: str, lines: List[str]) -> None:
+        with self._lock:
+            self._entries[file_id] = lines
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, file_id: object) -> bool:
+        with self._lock:
+            return file_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def pop(self, file_id: str, default: Any = None) -> Optional[List[str]]:
+        with self._lock:
+            return self._entries.pop(file_id, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class MappedLines(Sequence[str]):
+    """
+    Read-only list of a log's lines backed by a memory-mapped line file. Indexing and
+    slicing decode only the lines asked for, straight from the page cache through a
+    memoryview, so no bytes are copied on the way.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._mmap) if len(self._mmap) >= HEADER.size else (b'', 0, 0)
+        if magic != MAGIC or version != VERSION or len(self._mmap) < HEADER.size + (count + 1) * 8:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a line file")
+        self._count = count
+        self._view = memoryview(self._mmap)
+        self._offsets = self._view[HEADER.size:HEADER.size + (count + 1) * 8].cast('Q')
+        self._text = HEADER.size + (count + 1) * 8
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._count)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            offsets = self._offsets[start:stop + 1].tolist()
+            text = self._view[self._text:]
+            return [str(text[begin:end], 'utf-8', ENCODING_ERRORS)
+                    for begin, end in zip(offsets, offsets[1:])]
+
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError('line index out of range')
+        begin, end = self._offsets[index], self._offsets[index + 1]
+        return str(self._view[self._text + begin:self._text + end], 'utf-8', ENCODING_ERRORS)
+
+    def __iter__(self) -> Iterator[str]:
+        for start in range(0, self._count, 10000):
+            yield from self[start:start + 10000]
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._view.release()
+        self._mmap.close()
+
+
+class SharedLogStore:
+    """
+    Lines of analyzed logs saved as line files in directory, one per file_id, so that
+    every worker process on the node can serve previews and context for a log no matter
+    which one analyzed it.
+
+    Files are written to a temporary name and renamed into place, so readers never see
+    a partial file. Once the files add up to more than max_bytes, the least recently
+    used are deleted; readers that still have one mapped keep their view of it.
+
+    Next to a line file the store can keep the log's line hashes (see logdiff.py), so
+    each log is only hashed once however many diffs it's part of.
+
+    Each process keeps up to max_mapped line files mapped, so requests for the same log
+    share one mapping. A mapping is dropped once its file is deleted, replaced or least
+    recently used, and unmapped when the last request using it lets go of it.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_mapped: int = DEFAULT_MAX_MAPPED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_mapped = max_mapped
+        self._mapped: "OrderedDict[str, Tuple[Tuple[int, int], MappedLines]]" = OrderedDict()
+        self._mapped_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Bulk workers get the store's location and limits, not this process's mappings
+        return {'directory': self.directory, 'max_bytes': self.max_bytes, 'max_mapped': self.max_mapped}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def _path(self, file_id: str, suffix: str = LINES_SUFFIX) -> str:
+        # file_ids are UUIDs; anything else would let a request name an arbitrary path
+        return os.path.join(self.directory, f"{uuid.UUID(file_id)}{suffix}")
+
+    def _write(self, path: str, chunks: Iterable[bytes]) -> None:
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.writelines(chunks)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def put(self, file_id: str, lines: List[str]) -> None:
+        """Save a log's lines, replacing any earlier version (and its hashes)"""
+        encoded = [line.encode('utf-8', ENCODING_ERRORS) for line in lines]
+        offsets = array.array('Q', itertools.accumulate(map(len, encoded), initial=0))
+        if offsets.itemsize != 8:
+            raise RuntimeError("Line files need 64-bit offsets")
+
+        self._write(self._path(file_id),
+                    itertools.chain([HEADER.pack(MAGIC, VERSION, len(encoded)), offsets.tobytes()], encoded))
+        self._unmap(file_id)
+        self._remove(self._path(file_id, HASHES_SUFFIX))
+        self.prune()
+
+    def put_hashes(self, file_id: str, hashes: "array.array") -> None:
+        """Save the line hashes of a stored log"""
+        self._write(self._path(file_id, HASHES_SUFFIX), [hashes.tobytes()])
+        self.prune()
+
+    def get_hashes(self, file_id: str) -> Optional["array.array"]:
+        """The line hashes saved for file_id, or None"""
+        hashes = array.array('Q')
+        try:
+            with open(self._path(file_id, HASHES_SUFFIX), 'rb') as f:
+                hashes.frombytes(f.read())
+        except (ValueError, OSError):
+            return None
+        return hashes
+
+    def get(self, file_id: str) -> Optional[MappedLines]:
+        """The lines of file_id, or None if they aren't stored"""
+        try:
+            path = self._path(file_id)
+            stat = os.stat(path)
+        except (ValueError, OSError):
+            self._unmap(file_id)
+            return None
+
+        # The same file as last time (not deleted or replaced since) is still mapped
+        identity = (stat.st_dev, stat.st_ino)
+        with self._mapped_lock:
+            mapped = self._mapped.get(file_id)
+            if mapped is not None and mapped[0] == identity:
+                self._mapped.move_to_end(file_id)
+                lines = mapped[1]
+            else:
+                lines = None
+        if lines is None:
+            try:
+                lines = MappedLines(path)
+            except (ValueError, OSError):
+                return None
+            with self._mapped_lock:
+                self._mapped[file_id] = (identity, lines)
+                self._mapped.move_to_end(file_id)
+                while len(self._mapped) > self.max_mapped:
+                    self._mapped.popitem(last=False)
+
+        # Record the use for pruning, without a write per request
+        try:
+            if time.time() - stat.st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+        return lines
+
+    def _unmap(self, file_id: str) -> None:
+        # Not closed here: a request may still be reading it, and it's unmapped once
+        # the last reference is gone
+        with self._mapped_lock:
+            self._mapped.pop(file_id, None)
+
+    def __contains__(self, file_id: str) -> bool:
+        try:
+            return os.path.exists(self._path(file_id))
+        except ValueError:
+            return False
+
+    def delete(self, file_id: str) -> None:
+        self._unmap(file_id)
+        try:
+            self._remove(self._path(file_id))
+            self._remove(self._path(file_id, HASHES_SUFFIX))
+        except ValueError:
+            pass
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def size(self) -> int:
+        """Bytes of line and hash files on disk"""
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((LINES_SUFFIX, HASHES_SUFFIX)):
+                try:
+                    total += entry.stat().st_size
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def prune(self) -> int:
+        """Delete the least recently used line and hash files beyond max_bytes, returning how many"""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((LINES_SUFFIX, HASHES_SUFFIX)):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        deleted = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        return deleted
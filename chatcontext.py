@@ -0,0 +1,138 @@
+"""
+Chat context for WolfsLogDebugger
+Compact, prompt-ready summary of an analyzed log (stages, top error signatures, stack
+traces and key critical lines), built once when the analysis finishes so a chat message
+only has to look it up
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+from logdiff import normalize
+
+MAX_STAGES = 12
+MAX_ERROR_TYPES = 5
+MAX_SIGNATURES = 8
+MAX_STACK_TRACES = 3
+MAX_CRITICAL_LINES = 8
+# Longest line quoted to the LLM, and the most text the whole context may take up
+MAX_LINE_CHARS = 300
+MAX_CONTEXT_CHARS = 6000
+
+
+def _clip(text: Optional[str], limit: int = MAX_LINE_CHARS) -> str:
+    text = (text or '').strip()
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+def _signatures_from_critical_lines(critical_lines: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Error signatures of the critical lines, for analyses saved without them"""
+    signatures: Dict[str, Dict[str, Any]] = {}
+    for critical in critical_lines:
+        if critical.get("type") != "error":
+            continue
+        signature = normalize(critical["content"].strip())
+        entry = signatures.setdefault(signature, {
+            "signature": signature, "count": 0, "first_line": critical["line"],
+            "error_type": critical.get("error_type", "Unknown")
+        })
+        entry["count"] += 1
+    return list(signatures.values())
+
+
+def build_chat_context(name: str, result: Dict[str, Any],
+                       error_signatures: Optional[Iterable[Dict[str, Any]]] = None,
+                       stack_traces: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    """
+    Chat context of a log from its analysis result (see LogAnalyzer.result()), the
+    analyzer's error signatures and its stack trace blocks. Signatures default to
+    those of the critical lines.
+
+    Returns:
+        The summary fields plus "text", the summary rendered for a prompt in at most
+        MAX_CONTEXT_CHARS characters
+    """
+    stages = [
+        {"stage": stage, "lines": data["end"] - data["start"] + 1,
+         "errors": data["errors"], "warnings": data["warnings"]}
+        for stage, data in sorted(result.get("build_stages", {}).items(), key=lambda item: item[1]["start"])
+    ]
+    if len(stages) > MAX_STAGES:
+        # Keep the stages that went wrong, in log order
+        keep = sorted(stages, key=lambda s: (-s["errors"], -s["warnings"]))[:MAX_STAGES]
+        stages = [stage for stage in stages if stage in keep]
+
+    if error_signatures is None:
+        error_signatures = _signatures_from_critical_lines(result.get("critical_lines", []))
+    signatures = [
+        {"signature": _clip(entry["signature"]), "count": entry["count"],
+         "error_type": entry["error_type"], "first_line": entry["first_line"]}
+        for entry in sorted(error_signatures, key=lambda e: (-e["count"], e["first_line"]))[:MAX_SIGNATURES]
+    ]
+
+    error_counts = result.get("error_counts", {})
+    context = {
+        "name": name,
+        "log_format": result.get("log_format"),
+        "line_count": result.get("line_count", 0),
+        "error_count": error_counts.get("Error", 0),
+        "critical_count": error_counts.get("Critical", 0),
+        "warning_count": error_counts.get("Warning", 0),
+        "start_time": result.get("start_time"),
+        "end_time": result.get("end_time"),
+        "stages": stages,
+        "error_types": sorted(result.get("error_types", {}).items(), key=lambda item: -item[1])[:MAX_ERROR_TYPES],
+        "error_signatures": signatures,
+        "stack_traces": [
+            {"start": block["start"], "end": block["end"], "exception": block["exception"],
+             "root_cause": block["root_cause"], "root_frame": _clip(block["root_frame"])}
+            for block in list(stack_traces)[:MAX_STACK_TRACES]
+        ],
+        "critical_lines": [
+            {"line": critical["line"], "type": critical["type"], "content": _clip(critical["content"])}
+            for critical in result.get("critical_lines", [])[:MAX_CRITICAL_LINES]
+        ],
+    }
+    context["text"] = render_chat_context(context)
+    return context
+
+
+def render_chat_context(context: Dict[str, Any]) -> str:
+    """
+    The context as prompt lines, dropping critical lines (last first) if it would be
+    longer than MAX_CONTEXT_CHARS
+    """
+    head = [
+        f"- Log name: {context['name']}",
+        f"- Lines: {context['line_count']}",
+        f"- Errors: {context['error_count']} (critical: {context['critical_count']}), "
+        f"warnings: {context['warning_count']}",
+    ]
+    if context.get("log_format"):
+        head.append(f"- Log format: {context['log_format']}")
+    if context["start_time"]:
+        head.append(f"- Time span: {context['start_time']} to {context['end_time']}")
+    if context["stages"]:
+        head.append("- Build stages (lines, errors, warnings):")
+        head.extend(f"  - {s['stage']}: {s['lines']}, {s['errors']}, {s['warnings']}" for s in context["stages"])
+    if context["error_types"]:
+        head.append("- Error types: " + ", ".join(f"{error_type} ({count})" for error_type, count in context["error_types"]))
+    if context["error_signatures"]:
+        head.append("- Most frequent errors (# marks numbers and IDs):")
+        head.extend(f"  - {s['count']}x [{s['error_type']}] {s['signature']}" for s in context["error_signatures"])
+    if context["stack_traces"]:
+        head.append("- Stack traces:")
+        head.extend(
+            f"  - lines {t['start'] + 1}-{t['end'] + 1}: {t['exception']}"
+            + (f", caused by {t['root_cause']}" if t["root_cause"] != t["exception"] else "")
+            + (f" at {t['root_frame']}" if t["root_frame"] else "")
+            for t in context["stack_traces"]
+        )
+
+    critical = [f"  - line {c['line'] + 1} ({c['type']}): {c['content']}" for c in context["critical_lines"]]
+    text = "\n".join(head)
+    while critical:
+        with_critical = "\n".join([text, "- Critical lines:"] + critical)
+        if len(with_critical) <= MAX_CONTEXT_CHARS:
+            return with_critical
+        critical.pop()
+    return text[:MAX_CONTEXT_CHARS]
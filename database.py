@@ -0,0 +1,171 @@
+"""
+Database layer for WolfsLogDebugger
+Per-thread SQLite connections tuned for a read-heavy log store, plus versioned schema migrations
+"""
+
+import os
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every new connection. journal_mode=WAL is persistent in the
+# database file; the others are per-connection and must be set each time.
+SQLITE_PRAGMAS: Dict[str, Union[str, int]] = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64000)),  # negative = KiB, so 64MB
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "temp_store": "MEMORY",
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+}
+
+# Versioned migrations applied on top of schema.sql, tracked with PRAGMA user_version.
+# Append new entries with the next version number; never edit an applied one.
+MIGRATIONS: List[Tuple[int, str]] = [
+    (1, """
+        CREATE INDEX IF NOT EXISTS idx_log_errors_log_id ON log_errors (log_id);
+        CREATE INDEX IF NOT EXISTS idx_error_solutions_file_id ON error_solutions (file_id);
+        CREATE INDEX IF NOT EXISTS idx_chat_history_file_id ON chat_history (file_id);
+        CREATE INDEX IF NOT EXISTS idx_log_files_upload_time ON log_files (upload_time);
+    """),
+    (2, """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            state TEXT NOT NULL,      -- JSON of Job.to_dict()
+            updated_at REAL NOT NULL  -- Unix time of the last save
+        );
+        CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at);
+    """),
+    (3, """
+        CREATE TABLE IF NOT EXISTS stack_traces (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            log_id TEXT NOT NULL,
+            start_line INTEGER NOT NULL,
+            end_line INTEGER NOT NULL,   -- inclusive
+            language TEXT NOT NULL,      -- 'java', 'python', 'node' or 'go'
+            exception TEXT NOT NULL,
+            root_cause TEXT NOT NULL,
+            root_frame TEXT,
+            root_frame_line INTEGER
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_stack_traces_log_id ON stack_traces (log_id, start_line);
+    """),
+    (4, """
+        -- History summaries, updated as logs are saved (see storage.py)
+        CREATE TABLE IF NOT EXISTS history_daily (
+            day TEXT PRIMARY KEY,  -- YYYY-MM-DD of upload_time
+            logs INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            warnings INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS history_jobs (
+            job TEXT PRIMARY KEY,  -- see ingest.job_name()
+            logs INTEGER NOT NULL,
+            errors INTEGER NOT NULL,
+            warnings INTEGER NOT NULL,
+            last_upload_time TEXT
+        );
+        CREATE TABLE IF NOT EXISTS history_error_types (
+            day TEXT NOT NULL,
+            error_type TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, error_type)
+        );
+        -- Keyset pagination of history orders by (upload_time, log_id)
+        CREATE INDEX IF NOT EXISTS idx_log_files_upload_time_log_id ON log_files (upload_time, log_id);
+        DROP INDEX IF EXISTS idx_log_files_upload_time;
+    """),
+    (5, """
+        -- Prompt-ready summary of each log for chat (see chatcontext.py)
+        CREATE TABLE IF NOT EXISTS chat_contexts (
+            log_id TEXT PRIMARY KEY,
+            context TEXT NOT NULL  -- JSON of build_chat_context()
+        );
+    """),
+]
+
+_local = threading.local()
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """
+    Apply SQLITE_PRAGMAS to a freshly opened connection
+    """
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Open a new tuned connection to the database at path
+    """
+    conn = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.row_factory = sqlite3.Row
+    return configure_connection(conn)
+
+
+def get_connection(path: str) -> sqlite3.Connection:
+    """
+    Return the calling thread's connection to path, opening it on first use.
+
+    Connections are cached per thread (sqlite3 connections may not be shared
+    across threads) and live as long as the thread does, so request handlers
+    and background workers skip the connect + pragma cost after the first call.
+    """
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(path)
+    if conn is None:
+        conn = connections[path] = connect(path)
+    return conn
+
+
+def release_connection(path: str) -> None:
+    """
+    Roll back any transaction left open on the calling thread's connection to path,
+    keeping the connection itself for reuse
+    """
+    conn = getattr(_local, "connections", {}).get(path)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+
+def close_connection(path: str) -> None:
+    """
+    Close and forget the calling thread's connection to path, if any
+    """
+    connections = getattr(_local, "connections", {})
+    conn = connections.pop(path, None)
+    if conn is not None:
+        conn.close()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """
+    Apply pending MIGRATIONS in order and return the resulting schema version
+    """
+    current = get_schema_version(conn)
+    for version, script in MIGRATIONS:
+        if version <= current:
+            continue
+        logger.info(f"Applying database migration {version}")
+        try:
+            conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        current = version
+    return current
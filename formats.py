@@ -0,0 +1,331 @@
+"""
+Log formats for WolfsLogDebugger
+Per-format line parsers (Jenkins console text, JSON lines, GitHub Actions and GitLab CI)
+that give the analyzer each line's build stage, level and timestamp, and detection of a
+log's format from its first few KB
+"""
+
+import re
+import json
+import datetime
+import itertools
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # Parsing falls back to the standard library
+    _loads = json.loads
+
+# Generic patterns, used for plain text and for lines a format has no markup for
+ERROR_PATTERN = re.compile(r'\b(ERROR|FAILED|Exception:)\b', re.IGNORECASE)
+WARNING_PATTERN = re.compile(r'\b(WARNING|WARN:)\b', re.IGNORECASE)
+STAGE_PATTERN = re.compile(r'^\[([^\]]+)\]')
+TIMESTAMP_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}')
+
+GITHUB_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z ')
+GITHUB_COMMAND = re.compile(r'(?:##\[(group|endgroup|error|warning|notice|debug|command|section)\]'
+                            r'|::(group|endgroup|error|warning|notice|debug)[ :])')
+GITLAB_SECTION = re.compile(r'section_(start|end):(\d+):([A-Za-z0-9_.\-]+)')
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;?]*[A-Za-z]')
+
+# Levels a parser reports; the analyzer counts lines of any other level as neither
+ERROR = 'error'
+WARNING = 'warning'
+
+# How much of the start of a log its format is detected from
+DETECT_SAMPLE_CHARS = 8192
+DETECT_SAMPLE_LINES = 500
+# Share of the sampled lines that must be JSON objects for a log to be JSON lines
+JSON_DETECT_RATIO = 0.8
+
+ParsedLine = Tuple[Optional[str], Optional[str], Optional[str]]
+
+_search_error = ERROR_PATTERN.search
+_search_warning = WARNING_PATTERN.search
+_search_timestamp = TIMESTAMP_PATTERN.search
+_match_stage = STAGE_PATTERN.match
+
+
+def text_level(text: str) -> Optional[str]:
+    """Level of a line of plain text by the generic error and warning patterns"""
+    if _search_error(text):
+        return ERROR
+    if _search_warning(text):
+        return WARNING
+    return None
+
+
+def epoch_timestamp(seconds: float) -> str:
+    """'YYYY-MM-DD HH:MM:SS' (UTC) of seconds since the epoch"""
+    return datetime.datetime.fromtimestamp(int(seconds), datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class LogFormat:
+    """
+    Parser for one log format. An instance parses a single log, so formats whose stages
+    span several lines (groups, sections) can keep the open stage on it.
+
+    parse() returns (stage, level, timestamp) for a line: the build stage it belongs
+    to, ERROR, WARNING or None, and its 'YYYY-MM-DD HH:MM:SS' (or 'T'-separated)
+    timestamp, each None if the line has none.
+    """
+
+    name = ''
+    description = ''
+
+    @classmethod
+    def detect(cls, sample: List[str]) -> bool:
+        """Whether the first lines of a log are in this format"""
+        raise NotImplementedError
+
+    def parse(self, line: str) -> ParsedLine:
+        raise NotImplementedError
+
+
+class JenkinsFormat(LogFormat):
+    """
+    Jenkins console text, and the fallback for any log no other format claims: stages
+    are '[Stage]' line prefixes, levels the generic error and warning patterns
+    """
+
+    name = 'jenkins'
+    description = 'Jenkins console output and other plain text logs'
+
+    @classmethod
+    def detect(cls, sample: List[str]) -> bool:
+        return True
+
+    def parse(self, line: str) -> ParsedLine:
+        stage = _match_stage(line)
+        timestamp = _search_timestamp(line)
+        if _search_error(line):
+            level = ERROR
+        elif _search_warning(line):
+            level = WARNING
+        else:
+            level = None
+        return (stage.group(1) if stage else None, level, timestamp.group(0) if timestamp else None)
+
+
+class JsonLinesFormat(LogFormat):
+    """
+    One JSON object per line (structlog, pino, bunyan, logstash, ...). The level comes
+    from the record's level field rather than from words in its message; lines that
+    aren't JSON objects are parsed as plain text.
+    """
+
+    name = 'json'
+    description = 'JSON lines, one structured log record per line'
+
+    LEVEL_KEYS = ('level', 'severity', 'levelname', 'lvl', 'log.level')
+    STAGE_KEYS = ('stage', 'step', 'phase', 'job', 'logger', 'component')
+    TIME_KEYS = ('timestamp', '@timestamp', 'time', 'ts', 'datetime', 'asctime')
+    MESSAGE_KEYS = ('message', 'msg', 'event')
+    LEVELS = {
+        'error': ERROR, 'err': ERROR, 'fatal': ERROR, 'critical': ERROR, 'crit': ERROR,
+        'panic': ERROR, 'alert': ERROR, 'emerg': ERROR, 'emergency': ERROR,
+        'warning': WARNING, 'warn': WARNING,
+    }
+
+    def __init__(self):
+        # Epoch second of the last numeric timestamp and its text, as records come in order
+        self._epoch: Optional[int] = None
+        self._epoch_text: Optional[str] = None
+
+    @classmethod
+    def detect(cls, sample: List[str]) -> bool:
+        lines = [line for line in sample if line.strip()]
+        if not lines:
+            return False
+        records = 0
+        for line in lines:
+            if line.lstrip().startswith('{'):
+                try:
+                    records += isinstance(_loads(line), dict)
+                except ValueError:
+                    pass
+        return records >= JSON_DETECT_RATIO * len(lines)
+
+    def parse(self, line: str) -> ParsedLine:
+        record = None
+        if line[:1] == '{' or line.lstrip()[:1] == '{':
+            try:
+                record = _loads(line)
+            except ValueError:
+                pass
+        if not isinstance(record, dict):
+            timestamp = _search_timestamp(line)
+            return None, text_level(line), timestamp.group(0) if timestamp else None
+
+        level = self._level(record)
+        if level is False:
+            # No level field: judge by the message, like plain text
+            message = next((record[key] for key in self.MESSAGE_KEYS if isinstance(record.get(key), str)), line)
+            level = text_level(message)
+        stage = next((record[key] for key in self.STAGE_KEYS if isinstance(record.get(key), str)), None)
+        return stage, level, self._timestamp(record)
+
+    def _level(self, record: dict):
+        """ERROR, WARNING or None by the record's level field, False if it has none"""
+        value = next((record[key] for key in self.LEVEL_KEYS if key in record), None)
+        if value is None:
+            log = record.get('log')
+            value = log.get('level') if isinstance(log, dict) else None
+        if isinstance(value, str):
+            return self.LEVELS.get(value.lower())
+        if isinstance(value, int) and not isinstance(value, bool):
+            # pino and bunyan number their levels: 40 warn, 50 error, 60 fatal
+            return ERROR if value >= 50 else WARNING if value >= 40 else None
+        return False
+
+    def _timestamp(self, record: dict) -> Optional[str]:
+        value = next((record[key] for key in self.TIME_KEYS if key in record), None)
+        if isinstance(value, str):
+            match = TIMESTAMP_PATTERN.match(value)
+            return match.group(0) if match else None
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            # Milliseconds since the epoch for anything past the year 5138 in seconds
+            seconds = int(value / 1000 if value > 1e11 else value)
+            if seconds != self._epoch:
+                try:
+                    self._epoch_text = epoch_timestamp(seconds)
+                except (OverflowError, OSError, ValueError):
+                    return None
+                self._epoch = seconds
+            return self._epoch_text
+        return None
+
+
+class GitHubActionsFormat(LogFormat):
+    """
+    GitHub Actions job logs: '##[group]' opens a stage that '##[endgroup]' closes, and
+    '##[error]' / '##[warning]' (or '::error::' workflow commands) mark the level.
+    Lines start with an ISO timestamp when downloaded raw.
+    """
+
+    name = 'github'
+    description = 'GitHub Actions job logs'
+
+    def __init__(self):
+        self.stage: Optional[str] = None
+
+    @classmethod
+    def detect(cls, sample: List[str]) -> bool:
+        for line in sample:
+            prefix = GITHUB_PREFIX.match(line)
+            if GITHUB_COMMAND.match(line, prefix.end() if prefix else 0):
+                return True
+        return False
+
+    def parse(self, line: str) -> ParsedLine:
+        prefix = GITHUB_PREFIX.match(line)
+        start = prefix.end() if prefix else 0
+        stage = self.stage
+        level = None
+        if line.startswith('##[', start) or line.startswith('::', start):
+            command = GITHUB_COMMAND.match(line, start)
+            if command:
+                kind = command.group(1) or command.group(2)
+                if kind == 'group':
+                    stage = self.stage = line[command.end():].strip() or 'group'
+                elif kind == 'endgroup':
+                    # The closing line still belongs to the group
+                    self.stage = None
+                elif kind == 'error':
+                    level = ERROR
+                elif kind == 'warning':
+                    level = WARNING
+        if level is None:
+            level = text_level(line[start:] if start else line)
+        if prefix:
+            return stage, level, line[:19]
+        timestamp = _search_timestamp(line)
+        return stage, level, timestamp.group(0) if timestamp else None
+
+
+class GitLabFormat(LogFormat):
+    """
+    GitLab CI job traces: 'section_start:<epoch>:<name>' opens a stage that
+    'section_end' closes, and their epochs time it. ANSI colors are removed before
+    looking for errors, since a color code ends right where 'ERROR' begins.
+    """
+
+    name = 'gitlab'
+    description = 'GitLab CI job traces'
+
+    def __init__(self):
+        self.stage: Optional[str] = None
+
+    @classmethod
+    def detect(cls, sample: List[str]) -> bool:
+        return any(GITLAB_SECTION.search(line) or 'Running with gitlab-runner' in line for line in sample)
+
+    def parse(self, line: str) -> ParsedLine:
+        text = ANSI_ESCAPE.sub('', line) if '\x1b' in line else line
+        stage = self.stage
+        timestamp = None
+        if 'section_' in text:
+            section = GITLAB_SECTION.search(text)
+            if section:
+                kind, epoch, name = section.groups()
+                timestamp = epoch_timestamp(int(epoch))
+                if kind == 'start':
+                    stage = self.stage = name
+                else:
+                    stage, self.stage = name, None
+        if timestamp is None:
+            match = _search_timestamp(text)
+            timestamp = match.group(0) if match else None
+        return stage, text_level(text), timestamp
+
+
+# Formats by name, in the order detection tries them; the default claims any log
+FORMATS: Dict[str, Type[LogFormat]] = {}
+DEFAULT_FORMAT = JenkinsFormat.name
+
+
+def register_format(format_class: Type[LogFormat]) -> None:
+    """
+    Add a format, or replace the one of the same name. Detection tries added formats
+    before the built-in ones.
+    """
+    FORMATS.pop(format_class.name, None)
+    formats = {format_class.name: format_class, **FORMATS}
+    FORMATS.clear()
+    FORMATS.update(formats)
+
+
+for _format in (JenkinsFormat, GitHubActionsFormat, GitLabFormat, JsonLinesFormat):
+    register_format(_format)
+
+
+def get_format(name: str) -> Type[LogFormat]:
+    """The format called name; raises ValueError for an unknown one"""
+    try:
+        return FORMATS[name]
+    except KeyError:
+        raise ValueError(f"Unknown log format: {name} (expected one of {', '.join(FORMATS)})")
+
+
+def detect_format(sample: List[str]) -> Type[LogFormat]:
+    """The first format that claims the sample, or the default one"""
+    for name, format_class in FORMATS.items():
+        if name != DEFAULT_FORMAT and format_class.detect(sample):
+            return format_class
+    return FORMATS[DEFAULT_FORMAT]
+
+
+def take_sample(lines: Iterator[str]) -> List[str]:
+    """
+    Lines from the start of an iterator up to DETECT_SAMPLE_CHARS characters (and at
+    most DETECT_SAMPLE_LINES lines), to detect the format from
+    """
+    sample = []
+    chars = 0
+    for line in itertools.islice(lines, DETECT_SAMPLE_LINES):
+        sample.append(line)
+        chars += len(line) + 1
+        if chars >= DETECT_SAMPLE_CHARS:
+            break
+    return sample
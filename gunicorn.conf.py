@@ -0,0 +1,41 @@
+"""
+Gunicorn configuration for WolfsLogDebugger
+Several worker processes so CPU-bound log analysis isn't serialized by the GIL
+
+Usage:
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get('BIND', '0.0.0.0:8086')
+
+# One process per CPU; each also runs a few threads for requests waiting on I/O (LLM,
+# URL downloads, server-sent events)
+workers = int(os.environ.get('WEB_CONCURRENCY', 0)) or multiprocessing.cpu_count()
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# Large uploads and LLM calls can keep a request busy for a while
+timeout = int(os.environ.get('WEB_TIMEOUT', 120))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app in each worker rather than the master, so no thread pool, database
+# connection or lock is inherited across fork()
+preload_app = False
+
+# Restart workers now and then to bound memory held by the in-process log cache
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+# HTTPS with the same certificates as python app.py --https
+_certs = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'certs')
+if os.environ.get('HTTPS', 'false').lower() == 'true':
+    certfile = os.path.join(_certs, 'cert.pem')
+    keyfile = os.path.join(_certs, 'key.pem')
@@ -0,0 +1,169 @@
+"""
+HTTP caching for WolfsLogDebugger
+Cache-Control policies, strong ETags with 304 handling, fingerprinted static assets and
+gzip/brotli response compression
+"""
+
+import os
+import gzip
+import hashlib
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Responses whose content never changes for their URL, e.g. a range of a finished log.
+# Private because logs belong to whoever uploaded them.
+IMMUTABLE = "private, max-age=31536000, immutable"
+# Fingerprinted static assets: a new version gets a new URL
+STATIC_IMMUTABLE = "public, max-age=31536000, immutable"
+# Content that can change (a live log): cached, but revalidated with the ETag every time
+REVALIDATE = "private, no-cache"
+# Everything else, as before caching policies existed
+NO_STORE = "no-store, no-cache, must-revalidate, max-age=0"
+
+# Bump to invalidate every ETag when the shape of cached responses changes
+ETAG_VERSION = "1"
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 500
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def make_etag(*parts: object) -> str:
+    """Strong ETag (unquoted) for the response identified by parts"""
+    key = "\0".join(str(part) for part in (ETAG_VERSION,) + parts)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:32]
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    Whether the client already has the response with this ETag, in any encoding
+    (compressed responses carry the ETag with an -gzip or -br suffix)
+    """
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains(tag) for tag in (etag, f"{etag}-gzip", f"{etag}-br"))
+
+
+def cached(response: Response, etag: str, cache_control: str = IMMUTABLE) -> Response:
+    """Give response a strong ETag and a caching policy"""
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = cache_control
+    return response
+
+
+def not_modified(etag: str, cache_control: str = IMMUTABLE) -> Response:
+    """304 response for a client that sent a matching If-None-Match"""
+    return cached(Response(status=304), etag, cache_control)
+
+
+def choose_encoding(accept_encoding) -> Optional[str]:
+    """Best content coding the client accepts: br when available, then gzip"""
+    if brotli is not None and accept_encoding["br"]:
+        return "br"
+    if accept_encoding["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(response: Response) -> bool:
+    return (
+        response.status_code == 200
+        and "Content-Encoding" not in response.headers
+        and response.mimetype != "text/event-stream"
+        and response.mimetype.startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+def encode_response(response: Response, encoding: str, body: Optional[bytes] = None) -> Response:
+    """
+    Replace response's body with its encoded form (body, if already compressed). The
+    ETag gets the encoding as a suffix: a strong ETag names one exact representation.
+    """
+    if body is None:
+        body = compress(response.get_data(), encoding)
+    if hasattr(response.response, "close"):
+        response.response.close()  # e.g. the file of a static asset
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def conditional(request: Request, response: Response) -> Response:
+    """Replace a 200 response the client already has (by ETag) with a 304"""
+    etag, _ = response.get_etag()
+    if response.status_code != 200 or not etag or not is_not_modified(request, etag):
+        return response
+    if hasattr(response.response, "close"):
+        response.response.close()
+    unmodified = not_modified(etag, response.headers.get("Cache-Control", REVALIDATE))
+    for header in ("Vary", "Last-Modified"):
+        if header in response.headers:
+            unmodified.headers[header] = response.headers[header]
+    return unmodified
+
+
+class StaticAssets:
+    """
+    Content fingerprints of the files in a static folder, used as a version query
+    argument so assets can be cached for a year and still update on deploy. Fingerprints
+    are recomputed when a file's modification time changes; compressed copies are kept
+    per fingerprint so each asset is only compressed once.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._versions: Dict[str, Tuple[float, str]] = {}
+        self._compressed: Dict[Tuple[str, str, str], bytes] = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename: str) -> Optional[str]:
+        path = os.path.realpath(os.path.join(self.folder, filename))
+        if not path.startswith(os.path.realpath(self.folder) + os.sep):
+            return None
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached_version = self._versions.get(filename)
+        if cached_version and cached_version[0] == mtime:
+            return cached_version[1]
+
+        with open(path, "rb") as f:
+            version = hashlib.sha1(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._versions[filename] = (mtime, version)
+        return version
+
+    def compressed(self, filename: str, version: str, encoding: str) -> bytes:
+        """The asset compressed with encoding, for the version returned by version()"""
+        key = (filename, version, encoding)
+        with self._lock:
+            body = self._compressed.get(key)
+        if body is None:
+            with open(os.path.join(self.folder, filename), "rb") as f:
+                body = compress(f.read(), encoding)
+            with self._lock:
+                self._compressed[key] = body
+        return body
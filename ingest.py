@@ -0,0 +1,346 @@
+"""
+Log ingestion helpers for WolfsLogDebugger
+Streams remote logs into the analyzer line by line instead of buffering whole responses
+"""
+
+import os
+import re
+import bz2
+import time
+import gzip
+import codecs
+import logging
+import threading
+from urllib.parse import unquote
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, List, Optional, Tuple
+
+# requests is imported where it's used: most processes (bulk workers, uploads) never fetch a URL
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+MAX_RESUME_ATTEMPTS = 3
+
+
+class LogTooLargeError(Exception):
+    """Raised when a log exceeds the configured size limit"""
+
+
+class LogFetchError(Exception):
+    """Raised when a log can't be downloaded"""
+
+
+class CompressionError(Exception):
+    """Raised when a compressed log is corrupt or its format isn't supported"""
+
+
+# Leading bytes identifying each supported compression format
+COMPRESSION_MAGIC = {
+    'gzip': b'\x1f\x8b',
+    'bzip2': b'BZh',
+    'zstd': b'\x28\xb5\x2f\xfd',
+}
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> "requests.Session":
+    """
+    Return the shared HTTP session, so connections to the same Jenkins host are pooled
+    across fetches
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                import urllib3
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # Self-signed Jenkins certificates are allowed with skip_ssl_verify
+                urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+                session = requests.Session()
+                retry_strategy = Retry(
+                    total=3,
+                    backoff_factor=1,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                )
+                adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=20)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def split_lines(text: str, final: bool = False) -> Tuple[List[str], str]:
+    """
+    Split text into complete lines (without line endings, as str.splitlines() would)
+    and the remainder that may still be continued by more text.
+
+    A trailing '\r' is held back too, since its '\n' may arrive next. With final=True
+    everything is returned as lines.
+    """
+    if final:
+        return text.splitlines(), ''
+    parts = text.splitlines(keepends=True)
+    if not parts:
+        return [], ''
+    last = parts[-1]
+    rest = parts.pop() if last.endswith('\r') or last.splitlines()[0] == last else ''
+    return [part.splitlines()[0] for part in parts], rest
+
+
+def iter_lines(chunks: Iterable[bytes], encoding: str = 'utf-8') -> Iterator[str]:
+    """
+    Decode a stream of byte chunks into lines without line endings, splitting the same
+    way str.splitlines() does
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending = ''
+    for chunk in chunks:
+        lines, pending = split_lines(pending + decoder.decode(chunk))
+        yield from lines
+    lines, _ = split_lines(pending + decoder.decode(b'', final=True), final=True)
+    yield from lines
+
+
+class UrlStream:
+    """
+    Body of a URL being downloaded; iterate over it for chunks. length is the expected
+    size in bytes when the server sent an uncompressed Content-Length, otherwise None.
+    """
+
+    def __init__(self, chunks: Iterator[bytes], length: Optional[int] = None):
+        self.chunks = chunks
+        self.length = length
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.chunks
+
+
+def detect_compression(head: bytes) -> Optional[str]:
+    """
+    Name of the compression format that data starting with head is in, or None
+    """
+    for name, magic in COMPRESSION_MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def iter_decompressed(fileobj: BinaryIO, compression: str, max_bytes: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Decompress fileobj as a stream of chunks of at most CHUNK_SIZE bytes, so memory use
+    doesn't depend on the compression ratio. Concatenated streams (e.g. appended gzip
+    members) are decoded in sequence.
+
+    Raises:
+        LogTooLargeError: The decompressed data exceeds max_bytes (e.g. a zip bomb)
+        CompressionError: The data is corrupt or the format needs a missing package
+    """
+    if compression == 'gzip':
+        reader = gzip.GzipFile(fileobj=fileobj)
+        errors = (OSError, EOFError)
+    elif compression == 'bzip2':
+        reader = bz2.BZ2File(fileobj)
+        errors = (OSError, EOFError)
+    elif compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise CompressionError("zstd compressed logs require the 'zstandard' package")
+        reader = zstandard.ZstdDecompressor().stream_reader(fileobj, read_across_frames=True)
+        errors = (zstandard.ZstdError,)
+    else:
+        raise CompressionError(f"Unsupported compression: {compression}")
+
+    with reader:
+        try:
+            yield from iter_limited(reader, max_bytes, "Decompressed log")
+        except errors as e:
+            raise CompressionError(f"Failed to decompress {compression} data: {str(e)}")
+
+
+def iter_limited(reader: BinaryIO, max_bytes: Optional[int] = None, description: str = "Log",
+                 total: int = 0) -> Iterator[bytes]:
+    """
+    Read reader CHUNK_SIZE bytes at a time, stopping as soon as total plus what was read
+    exceeds max_bytes: the one capped path for decompressed and unpacked data, so no
+    header or compression ratio decides how much is held in memory
+
+    Raises:
+        LogTooLargeError: More than max_bytes in all (description names the data)
+    """
+    while True:
+        chunk = reader.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        total += len(chunk)
+        if max_bytes is not None and total > max_bytes:
+            raise LogTooLargeError(f"{description} exceeds the {max_bytes} byte limit")
+        yield chunk
+
+
+def open_url_stream(url: str, verify: bool = True, max_bytes: Optional[int] = None,
+                    save_path: Optional[str] = None, timeout: int = 30) -> UrlStream:
+    """
+    Start downloading url and return its body as a UrlStream of chunks.
+
+    The initial request happens immediately so HTTP and connection errors surface here;
+    the body is only read as the iterator is consumed. gzip/deflate transfer encoding is
+    decoded on the fly, each chunk is also written to save_path, and a dropped connection
+    is resumed with a Range request from the last byte received.
+
+    Raises:
+        LogFetchError: The request failed
+        LogTooLargeError: The body (after decoding) is larger than max_bytes
+    """
+    import requests
+
+    session = get_session()
+    try:
+        response = session.get(url, stream=True, verify=verify, timeout=timeout)
+        response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error fetching URL {url}: {str(e)}")
+        raise LogFetchError(f"Failed to fetch log from URL: {str(e)}")
+
+    # Content-Length is only the body size when the body isn't compressed
+    length = response.headers.get('Content-Length')
+    if length and length.isdigit() and response.headers.get('Content-Encoding', 'identity') == 'identity':
+        length = int(length)
+    else:
+        length = None
+    if max_bytes is not None and length is not None and length > max_bytes:
+        response.close()
+        raise LogTooLargeError(f"Log is {length} bytes, which exceeds the {max_bytes} byte limit")
+
+    return UrlStream(_read_stream(session, url, response, verify, max_bytes, save_path, timeout), length)
+
+
+def _read_stream(session, url, response, verify, max_bytes, save_path, timeout):
+    import requests
+
+    accepts_ranges = response.headers.get('Accept-Ranges', '').lower() == 'bytes'
+    received = 0
+    attempts = 0
+    out = open(save_path, 'wb') if save_path else None
+    completed = False
+    try:
+        while True:
+            # On a resumed request without range support the server starts over,
+            # so drop what we already have
+            skip = received if response.status_code == 200 else 0
+            try:
+                with response:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk = chunk[skip:]
+                            skip = 0
+                        received += len(chunk)
+                        if max_bytes is not None and received > max_bytes:
+                            raise LogTooLargeError(f"Log exceeds the {max_bytes} byte limit")
+                        if out:
+                            out.write(chunk)
+                        yield chunk
+                completed = True
+                return
+            except (requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError) as e:
+                if attempts >= MAX_RESUME_ATTEMPTS:
+                    raise LogFetchError(f"Download of {url} interrupted: {str(e)}")
+                attempts += 1
+                logger.warning(f"Download of {url} interrupted after {received} bytes, resuming: {str(e)}")
+
+            # Offsets count decoded bytes, which match the identity encoding of the body
+            headers = {'Accept-Encoding': 'identity'}
+            if accepts_ranges:
+                headers['Range'] = f'bytes={received}-'
+            try:
+                response = session.get(url, headers=headers, stream=True, verify=verify, timeout=timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                raise LogFetchError(f"Failed to resume download of {url}: {str(e)}")
+    finally:
+        if out:
+            out.close()
+            if not completed:
+                # A partial download is of no use to anyone
+                os.remove(save_path)
+
+
+def progressive_text_url(url: str) -> str:
+    """
+    Map a Jenkins build, console or consoleText URL to its logText/progressiveText endpoint
+    """
+    if 'progressiveText' in url:
+        return url
+    base = url.split('?', 1)[0].rstrip('/')
+    for suffix in ('/consoleText', '/consoleFull', '/console'):
+        if base.endswith(suffix):
+            base = base[:-len(suffix)]
+            break
+    return f"{base}/logText/progressiveText"
+
+
+JENKINS_JOB = re.compile(r'/job/([^/?#]+)')
+# A build number at the end of a file name, before its extensions (build-123.log.gz)
+BUILD_NUMBER = re.compile(r'[-_#. ]+\d+(?=(?:\.[A-Za-z]\w*)*$)')
+
+
+def job_name(name: str) -> str:
+    """
+    The CI job a log belongs to, for per-job history: the job path of a Jenkins build
+    URL, otherwise the file name without its build number
+    """
+    jobs = JENKINS_JOB.findall(name)
+    if jobs:
+        return '/'.join(unquote(job) for job in jobs)
+    base = os.path.basename(name.split('?', 1)[0].rstrip('/')) or name
+    return BUILD_NUMBER.sub('', base) or base
+
+
+def poll_progressive_text(url: str, start: int = 0, interval: float = 2.0, verify: bool = True,
+                          stop_event: Optional[threading.Event] = None,
+                          timeout: int = 30) -> Iterator[Tuple[str, int]]:
+    """
+    Follow a running Jenkins build through its progressiveText endpoint.
+
+    Yields (text, offset) for each new piece of output, where offset is the byte position
+    to resume from, until Jenkins stops sending X-More-Data (the build finished) or
+    stop_event is set.
+    """
+    import requests
+
+    session = get_session()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    offset = start
+    while stop_event is None or not stop_event.is_set():
+        try:
+            response = session.get(url, params={'start': offset}, verify=verify, timeout=timeout)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise LogFetchError(f"Failed to poll {url}: {str(e)}")
+
+        size = response.headers.get('X-Text-Size')
+        offset = int(size) if size and size.isdigit() else offset + len(response.content)
+        # Offsets are in bytes, so a multi-byte character can straddle two polls
+        text = decoder.decode(response.content)
+        more = response.headers.get('X-More-Data', '').lower() == 'true'
+        if not more:
+            text += decoder.decode(b'', final=True)
+        if text:
+            yield text, offset
+        if not more:
+            return
+        if stop_event is not None:
+            stop_event.wait(interval)
+        else:
+            time.sleep(interval)
@@ -0,0 +1,183 @@
+"""
+Background job tracking for WolfsLogDebugger
+Registry of long-running work (bulk ingestion, large analyses) that clients poll for
+progress and results. Jobs run in the process that created them; with a store, their
+status is also saved so any worker process can answer status requests.
+"""
+
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for polling before the oldest are dropped
+MAX_FINISHED_JOBS = 1000
+# Seconds saved job statuses are kept after they were last updated
+MAX_STORED_JOB_AGE = 24 * 3600
+# Minimum seconds between saves of a job's progress; status changes are always saved
+SAVE_INTERVAL = 0.5
+
+
+class Job:
+    """
+    Progress and outcome of one background job. Fields are updated by the worker and
+    read by status requests; use update() to change several at once.
+    """
+
+    def __init__(self, kind: str, total: int = 0):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.status = "queued"  # queued, running, completed, failed
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.results: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Called with the job after every change, e.g. to save its status
+        self.on_change: Optional[Callable[["Job"], None]] = None
+        self._saved_status: Optional[str] = None
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def start(self) -> None:
+        self.update(status="running", started_at=time.time())
+
+    def update(self, **fields: Any) -> None:
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+        self._changed()
+
+    def add_results(self, results: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.results.extend(results)
+            self.completed += len(results)
+        self._changed()
+
+    def add_error(self, name: str, message: str) -> None:
+        with self._lock:
+            self.errors.append({"name": name, "error": message})
+            self.failed += 1
+        self._changed()
+
+    def _changed(self) -> None:
+        if self.on_change is not None:
+            try:
+                self.on_change(self)
+            except Exception as e:
+                logger.error(f"Failed to save status of job {self.id}: {str(e)}")
+
+    def finish(self, error: Optional[str] = None) -> None:
+        self.update(
+            status="failed" if error else "completed",
+            error=error,
+            finished_at=time.time()
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            processed = self.completed + self.failed
+            if "percent" in self.progress:
+                # Jobs that track their own progress (e.g. lines of one large log)
+                percent = self.progress["percent"]
+            elif self.total:
+                percent = round(100.0 * processed / self.total, 1)
+            else:
+                percent = 100.0 if self.done else 0.0
+            end = self.finished_at or time.time()
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "total": self.total,
+                "completed": self.completed,
+                "failed": self.failed,
+                "percent": percent,
+                "progress": dict(self.progress),
+                "elapsed_seconds": round(end - (self.started_at or self.created_at), 3),
+                "results": list(self.results),
+                "errors": list(self.errors),
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        """Rebuild a job from a saved to_dict(), e.g. one running in another process"""
+        job = cls(data["kind"], data["total"])
+        job.id = data["job_id"]
+        for name in ("status", "completed", "failed", "results", "errors", "progress",
+                     "result", "error", "created_at", "started_at", "finished_at"):
+            setattr(job, name, data[name])
+        return job
+
+
+class JobRegistry:
+    """
+    Thread-safe lookup of jobs by ID.
+
+    store, if given, returns the LogStorage that job statuses are saved to, so get()
+    also finds jobs running in other worker processes.
+    """
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS, store: Optional[Callable[[], Any]] = None):
+        self.max_finished = max_finished
+        self.store = store
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, total: int = 0) -> Job:
+        job = Job(kind, total)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        if self.store is not None:
+            job.on_change = self._save
+            job._changed()
+            try:
+                self.store().delete_jobs(time.time() - MAX_STORED_JOB_AGE)
+            except Exception as e:
+                logger.error(f"Failed to prune saved jobs: {str(e)}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job of this process, or a copy of the saved status of another process's job"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        try:
+            data = self.store().get_job(job_id)
+        except Exception as e:
+            logger.error(f"Failed to load job {job_id}: {str(e)}")
+            return None
+        return Job.from_dict(data) if data else None
+
+    def _save(self, job: Job) -> None:
+        now = time.monotonic()
+        if job.status == job._saved_status and now - job._saved_at < SAVE_INTERVAL:
+            return
+        job._saved_status, job._saved_at = job.status, now
+        self.store().save_job(job.id, job.kind, job.status, job.to_dict())
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -6,12 +6,19 @@ Connects to local LLM instance (e.g., Ollama, LocalAI) to analyze error logs
 import os
 import re
 import json
+import time
 import logging
+import threading
 import requests
+from urllib.parse import urljoin
 from typing import Dict, List, Optional, Any, Union
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 
+from metrics import LLM_BATCHED_ERRORS, LLM_FALLBACKS, LLM_REQUEST_SECONDS, LLM_REQUESTS
+from profiling import span
+from rules import ERROR_PATTERNS, classify as classify_error  # ERROR_PATTERNS stays importable from here
+
 # Load environment variables
 load_dotenv()
 
@@ -28,6 +35,10 @@ DEFAULT_LLM_TIMEOUT = 30
 LLM_API_URL = os.environ.get("LLM_API_URL", DEFAULT_LLM_API_URL)
 LLM_MODEL = os.environ.get("LLM_MODEL", DEFAULT_LLM_MODEL)
 LLM_TIMEOUT = int(os.environ.get("LLM_TIMEOUT", DEFAULT_LLM_TIMEOUT))
+# Health endpoint on the same server as the chat API
+LLM_HEALTH_URL = os.environ.get("LLM_HEALTH_URL", urljoin(LLM_API_URL, "/api/version"))
+# Seconds a status check is reused before the LLM is probed again
+LLM_STATUS_TTL = float(os.environ.get("LLM_STATUS_TTL", 60))
 
 # OpenAI API configuration (fallback)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
@@ -35,6 +46,41 @@ OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-3.5-turbo")
 USE_FALLBACK_LLM = os.environ.get("USE_FALLBACK_LLM", "true").lower() == "true"
 
+# Errors sent in one request by analyze_errors()
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", 5))
+ANALYSIS_SYSTEM_PROMPT = "You are an expert in Jenkins and CI/CD troubleshooting who provides concise, accurate JSON responses."
+
+class ModelProfile(BaseModel):
+    """Model and Ollama options for one kind of LLM work"""
+    model: str
+    num_ctx: int
+    num_predict: int
+    temperature: float
+    keep_alive: str  # how long Ollama keeps the model loaded after a request, e.g. "30m"
+
+    def options(self) -> Dict[str, Any]:
+        return {"num_ctx": self.num_ctx, "num_predict": self.num_predict, "temperature": self.temperature}
+
+def load_profile(name: str, num_ctx: int, num_predict: int, temperature: float, keep_alive: str) -> ModelProfile:
+    """Profile with the given defaults, each overridable with LLM_<NAME>_<FIELD> (e.g. LLM_CHAT_MODEL)"""
+    prefix = f"LLM_{name.upper()}_"
+    return ModelProfile(
+        model=os.environ.get(f"{prefix}MODEL", LLM_MODEL),
+        num_ctx=int(os.environ.get(f"{prefix}NUM_CTX", num_ctx)),
+        num_predict=int(os.environ.get(f"{prefix}NUM_PREDICT", num_predict)),
+        temperature=float(os.environ.get(f"{prefix}TEMPERATURE", temperature)),
+        keep_alive=os.environ.get(f"{prefix}KEEP_ALIVE", keep_alive)
+    )
+
+# Model profiles by kind of work. Background analysis of uploads can run on a small,
+# fast model that Ollama unloads soon after; the model behind interactive error
+# analysis and chat stays loaded so users don't wait for it to load.
+MODEL_PROFILES: Dict[str, ModelProfile] = {
+    "background": load_profile("background", num_ctx=8192, num_predict=1536, temperature=0.2, keep_alive="5m"),
+    "analysis": load_profile("analysis", num_ctx=8192, num_predict=1024, temperature=0.2, keep_alive="30m"),
+    "chat": load_profile("chat", num_ctx=8192, num_predict=1024, temperature=0.7, keep_alive="30m"),
+}
+
 class ErrorAnalysisRequest(BaseModel):
     model: str
     prompt: str
@@ -47,6 +93,21 @@ class ErrorAnalysisResponse(BaseModel):
     suggested_fix: str = Field(..., description="Recommended actions to resolve the issue")
     additional_context: Optional[str] = Field(None, description="Any additional information or explanation")
 
+def llm_request(method: str, url: str, backend: str, operation: str, **kwargs) -> requests.Response:
+    """
+    Send a request to an LLM backend, recording its latency and outcome in the metrics
+    and as an llm.<backend>.<operation> span of profiled requests
+    """
+    outcome = "error"
+    try:
+        with LLM_REQUEST_SECONDS.time(backend=backend, operation=operation), span(f"llm.{backend}.{operation}"):
+            response = requests.request(method, url, **kwargs)
+        if response.status_code == 200:
+            outcome = "ok"
+        return response
+    finally:
+        LLM_REQUESTS.inc(backend=backend, operation=operation, outcome=outcome)
+
 def check_llm_status() -> Dict[str, Union[bool, str]]:
     """
     Check if the LLM service is available and responding.
@@ -54,23 +115,27 @@ def check_llm_status() -> Dict[str, Union[bool, str]]:
     """
     try:
         # First try the health endpoint
-        health_url = "http://localhost:11434/api/version"
-        response = requests.get(health_url, timeout=5)
+        health_url = LLM_HEALTH_URL
+        response = llm_request("GET", health_url, "local", "status", timeout=5)
         
         if response.status_code == 200:
             logger.info(f"LLM service is running: {response.json()}")
             
-            # Now check if the model is available by sending a minimal request
+            # Now check if the interactive model is available (and load it) by
+            # sending a minimal request
+            profile = MODEL_PROFILES["chat"]
             test_request = {
-                "model": LLM_MODEL,
+                "model": profile.model,
                 "messages": [
                     {"role": "user", "content": "Hello"}
                 ],
-                "stream": False
+                "stream": False,
+                "options": {"num_predict": 1},
+                "keep_alive": profile.keep_alive
             }
             
-            response = requests.post(
-                LLM_API_URL, 
+            response = llm_request(
+                "POST", LLM_API_URL, "local", "status",
                 json=test_request,
                 timeout=5
             )
@@ -79,8 +144,9 @@ def check_llm_status() -> Dict[str, Union[bool, str]]:
                 return {
                     "available": True,
                     "status": "LLM service is available and model is loaded",
-                    "message": f"Using model: {LLM_MODEL}",
-                    "using_fallback": False
+                    "message": f"Using model: {profile.model}",
+                    "using_fallback": False,
+                    "models": {name: p.model for name, p in MODEL_PROFILES.items()}
                 }
             else:
                 logger.warning(f"LLM model test failed: {response.status_code} - {response.text}")
@@ -96,7 +162,7 @@ def check_llm_status() -> Dict[str, Union[bool, str]]:
                 return {
                     "available": False,
                     "status": f"LLM service returned status code {response.status_code}",
-                    "message": f"The model {LLM_MODEL} may not be available. Try loading it with 'ollama pull {LLM_MODEL}'."
+                    "message": f"The model {profile.model} may not be available. Try loading it with 'ollama pull {profile.model}'."
                 }
         else:
             logger.warning(f"LLM health check failed: {response.status_code}")
@@ -131,7 +197,26 @@ def check_llm_status() -> Dict[str, Union[bool, str]]:
             "message": f"Make sure Ollama is running on your system. Error: {str(e)}"
         }
 
-def call_openai_api(messages, model=OPENAI_MODEL, temperature=0.7):
+_status = None
+_status_checked_at = 0.0
+_status_lock = threading.Lock()
+
+def get_llm_status(refresh: bool = False) -> Dict[str, Union[bool, str]]:
+    """
+    Cached result of check_llm_status(): the LLM is probed on first use and again once
+    the result is older than LLM_STATUS_TTL seconds (or when refresh is set), instead of
+    before every request. Concurrent callers wait for one probe rather than each sending
+    their own.
+    """
+    global _status, _status_checked_at
+    with _status_lock:
+        if refresh or _status is None or time.monotonic() - _status_checked_at > LLM_STATUS_TTL:
+            _status = check_llm_status()
+            _status_checked_at = time.monotonic()
+            logger.info(f"LLM service status: {_status}")
+        return _status
+
+def call_openai_api(messages, model=OPENAI_MODEL, temperature=0.7, operation="analysis"):
     """
     Call the OpenAI API with the given messages
     
@@ -139,6 +224,7 @@ def call_openai_api(messages, model=OPENAI_MODEL, temperature=0.7):
         messages: List of message objects with role and content
         model: OpenAI model to use
         temperature: Temperature for response generation
+        operation: Name of the calling operation, for the metrics
         
     Returns:
         The content of the assistant's response
@@ -161,8 +247,8 @@ def call_openai_api(messages, model=OPENAI_MODEL, temperature=0.7):
             "temperature": temperature
         }
         
-        response = requests.post(
-            OPENAI_API_URL,
+        response = llm_request(
+            "POST", OPENAI_API_URL, "openai", operation,
             headers=headers,
             json=payload,
             timeout=30
@@ -184,7 +270,14 @@ def call_openai_api(messages, model=OPENAI_MODEL, temperature=0.7):
             "error": f"Failed to call OpenAI API: {str(e)}"
         }
 
-def extract_error_context(lines: List[str], line_number: int, context_lines: int = 5) -> Dict[str, Any]:
+# Stack trace lines collected as related lines of an exception
+JAVA_FRAME_PATTERN = re.compile(r'^\s+at\s+[\w$.]+\(.*\)')
+PYTHON_FRAME_PATTERN = re.compile(r'File ".*", line \d+')
+# Lines of a stack trace block sent to the LLM; deep traces are mostly framework frames
+MAX_TRACE_LINES = 50
+
+def extract_error_context(lines: List[str], line_number: int, context_lines: int = 5,
+                          stack_trace: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     """
     Extract the error line and surrounding context
     
@@ -192,6 +285,8 @@ def extract_error_context(lines: List[str], line_number: int, context_lines: int
         lines: List of log lines
         line_number: Index of the error line
         context_lines: Number of lines to include before and after
+        stack_trace: Stack trace block found at ingest (see traces.py) that the error
+            line belongs to; without one the lines after the error are scanned for frames
         
     Returns:
         Dictionary with error line and context
@@ -213,11 +308,23 @@ def extract_error_context(lines: List[str], line_number: int, context_lines: int
     context_after = lines[line_number + 1:end_idx]
     
     # Try to identify error type
-    error_type = "Unknown"
-    for pattern, err_type in ERROR_PATTERNS.items():
-        if re.search(pattern, error_line):
-            error_type = err_type
-            break
+    error_type = classify_error(error_line) or "Unknown"
+    
+    if stack_trace is not None:
+        # The whole block by its range, apart from the error line itself
+        last = min(stack_trace["end"], stack_trace["start"] + MAX_TRACE_LINES - 1)
+        related_lines = [lines[i] for i in range(stack_trace["start"], last + 1) if i != line_number]
+        return {
+            "error_line": error_line,
+            "line_number": line_number,
+            "context_before": context_before,
+            "context_after": context_after,
+            "error_type": error_type,
+            "related_lines": related_lines,
+            "exception": stack_trace["exception"],
+            "root_cause": stack_trace["root_cause"],
+            "root_frame": stack_trace["root_frame"]
+        }
     
     # Try to identify more context by looking for related messages
     related_lines = []
@@ -226,11 +333,11 @@ def extract_error_context(lines: List[str], line_number: int, context_lines: int
     if "Exception" in error_line or "Error:" in error_line:
         # Search for stack trace lines
         for i in range(line_number + 1, min(len(lines), line_number + 20)):
-            if re.search(r'^\s+at\s+[\w$.]+\(.*\)', lines[i]):  # Java stack trace pattern
+            if JAVA_FRAME_PATTERN.search(lines[i]):          # Java stack trace pattern
                 related_lines.append(lines[i])
-            elif re.search(r'File ".*", line \d+', lines[i]):   # Python stack trace pattern
+            elif PYTHON_FRAME_PATTERN.search(lines[i]):      # Python stack trace pattern
                 related_lines.append(lines[i])
-            elif re.search(r'Caused by:', lines[i]):            # Java cause indication
+            elif 'Caused by:' in lines[i]:                   # Java cause indication
                 related_lines.append(lines[i])
             elif len(related_lines) > 0 and lines[i].strip() == "":  # Empty line after stack trace
                 break
@@ -244,16 +351,25 @@ def extract_error_context(lines: List[str], line_number: int, context_lines: int
         "related_lines": related_lines
     }
 
-def analyze_error(error_context: Dict[str, Any]) -> Dict[str, Any]:
+def analyze_error(error_context: Dict[str, Any], profile: str = "analysis") -> Dict[str, Any]:
     """
     Send the error context to the LLM for analysis
     
     Args:
         error_context: Dictionary with error information
+        profile: Name of the MODEL_PROFILES entry to use
         
     Returns:
         Analysis results from the LLM
     """
+    # Root cause of the stack trace found at ingest, if there is one
+    root_cause = ""
+    if error_context.get("root_cause"):
+        root_cause = f"ROOT CAUSE: {error_context['root_cause']}"
+        if error_context.get("root_frame"):
+            root_cause += f" at {error_context['root_frame']}"
+        root_cause += os.linesep
+    
     # Build a prompt for the LLM
     prompt = f"""You are an expert in Jenkins and CI/CD troubleshooting.
 Analyze the following error from a Jenkins log and provide detailed insights.
@@ -270,7 +386,7 @@ ADDITIONAL RELATED LINES:
 {os.linesep.join(error_context["related_lines"]) if error_context["related_lines"] else "None"}
 
 ERROR TYPE: {error_context["error_type"]}
-
+{root_cause}
 Provide a comprehensive analysis in JSON format with these fields:
 - error_summary: A concise summary of what went wrong
 - probable_cause: The most likely root cause of this error
@@ -280,220 +396,266 @@ Provide a comprehensive analysis in JSON format with these fields:
 Format your response as valid JSON. Be specific and practical in your suggested fixes.
 """
     
-    # Check LLM status to determine if we should use fallback
-    llm_status = check_llm_status()
-    using_fallback = llm_status.get("using_fallback", False)
+    try:
+        content = chat_completion([
+            {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ], "analyze_error", profile)
+    except requests.RequestException as e:
+        logger.error(f"Request to LLM failed: {str(e)}")
+        return {
+            "error": f"Failed to connect to LLM service: {str(e)}"
+        }
+    if isinstance(content, dict):
+        return content
     
+    # Try to parse the JSON from the response
+    try:
+        # Extract just the JSON part if there's surrounding text
+        json_match = re.search(r'({[\s\S]*})', content)
+        if json_match:
+            json_str = json_match.group(1)
+            analysis_result = json.loads(json_str)
+        else:
+            analysis_result = json.loads(content)
+            
+        # Validate against our expected schema
+        return {
+            "error_summary": analysis_result.get("error_summary", "No summary provided"),
+            "probable_cause": analysis_result.get("probable_cause", "No cause identified"),
+            "suggested_fix": analysis_result.get("suggested_fix", "No fix suggested"),
+            "additional_context": analysis_result.get("additional_context", "")
+        }
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse LLM response as JSON: {str(e)}")
+        
+        # Fall back to a simpler analysis if JSON parsing fails
+        return {
+            "error_summary": "Error analysis could not be structured properly",
+            "probable_cause": "The error appears to be in the log line shown",
+            "suggested_fix": "Please check the error message manually and look for common solutions",
+            "additional_context": f"Raw LLM response: {content[:500]}..."
+        }
+
+def chat_completion(messages: List[Dict[str, str]], operation: str,
+                    profile: str = "analysis") -> Union[str, Dict[str, Any]]:
+    """
+    Send chat messages to the local LLM, or to the OpenAI API when it's the fallback in
+    use or the local LLM returns an error
+    
+    Args:
+        messages: List of message objects with role and content
+        operation: Name of the calling operation, for the metrics
+        profile: Name of the MODEL_PROFILES entry with the model and options to use
+        
+    Returns:
+        The content of the response, or a dictionary with an "error" (and "details")
+    """
+    model_profile = MODEL_PROFILES[profile]
+    llm_status = get_llm_status()
     if not llm_status["available"]:
         return {
             "error": "LLM service is not available and no fallback configured",
             "details": llm_status["message"]
         }
     
+    if llm_status.get("using_fallback", False):
+        logger.info(f"Using OpenAI API for {operation}")
+        LLM_FALLBACKS.inc(operation=operation, reason="unavailable")
+        return call_openai_api(messages, temperature=model_profile.temperature, operation=operation)
+    
+    logger.info(f"Sending {operation} request to {model_profile.model} at {LLM_API_URL}")
+    request_data = {
+        "model": model_profile.model,
+        "messages": messages,
+        "stream": False,
+        "options": model_profile.options(),
+        "keep_alive": model_profile.keep_alive
+    }
+    response = llm_request(
+        "POST", LLM_API_URL, "local", operation,
+        json=request_data,
+        timeout=LLM_TIMEOUT
+    )
+    
+    if response.status_code != 200:
+        logger.error(f"LLM API returned error: {response.status_code} - {response.text}")
+        if USE_FALLBACK_LLM and OPENAI_API_KEY:
+            logger.info("Falling back to OpenAI API after local LLM failure")
+            LLM_FALLBACKS.inc(operation=operation, reason="local_error")
+            return call_openai_api(messages, temperature=model_profile.temperature, operation=operation)
+        return {
+            "error": f"LLM API returned status code {response.status_code}",
+            "details": response.text
+        }
+    
+    # Extract content from the chat API response
+    response_data = response.json()
+    if "message" in response_data:
+        return response_data["message"]["content"]
+    if "choices" in response_data and len(response_data["choices"]) > 0:
+        return response_data["choices"][0]["message"]["content"]
+    logger.error(f"Unexpected response format: {response_data}")
+    return {"error": "Unable to parse LLM response", "details": str(response_data)}
+
+def _format_context_lines(numbered_lines: Dict[int, str]) -> str:
+    """Log lines prefixed with their 1-based line numbers, with a marker for each gap"""
+    formatted = []
+    previous = None
+    for number in sorted(numbered_lines):
+        if previous is not None and number != previous + 1:
+            formatted.append("...")
+        formatted.append(f"{number + 1}: {numbered_lines[number]}")
+        previous = number
+    return os.linesep.join(formatted)
+
+def build_batch_prompt(error_contexts: List[Dict[str, Any]]) -> str:
+    """
+    One prompt for several errors of a log (contexts from extract_error_context()).
+    Their context lines go into one numbered excerpt, so lines shared by nearby errors
+    are only sent once, and the instructions are only sent once for the whole batch.
+    """
+    excerpt = {}
+    for context in error_contexts:
+        line_number = context["line_number"]
+        before = context["context_before"]
+        for offset, line in enumerate(before):
+            excerpt[line_number - len(before) + offset] = line
+        excerpt[line_number] = context["error_line"]
+        for offset, line in enumerate(context["context_after"]):
+            excerpt[line_number + 1 + offset] = line
+    
+    errors = []
+    for index, context in enumerate(error_contexts, 1):
+        entry = [f"ERROR {index} (line {context['line_number'] + 1}): {context['error_line']}",
+                 f"ERROR TYPE: {context['error_type']}"]
+        if context.get("root_cause"):
+            root_cause = f"ROOT CAUSE: {context['root_cause']}"
+            if context.get("root_frame"):
+                root_cause += f" at {context['root_frame']}"
+            entry.append(root_cause)
+        if context["related_lines"]:
+            entry.append("RELATED LINES:")
+            entry.extend(context["related_lines"])
+        errors.append(os.linesep.join(entry))
+    
+    return f"""You are an expert in Jenkins and CI/CD troubleshooting.
+Analyze each of the following {len(error_contexts)} errors from a Jenkins log and provide detailed insights.
+
+LOG EXCERPT (line number: text):
+{_format_context_lines(excerpt)}
+
+{(os.linesep + os.linesep).join(errors)}
+
+Respond with a JSON array holding one object per error, in the order above. Each object has these fields:
+- error: The number of the error it analyzes
+- error_summary: A concise summary of what went wrong
+- probable_cause: The most likely root cause of this error
+- suggested_fix: Step-by-step recommendations to resolve the issue
+- additional_context: Any helpful context about this type of error
+
+Respond with the JSON array only. Be specific and practical in your suggested fixes.
+"""
+
+def parse_batch_analysis(content: str, count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Per-error analyses from the response to build_batch_prompt(), in the order of the
+    errors: None for an error whose entry is missing or doesn't match
+    ErrorAnalysisResponse, and all None if the response isn't a JSON array
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    json_match = re.search(r'(\[[\s\S]*\])', content)
     try:
-        if using_fallback:
-            # Use OpenAI API
-            logger.info("Using OpenAI API for error analysis")
-            messages = [
-                {"role": "system", "content": "You are an expert in Jenkins and CI/CD troubleshooting who provides concise, accurate JSON responses."},
-                {"role": "user", "content": prompt}
-            ]
-            content = call_openai_api(messages)
-            
-            # Check if we got an error response
-            if isinstance(content, dict) and "error" in content:
-                return content
-        else:
-            # Use local LLM service
-            logger.info(f"Sending error analysis request to LLM at {LLM_API_URL}")
-            
-            # Create the request payload for chat API format
-            request_data = {
-                "model": LLM_MODEL,
-                "messages": [
-                    {"role": "system", "content": "You are an expert in Jenkins and CI/CD troubleshooting who provides concise, accurate JSON responses."},
-                    {"role": "user", "content": prompt}
-                ],
-                "stream": False
-            }
-            
-            # Send request to LLM API
-            response = requests.post(
-                LLM_API_URL,
-                json=request_data,
-                timeout=LLM_TIMEOUT
-            )
-            
-            if response.status_code != 200:
-                logger.error(f"LLM API returned error: {response.status_code} - {response.text}")
-                # Try fallback if available
-                if USE_FALLBACK_LLM and OPENAI_API_KEY:
-                    logger.info("Falling back to OpenAI API after local LLM failure")
-                    messages = [
-                        {"role": "system", "content": "You are an expert in Jenkins and CI/CD troubleshooting who provides concise, accurate JSON responses."},
-                        {"role": "user", "content": prompt}
-                    ]
-                    content = call_openai_api(messages)
-                    
-                    # Check if we got an error response
-                    if isinstance(content, dict) and "error" in content:
-                        return content
-                else:
-                    return {
-                        "error": f"LLM API returned status code {response.status_code}",
-                        "details": response.text
-                    }
-            else:
-                response_data = response.json()
-                
-                # Extract content from the chat API response
-                if "message" in response_data:
-                    content = response_data["message"]["content"]
-                elif "choices" in response_data and len(response_data["choices"]) > 0:
-                    content = response_data["choices"][0]["message"]["content"]
-                else:
-                    logger.error(f"Unexpected response format: {response_data}")
-                    return {"error": "Unable to parse LLM response", "details": str(response_data)}
+        entries = json.loads(json_match.group(1) if json_match else content)
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse batched LLM response as JSON: {str(e)}")
+        return results
+    if not isinstance(entries, list):
+        return results
+    
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        # Entries are matched by their error number, or by position without one
+        index = entry.get("error", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= count or results[index - 1] is not None:
+            continue
+        # Step-by-step fixes often come back as a list of steps
+        entry = {key: os.linesep.join(map(str, value)) if isinstance(value, list) else value
+                 for key, value in entry.items()}
+        try:
+            analysis = ErrorAnalysisResponse(**entry)
+        except ValidationError as e:
+            logger.warning(f"Invalid analysis of error {index} in batched LLM response: {str(e)}")
+            continue
+        results[index - 1] = {
+            "error_summary": analysis.error_summary,
+            "probable_cause": analysis.probable_cause,
+            "suggested_fix": analysis.suggested_fix,
+            "additional_context": analysis.additional_context or ""
+        }
+    return results
+
+def analyze_errors(error_contexts: List[Dict[str, Any]], batch_size: int = None,
+                   profile: str = "background") -> List[Dict[str, Any]]:
+    """
+    Analyze several errors of one log with one LLM request per batch_size errors
+    (LLM_BATCH_SIZE by default) instead of one each. Errors the batched response has
+    no valid analysis for are analyzed again with analyze_error(). Uses the background
+    model profile unless told otherwise.
+    
+    Returns:
+        Analysis results in the order of error_contexts, as analyze_error() returns them
+    """
+    batch_size = batch_size or LLM_BATCH_SIZE
+    results = []
+    for start in range(0, len(error_contexts), batch_size):
+        batch = error_contexts[start:start + batch_size]
+        if len(batch) == 1:
+            results.append(analyze_error(batch[0], profile))
+            continue
         
-        # Try to parse the JSON from the response
         try:
-            # Extract just the JSON part if there's surrounding text
-            json_match = re.search(r'({[\s\S]*})', content)
-            if json_match:
-                json_str = json_match.group(1)
-                analysis_result = json.loads(json_str)
+            content = chat_completion([
+                {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
+                {"role": "user", "content": build_batch_prompt(batch)}
+            ], "analyze_errors", profile)
+        except requests.RequestException as e:
+            logger.error(f"Request to LLM failed: {str(e)}")
+            content = {"error": f"Failed to connect to LLM service: {str(e)}"}
+        if isinstance(content, dict):
+            # The LLM is unavailable; per-error requests would fail the same way
+            results.extend(dict(content) for _ in batch)
+            continue
+        
+        for context, analysis in zip(batch, parse_batch_analysis(content, len(batch))):
+            if analysis is None:
+                LLM_BATCHED_ERRORS.inc(result="retried")
+                analysis = analyze_error(context, profile)
             else:
-                analysis_result = json.loads(content)
-                
-            # Validate against our expected schema
-            return {
-                "error_summary": analysis_result.get("error_summary", "No summary provided"),
-                "probable_cause": analysis_result.get("probable_cause", "No cause identified"),
-                "suggested_fix": analysis_result.get("suggested_fix", "No fix suggested"),
-                "additional_context": analysis_result.get("additional_context", "")
-            }
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse LLM response as JSON: {str(e)}")
-            
-            # Fall back to a simpler analysis if JSON parsing fails
-            return {
-                "error_summary": "Error analysis could not be structured properly",
-                "probable_cause": "The error appears to be in the log line shown",
-                "suggested_fix": "Please check the error message manually and look for common solutions",
-                "additional_context": f"Raw LLM response: {content[:500]}..."
-            }
-    except requests.RequestException as e:
-        logger.error(f"Request to LLM failed: {str(e)}")
-        return {
-            "error": f"Failed to connect to LLM service: {str(e)}"
-        }
+                LLM_BATCHED_ERRORS.inc(result="batched")
+            results.append(analysis)
+    return results
 
-def get_llm_analysis(prompt):
+def get_llm_analysis(prompt, profile="chat"):
     """
-    Generic function to get analysis from LLM for any prompt
+    Generic function to get analysis from LLM for any prompt, by default with the
+    interactive chat model
     """
     # Check LLM status to determine if we should use fallback
-    llm_status = check_llm_status()
-    using_fallback = llm_status.get("using_fallback", False)
-    
+    llm_status = get_llm_status()
     if not llm_status["available"]:
         return "Sorry, LLM service is not available and no fallback configured."
     
     try:
-        if using_fallback:
-            # Use OpenAI API
-            logger.info("Using OpenAI API for analysis")
-            messages = [
-                {"role": "user", "content": prompt}
-            ]
-            content = call_openai_api(messages)
-            
-            # Check if we got an error response
-            if isinstance(content, dict) and "error" in content:
-                return f"Error: {content.get('error')}"
-            
-            return content
-        else:
-            # Use local LLM service
-            # Use the chat API endpoint which is more likely to work with modern LLMs
-            llm_url = os.environ.get('LLM_API_URL', 'http://localhost:11434/api/chat')
-            model = os.environ.get('LLM_MODEL', 'llama3')
-            timeout = int(os.environ.get('LLM_TIMEOUT', 30))
-            
-            # Format payload for the chat endpoint
-            payload = {
-                "model": model,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "stream": False
-            }
-            
-            logger.info(f"Sending request to LLM service: {llm_url}")
-            response = requests.post(llm_url, json=payload, timeout=timeout)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Extract the response based on the API's response format
-                message = data.get('message', {})
-                content = message.get('content', "I couldn't analyze this properly.")
-                logger.info(f"Got response from LLM service: {content[:50]}...")
-                return content
-            else:
-                error_msg = f"Error from LLM API: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                
-                # Try fallback if available
-                if USE_FALLBACK_LLM and OPENAI_API_KEY:
-                    logger.info("Falling back to OpenAI API after local LLM failure")
-                    messages = [
-                        {"role": "user", "content": prompt}
-                    ]
-                    content = call_openai_api(messages)
-                    
-                    # Check if we got an error response
-                    if isinstance(content, dict) and "error" in content:
-                        return f"Error: {content.get('error')}"
-                    
-                    return content
-                
-                return "Sorry, I encountered an error while analyzing."
-    
+        content = chat_completion([{"role": "user", "content": prompt}], "analysis", profile)
     except Exception as e:
         error_msg = f"LLM analysis error: {str(e)}"
         logger.error(error_msg)
         return "Sorry, I encountered an error while analyzing the log. Please try again later."
-
-# Common error patterns and their types
-ERROR_PATTERNS = {
-    r"java\.lang\.[A-Za-z]+Exception": "Java Exception",
-    r"java\.io\.[A-Za-z]+Exception": "Java IO Exception",
-    r"java\.net\.[A-Za-z]+Exception": "Java Network Exception",
-    r"org\.springframework\.[A-Za-z]+Exception": "Spring Framework Exception",
-    r"org\.hibernate\.[A-Za-z]+Exception": "Hibernate Exception",
-    r"javax\.[A-Za-z]+Exception": "Java EE Exception",
-    r"com\.amazonaws\.[A-Za-z]+Exception": "AWS SDK Exception",
-    r"Traceback \(most recent call last\)": "Python Exception",
-    r"ImportError|ModuleNotFoundError": "Python Import Error",
-    r"SyntaxError": "Python Syntax Error",
-    r"TypeError|ValueError|KeyError|IndexError": "Python Type/Value Error",
-    r"npm ERR!": "NPM Error",
-    r"yarn error": "Yarn Error",
-    r"error: .* failed with exit code": "Build/Shell Error",
-    r"Execution failed for task": "Gradle Task Error",
-    r"Failed to execute goal": "Maven Goal Error",
-    r"FATAL:": "Fatal Error",
-    r"ERROR:": "Generic Error",
-    r"WARNING:": "Warning Message",
-    r"docker: Error": "Docker Error",
-    r"kubectl.* error": "Kubernetes Error",
-    r"SQLSTATE\[\d+\]": "SQL Error",
-    r"ORA-\d+": "Oracle Database Error",
-    r"Error \d+ \(\d+\)": "MySQL Error",
-    r"error MSB\d+": "MSBuild Error",
-    r"error CS\d+": "C# Compiler Error",
-    r"error TS\d+": "TypeScript Error"
-}
+    
+    # Check if we got an error response
+    if isinstance(content, dict):
+        return f"Error: {content.get('error')}"
+    logger.info(f"Got response from LLM service: {content[:50]}...")
+    return content
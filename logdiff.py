@@ -0,0 +1,221 @@
+"""
+Log diff for WolfsLogDebugger
+Compares a build's log against a baseline (e.g. the last green build) by normalized line
+hashes: new, disappeared and changed error signatures, the first region where the logs
+diverge, and the lines only one of them has
+"""
+
+import re
+import hashlib
+import itertools
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Sequence
+
+from rules import classify
+
+# Tokens that start with a digit (timestamps, durations, build numbers, ports, IDs and
+# the hex digits of hashes) differ between builds without meaning anything
+VOLATILE_TOKEN = re.compile(r'[0-9][0-9A-Za-z_.:\-]*')
+MASK = '#'
+
+# Lines hashed per chunk read from a (memory-mapped) log
+HASH_CHUNK_LINES = 10000
+# Array slices compared at a time when looking for the common prefix and suffix
+COMPARE_CHUNK = 4096
+# How far past the point of divergence to look for the logs to line up again, and how
+# many consecutive equal lines count as lined up
+RESYNC_WINDOW = 20000
+RESYNC_LINES = 3
+MAX_RESYNC_CANDIDATES = 8
+# Lines and signatures returned per category
+DEFAULT_MAX_LINES = 500
+DEFAULT_MAX_SIGNATURES = 100
+
+
+def normalize(line: str) -> str:
+    """line with its volatile tokens masked"""
+    return VOLATILE_TOKEN.sub(MASK, line)
+
+
+def line_hashes(lines: Iterable[str]) -> array:
+    """
+    64-bit hashes of the normalized lines, read in chunks so a memory-mapped log is
+    never decoded as a whole. blake2b rather than hash() so the result is the same in
+    every process and can be cached.
+    """
+    hashes = array('Q')
+    blake2b = hashlib.blake2b
+    sub = VOLATILE_TOKEN.sub
+    iterator = iter(lines)
+    while True:
+        chunk = list(itertools.islice(iterator, HASH_CHUNK_LINES))
+        if not chunk:
+            return hashes
+        hashes.extend(
+            int.from_bytes(blake2b(sub(MASK, line).encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
+            for line in chunk
+        )
+
+
+def common_prefix(a: array, b: array) -> int:
+    """Number of leading hashes a and b share"""
+    limit = min(len(a), len(b))
+    start = 0
+    while start < limit:
+        end = min(start + COMPARE_CHUNK, limit)
+        if a[start:end] != b[start:end]:
+            return next(i for i in range(start, end) if a[i] != b[i])
+        start = end
+    return limit
+
+
+def common_suffix(a: array, b: array, prefix: int) -> int:
+    """Number of trailing hashes a and b share, not counting their common prefix"""
+    limit = min(len(a), len(b)) - prefix
+    length = 0
+    while length < limit:
+        step = min(COMPARE_CHUNK, limit - length)
+        a_chunk = a[len(a) - length - step:len(a) - length]
+        b_chunk = b[len(b) - length - step:len(b) - length]
+        if a_chunk != b_chunk:
+            return length + next(i for i in range(step) if a_chunk[step - 1 - i] != b_chunk[step - 1 - i])
+        length += step
+    return limit
+
+
+def first_divergence(a: array, b: array, prefix: int, a_end: int, b_end: int):
+    """
+    End of the first region where the logs differ, which starts after their common
+    prefix: the first point, within RESYNC_WINDOW lines, where RESYNC_LINES
+    consecutive lines of b reappear in a.
+
+    Returns:
+        (end in a, end in b, whether the logs line up again there); without a match
+        the ends are as far as the window reached
+    """
+    a_limit = min(a_end, prefix + RESYNC_WINDOW)
+    b_limit = min(b_end, prefix + RESYNC_WINDOW)
+    # A few positions per line are enough: repeated lines ("[Pipeline] }") rarely
+    # start the match, and keeping them all would make this quadratic
+    positions: Dict[int, List[int]] = {}
+    for i in range(prefix, a_limit):
+        found = positions.setdefault(a[i], [])
+        if len(found) < MAX_RESYNC_CANDIDATES:
+            found.append(i)
+
+    for j in range(prefix, b_limit):
+        for i in positions.get(b[j], ()):
+            run = min(RESYNC_LINES, a_end - i, b_end - j)
+            if a[i:i + run] == b[j:j + run]:
+                return i, j, True
+    return a_limit, b_limit, False
+
+
+def unmatched(a: array, b: array, start: int, a_end: int, b_end: int):
+    """
+    Indexes in [start, end) of the lines of a without an equal line in b and the other
+    way round, matching repeated lines one for one
+    """
+    remaining = Counter(a[start:a_end])
+    remaining.subtract(b[start:b_end])
+    only_a, only_b = [], []
+    # Positive counts are lines a has more of, negative ones lines b has more of; the
+    # first occurrences are reported, as the ones closest to where the logs diverge
+    extra_a = {h: n for h, n in remaining.items() if n > 0}
+    extra_b = {h: -n for h, n in remaining.items() if n < 0}
+    for extra, hashes, end, out in ((extra_a, a, a_end, only_a), (extra_b, b, b_end, only_b)):
+        for i in range(start, end):
+            n = extra.get(hashes[i])
+            if n:
+                extra[hashes[i]] = n - 1
+                out.append(i)
+    return only_a, only_b
+
+
+def error_signatures(lines: Sequence[str], error_lines: Iterable[int]) -> Dict[str, Dict[str, Any]]:
+    """
+    Error lines grouped by their normalized text: how often each occurs, where first,
+    and its error type
+    """
+    signatures: Dict[str, Dict[str, Any]] = {}
+    for i in sorted(error_lines):
+        if i >= len(lines):
+            continue
+        line = lines[i]
+        signature = normalize(line.strip())
+        entry = signatures.get(signature)
+        if entry is None:
+            signatures[signature] = {"signature": signature, "count": 1, "first_line": i, "example": line,
+                                     "error_type": classify(line) or "Unknown"}
+        else:
+            entry["count"] += 1
+    return signatures
+
+
+def _by_count(entry: Dict[str, Any]):
+    return -entry["count"], entry["first_line"]
+
+
+def _with_lines(lines: Sequence[str], indexes: List[int], max_lines: int) -> List[Dict[str, Any]]:
+    return [{"line": i, "content": lines[i]} for i in indexes[:max_lines]]
+
+
+def diff_logs(base_lines: Sequence[str], base_hashes: array, base_errors: Iterable[int],
+              target_lines: Sequence[str], target_hashes: array, target_errors: Iterable[int],
+              max_lines: int = DEFAULT_MAX_LINES,
+              max_signatures: int = DEFAULT_MAX_SIGNATURES) -> Dict[str, Any]:
+    """
+    What changed from base to target. Only the lines in the result are read from
+    either log; everything else works on the hashes from line_hashes().
+    """
+    base_len, target_len = len(base_hashes), len(target_hashes)
+    prefix = common_prefix(base_hashes, target_hashes)
+    suffix = common_suffix(base_hashes, target_hashes, prefix)
+    base_end, target_end = base_len - suffix, target_len - suffix
+
+    identical = prefix == base_len == target_len
+    divergence = None
+    if not identical:
+        base_stop, target_stop, resynced = first_divergence(base_hashes, target_hashes, prefix, base_end, target_end)
+        divergence = {
+            "base": [prefix, base_stop],  # half-open line ranges
+            "target": [prefix, target_stop],
+            # Whether the logs line up again after the region, rather than differing
+            # to the end (or beyond the window that was searched)
+            "resynced": resynced or (suffix > 0 and base_stop == base_end and target_stop == target_end),
+        }
+    removed, added = unmatched(base_hashes, target_hashes, prefix, base_end, target_end)
+
+    base_signatures = error_signatures(base_lines, base_errors)
+    target_signatures = error_signatures(target_lines, target_errors)
+    new = [entry for key, entry in target_signatures.items() if key not in base_signatures]
+    disappeared = [entry for key, entry in base_signatures.items() if key not in target_signatures]
+    changed = [
+        dict(entry, base_count=base_signatures[key]["count"])
+        for key, entry in target_signatures.items()
+        if key in base_signatures and base_signatures[key]["count"] != entry["count"]
+    ]
+
+    if divergence is not None:
+        for side, lines in (("base", base_lines), ("target", target_lines)):
+            start, end = divergence[side]
+            divergence[f"{side}_lines"] = _with_lines(lines, list(range(start, end)), max_lines)
+
+    return {
+        "identical": identical,
+        "base_line_count": base_len,
+        "target_line_count": target_len,
+        "common_prefix": prefix,
+        "common_suffix": suffix,
+        "first_divergence": divergence,
+        "added_count": len(added),
+        "removed_count": len(removed),
+        "added_lines": _with_lines(target_lines, added, max_lines),
+        "removed_lines": _with_lines(base_lines, removed, max_lines),
+        "error_signatures": {
+            "new": sorted(new, key=_by_count)[:max_signatures],
+            "disappeared": sorted(disappeared, key=_by_count)[:max_signatures],
+            "changed": sorted(changed, key=_by_count)[:max_signatures],
+        },
+    }
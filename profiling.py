@@ -0,0 +1,213 @@
+"""
+Request profiling for WolfsLogDebugger
+Opt-in per-request profiles (cProfile or stack sampling) with a span breakdown of the
+analysis, database and LLM work, keeping the slowest requests for download
+"""
+
+import io
+import sys
+import time
+import uuid
+import heapq
+import marshal
+import random
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Seconds between stack samples in sampling mode
+SAMPLE_INTERVAL = 0.005
+
+_local = threading.local()
+
+
+@contextmanager
+def span(name: str):
+    """
+    Attribute the time spent in the with block to name in the current request's
+    profile; does nothing when the request isn't being profiled
+    """
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, time.perf_counter() - start)
+
+
+def record_span(name: str, seconds: float) -> None:
+    """Add an already measured duration to the current request's profile, if any"""
+    profile = getattr(_local, 'profile', None)
+    if profile is not None:
+        profile.add_span(name, seconds)
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread at a fixed interval, collecting the samples as
+    folded stacks (the input format of flamegraph.pl and speedscope)
+    """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """Profile of one request: timings, spans and the raw profiler output"""
+
+    def __init__(self, method: str, path: str, mode: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.spans: Dict[str, List[float]] = {}  # name -> [calls, seconds]
+        self.data: bytes = b''
+        self._start = time.perf_counter()
+        self._profiler: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    def add_span(self, name: str, seconds: float) -> None:
+        calls = self.spans.setdefault(name, [0, 0.0])
+        calls[0] += 1
+        calls[1] += seconds
+
+    @property
+    def filename(self) -> str:
+        return f"profile-{self.id}.{'pstats' if self.mode == 'cprofile' else 'folded'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "mode": self.mode,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 6),
+            "spans": {
+                name: {"calls": calls, "seconds": round(seconds, 6)}
+                for name, (calls, seconds) in sorted(self.spans.items(), key=lambda item: -item[1][1])
+            },
+            "download_url": f"/profiles/{self.id}/download",
+        }
+
+
+class Profiler:
+    """
+    Decides which requests to profile, runs the profiler around them and keeps the
+    keep slowest profiles.
+
+    Only one request is profiled at a time: cProfile can't run in several threads at
+    once on recent Pythons, and it keeps overhead bounded under load.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, keep: int = 20, mode: str = 'cprofile'):
+        if mode not in ('cprofile', 'sampling'):
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.sample_rate = sample_rate  # percent of requests profiled without the header
+        self.keep = keep
+        self.mode = mode
+        self._active = threading.Lock()
+        self._lock = threading.Lock()
+        self._slowest: List[tuple] = []  # min-heap of (duration, id, profile)
+
+    def start(self, method: str, path: str, forced: bool = False) -> Optional[RequestProfile]:
+        """
+        Start profiling the current request if forced or sampled, and the profiler is free
+        """
+        if not forced and not (self.sample_rate and random.random() * 100 < self.sample_rate):
+            return None
+        if not self._active.acquire(blocking=False):
+            return None
+
+        profile = RequestProfile(method, path, self.mode)
+        if self.mode == 'cprofile':
+            profile._profiler = cProfile.Profile()
+            profile._profiler.enable()
+        else:
+            profile._sampler = StackSampler(threading.get_ident())
+            profile._sampler.start()
+        _local.profile = profile
+        return profile
+
+    def stop(self, profile: RequestProfile, status: Optional[int] = None) -> None:
+        """Finish a profile started by start() and keep it if it's among the slowest"""
+        try:
+            profile.duration = time.perf_counter() - profile._start
+            profile.status = status
+            if profile._profiler is not None:
+                profile._profiler.disable()
+                profile._profiler.create_stats()
+                profile.data = marshal.dumps(profile._profiler.stats)
+                profile._profiler = None
+            if profile._sampler is not None:
+                profile._sampler.stop()
+                profile.data = profile._sampler.folded().encode('utf-8')
+                profile._sampler = None
+        finally:
+            _local.profile = None
+            self._active.release()
+
+        with self._lock:
+            entry = (profile.duration, profile.id, profile)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif profile.duration > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def profiles(self) -> List[RequestProfile]:
+        """Kept profiles, slowest first"""
+        with self._lock:
+            return [profile for _, _, profile in sorted(self._slowest, reverse=True)]
+
+    def get(self, profile_id: str) -> Optional[RequestProfile]:
+        with self._lock:
+            for _, _, profile in self._slowest:
+                if profile.id == profile_id:
+                    return profile
+        return None
+
+    @staticmethod
+    def summary(profile: RequestProfile, limit: int = 30) -> str:
+        """Top functions by cumulative time, as printed by pstats"""
+        if profile.mode != 'cprofile':
+            return ''
+        import pstats
+        stats = pstats.Stats(stream=io.StringIO())
+        stats.stats = marshal.loads(profile.data)
+        stats.get_top_level_stats()
+        stats.sort_stats('cumulative').print_stats(limit)
+        return stats.stream.getvalue()
@@ -0,0 +1,166 @@
+"""
+Retention and compaction for WolfsLogDebugger
+Deletes stored logs and downloaded files that fall outside the configured limits,
+then compacts the database, either on demand or from a background thread
+"""
+
+import os
+import glob
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs the job
+    fcntl = None
+
+from storage import LogStorage
+
+logger = logging.getLogger(__name__)
+
+
+class RetentionPolicy(BaseModel):
+    max_age_days: Optional[float] = Field(None, description="Delete logs uploaded more than this many days ago")
+    max_count: Optional[int] = Field(None, description="Keep at most this many of the newest logs")
+    max_bytes: Optional[int] = Field(None, description="Keep the newest logs whose stored content fits in this many bytes")
+    batch_size: int = Field(500, description="Logs deleted per transaction")
+
+    def is_enabled(self) -> bool:
+        return any(limit is not None for limit in (self.max_age_days, self.max_count, self.max_bytes))
+
+
+def expired_files(paths: List[str], policy: RetentionPolicy, now: Optional[float] = None) -> List[str]:
+    """
+    Apply policy to files on disk using their modification time and size
+    """
+    now = now or time.time()
+    entries = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    # Newest first so count and byte limits keep the most recent files
+    entries.sort(reverse=True)
+    expired = []
+    total_bytes = 0
+    for position, (mtime, size, path) in enumerate(entries, start=1):
+        total_bytes += size
+        if ((policy.max_age_days is not None and now - mtime > policy.max_age_days * 86400)
+                or (policy.max_count is not None and position > policy.max_count)
+                or (policy.max_bytes is not None and total_bytes > policy.max_bytes)):
+            expired.append(path)
+    return expired
+
+
+def run_retention(storage: LogStorage, policy: RetentionPolicy, download_dir: Optional[str] = None,
+                  on_deleted: Optional[Callable[[List[str]], None]] = None) -> Dict[str, Any]:
+    """
+    Delete expired logs in batched transactions, prune downloaded log files and compact
+    the database.
+
+    Args:
+        storage: Storage backend to clean up
+        policy: Limits to enforce
+        download_dir: Directory holding download_*.log files from URL fetches
+        on_deleted: Called with each batch of deleted log IDs (e.g. to evict caches)
+
+    Returns:
+        Report with the number of logs and files removed and the bytes reclaimed
+    """
+    started = time.time()
+    report = {
+        "logs_deleted": 0,
+        "files_deleted": 0,
+        "file_bytes_reclaimed": 0,
+        "database_bytes_reclaimed": 0,
+    }
+    if not policy.is_enabled():
+        return report
+
+    size_before = storage.database_size()
+    expired = storage.expired_log_ids(policy.max_age_days, policy.max_count, policy.max_bytes)
+    for offset in range(0, len(expired), policy.batch_size):
+        batch = expired[offset:offset + policy.batch_size]
+        report["logs_deleted"] += storage.delete_logs(batch)
+        if on_deleted:
+            on_deleted(batch)
+
+    if download_dir:
+        for path in expired_files(glob.glob(os.path.join(download_dir, "download_*.log")), policy):
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not remove {path}: {e}")
+                continue
+            report["files_deleted"] += 1
+            report["file_bytes_reclaimed"] += size
+
+    if report["logs_deleted"]:
+        storage.compact()
+    report["database_bytes_reclaimed"] = max(0, size_before - storage.database_size())
+    report["duration_seconds"] = round(time.time() - started, 3)
+    logger.info(f"Retention run complete: {report}")
+    return report
+
+
+class RetentionScheduler:
+    """
+    Runs a retention job every interval seconds on a daemon thread.
+
+    The job gets its own storage connection (SQLite connections are per thread) and
+    deletes in small transactions, so request handling carries on while it runs.
+
+    With lock_path, only the process holding an exclusive lock on that file runs the
+    job, so several worker processes on one host don't all delete and compact at once.
+    The lock is kept until the process exits; the others retry every interval and take
+    over if the holder goes away.
+    """
+
+    def __init__(self, job: Callable[[], Dict[str, Any]], interval: float, lock_path: Optional[str] = None):
+        self.job = job
+        self.interval = interval
+        self.lock_path = lock_path
+        self.last_report: Optional[Dict[str, Any]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock_file = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def is_leader(self) -> bool:
+        """Whether this process holds the lock (always true without a lock_path)"""
+        if self.lock_path is None or fcntl is None or self._lock_file is not None:
+            return True
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        logger.info(f"Process {os.getpid()} runs the retention job")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                if not self.is_leader():
+                    continue
+                self.last_report = self.job()
+            except Exception as e:
+                logger.error(f"Retention job failed: {str(e)}")
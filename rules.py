@@ -0,0 +1,191 @@
+"""
+Error type rules for WolfsLogDebugger
+Compiles the error-type patterns (built-in and from ERROR_RULES_FILE) once and types a
+line by only trying the rules whose required literal text appears in it
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from re import _parser as sre_parse
+    from re._constants import BRANCH, LITERAL, SRE_FLAG_IGNORECASE
+except ImportError:  # Python < 3.11
+    import sre_parse
+    from sre_constants import BRANCH, LITERAL, SRE_FLAG_IGNORECASE
+
+logger = logging.getLogger(__name__)
+
+# Built-in rules, tried in order: the first matching pattern names the error type
+ERROR_PATTERNS = {
+    r"java\.lang\.[A-Za-z]+Exception": "Java Exception",
+    r"java\.io\.[A-Za-z]+Exception": "Java IO Exception",
+    r"java\.net\.[A-Za-z]+Exception": "Java Network Exception",
+    r"org\.springframework\.[A-Za-z]+Exception": "Spring Framework Exception",
+    r"org\.hibernate\.[A-Za-z]+Exception": "Hibernate Exception",
+    r"javax\.[A-Za-z]+Exception": "Java EE Exception",
+    r"com\.amazonaws\.[A-Za-z]+Exception": "AWS SDK Exception",
+    r"Traceback \(most recent call last\)": "Python Exception",
+    r"ImportError|ModuleNotFoundError": "Python Import Error",
+    r"SyntaxError": "Python Syntax Error",
+    r"TypeError|ValueError|KeyError|IndexError": "Python Type/Value Error",
+    r"npm ERR!": "NPM Error",
+    r"yarn error": "Yarn Error",
+    r"error: .* failed with exit code": "Build/Shell Error",
+    r"Execution failed for task": "Gradle Task Error",
+    r"Failed to execute goal": "Maven Goal Error",
+    r"FATAL:": "Fatal Error",
+    r"ERROR:": "Generic Error",
+    r"WARNING:": "Warning Message",
+    r"docker: Error": "Docker Error",
+    r"kubectl.* error": "Kubernetes Error",
+    r"SQLSTATE\[\d+\]": "SQL Error",
+    r"ORA-\d+": "Oracle Database Error",
+    r"Error \d+ \(\d+\)": "MySQL Error",
+    r"error MSB\d+": "MSBuild Error",
+    r"error CS\d+": "C# Compiler Error",
+    r"error TS\d+": "TypeScript Error"
+}
+
+# Shortest literal worth prefiltering on; rules without one are tried on every line
+MIN_LITERAL_LENGTH = 2
+
+
+def required_literals(pattern: str) -> Optional[List[str]]:
+    """
+    Literal strings one of which appears in every match of pattern, or None if there's
+    no such set (e.g. the pattern is case-insensitive or starts with a wildcard).
+
+    A top-level alternation needs one literal per branch; otherwise the longest run of
+    literal characters is used.
+    """
+    parsed = sre_parse.parse(pattern)
+    if parsed.state.flags & SRE_FLAG_IGNORECASE:
+        return None
+
+    items = list(parsed)
+    if len(items) == 1 and items[0][0] is BRANCH:
+        literals = [_longest_literal(branch) for branch in items[0][1][1]]
+        return literals if all(literals) else None
+    literal = _longest_literal(items)
+    return [literal] if literal else None
+
+
+def _longest_literal(items) -> Optional[str]:
+    longest = current = ''
+    for op, value in items:
+        if op is LITERAL:
+            current += chr(value)
+            longest = max(longest, current, key=len)
+        else:
+            current = ''
+    return longest if len(longest) >= MIN_LITERAL_LENGTH else None
+
+
+class Rule:
+    def __init__(self, pattern: str, error_type: str, ignore_case: bool = False):
+        self.pattern = pattern
+        self.error_type = error_type
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        self.literals = None if ignore_case else required_literals(pattern)
+
+
+class RuleEngine:
+    """
+    Types error lines with an ordered list of rules.
+
+    Every rule's required literals go into one alternation that is searched from each
+    position after the previous hit, so all occurrences are found even when they
+    overlap, as with Aho-Corasick. Only rules with a literal in the line are then tried,
+    in order, so a line without any known literal costs one scan instead of a search
+    per rule. Candidate sets are bitmasks over the rule indexes.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        self._always = 0
+        rules_by_literal: Dict[str, int] = {}
+        for index, rule in enumerate(self.rules):
+            if rule.literals is None:
+                self._always |= 1 << index
+                continue
+            for literal in rule.literals:
+                rules_by_literal[literal] = rules_by_literal.get(literal, 0) | 1 << index
+
+        # The alternation reports the longest literal starting at a position, so that
+        # literal also stands for the shorter ones it begins with
+        literals = sorted(rules_by_literal, key=len, reverse=True)
+        self._candidates: Dict[str, int] = {}
+        for literal in literals:
+            mask = 0
+            for other in literals:
+                if literal.startswith(other):
+                    mask |= rules_by_literal[other]
+            self._candidates[literal] = mask
+        self._prefilter = re.compile('|'.join(re.escape(literal) for literal in literals)) if literals else None
+
+    def candidates(self, line: str) -> int:
+        """Bitmask of the rules that might match line"""
+        mask = self._always
+        if self._prefilter is not None:
+            search = self._prefilter.search
+            match = search(line)
+            while match is not None:
+                mask |= self._candidates[match.group()]
+                match = search(line, match.start() + 1)
+        return mask
+
+    def classify(self, line: str) -> Optional[str]:
+        """Error type of the first rule matching line, or None"""
+        mask = self.candidates(line)
+        while mask:
+            lowest = mask & -mask
+            rule = self.rules[lowest.bit_length() - 1]
+            if rule.regex.search(line):
+                return rule.error_type
+            mask ^= lowest
+        return None
+
+
+def load_rules(path: Optional[str] = None) -> List[Rule]:
+    """
+    Rules from the JSON file at path, followed by the built-in ERROR_PATTERNS. The file
+    holds a list of {"pattern": ..., "type": ..., "ignore_case": false}; its rules are
+    tried first so they can override the built-in types.
+    """
+    rules = []
+    if path:
+        with open(path, encoding='utf8') as f:
+            for entry in json.load(f):
+                rules.append(Rule(entry["pattern"], entry["type"], entry.get("ignore_case", False)))
+    rules.extend(Rule(pattern, error_type) for pattern, error_type in ERROR_PATTERNS.items())
+    return rules
+
+
+_engine: Optional[RuleEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rule_engine() -> RuleEngine:
+    """Rule engine for the built-in rules plus ERROR_RULES_FILE, compiled on first use"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                path = os.environ.get("ERROR_RULES_FILE")
+                try:
+                    rules = load_rules(path)
+                except (OSError, ValueError, KeyError, re.error) as e:
+                    logger.error(f"Ignoring error rules in {path}: {str(e)}")
+                    rules = load_rules()
+                _engine = RuleEngine(rules)
+    return _engine
+
+
+def classify(line: str) -> Optional[str]:
+    """Error type of line according to the configured rules, or None"""
+    return get_rule_engine().classify(line)
@@ -0,0 +1,99 @@
+-- PostgreSQL schema for the tables used by storage.py (see schema.sql and the
+-- migrations in database.py for the SQLite equivalent)
+
+-- Table to store log files with analysis results
+CREATE TABLE IF NOT EXISTS log_files (
+    log_id TEXT PRIMARY KEY,
+    file_name TEXT NOT NULL,
+    source_type TEXT NOT NULL,  -- 'file' or 'url'
+    upload_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    error_count INTEGER NOT NULL,
+    warning_count INTEGER NOT NULL,
+    content TEXT NOT NULL      -- JSON string of log lines
+);
+
+-- Table to store error lines for each log file
+CREATE TABLE IF NOT EXISTS log_errors (
+    id BIGSERIAL PRIMARY KEY,
+    log_id TEXT NOT NULL,
+    line_number INTEGER NOT NULL,
+    level TEXT NOT NULL  -- 'Error', 'Warning', 'Info'
+);
+
+-- Table to store chat messages between user and the LLM
+CREATE TABLE IF NOT EXISTS chat_history (
+    id BIGSERIAL PRIMARY KEY,
+    file_id TEXT,  -- UUID of the related log file (can be null for general chats)
+    user_message TEXT,
+    llm_message TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Table to store successful error solutions for training
+CREATE TABLE IF NOT EXISTS error_solutions (
+    id BIGSERIAL PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    line_number INTEGER NOT NULL,
+    error_text TEXT NOT NULL,
+    solution TEXT NOT NULL,
+    was_helpful BOOLEAN DEFAULT FALSE,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Background job state shared by every worker process (see jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    state TEXT NOT NULL,              -- JSON of Job.to_dict()
+    updated_at DOUBLE PRECISION NOT NULL  -- Unix time of the last save
+);
+
+-- Exception blocks found in each log file (see traces.py)
+CREATE TABLE IF NOT EXISTS stack_traces (
+    id BIGSERIAL PRIMARY KEY,
+    log_id TEXT NOT NULL,
+    start_line INTEGER NOT NULL,
+    end_line INTEGER NOT NULL,   -- inclusive
+    language TEXT NOT NULL,      -- 'java', 'python', 'node' or 'go'
+    exception TEXT NOT NULL,
+    root_cause TEXT NOT NULL,
+    root_frame TEXT,
+    root_frame_line INTEGER
+);
+
+-- History summaries, updated as logs are saved (see storage.py)
+CREATE TABLE IF NOT EXISTS history_daily (
+    day TEXT PRIMARY KEY,  -- YYYY-MM-DD of upload_time
+    logs INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    warnings INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS history_jobs (
+    job TEXT PRIMARY KEY,  -- see ingest.job_name()
+    logs INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    warnings INTEGER NOT NULL,
+    last_upload_time TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS history_error_types (
+    day TEXT NOT NULL,
+    error_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, error_type)
+);
+
+-- Prompt-ready summary of each log for chat (see chatcontext.py)
+CREATE TABLE IF NOT EXISTS chat_contexts (
+    log_id TEXT PRIMARY KEY,
+    context TEXT NOT NULL  -- JSON of build_chat_context()
+);
+
+CREATE INDEX IF NOT EXISTS idx_log_errors_log_id ON log_errors (log_id);
+CREATE INDEX IF NOT EXISTS idx_error_solutions_file_id ON error_solutions (file_id);
+CREATE INDEX IF NOT EXISTS idx_chat_history_file_id ON chat_history (file_id);
+CREATE INDEX IF NOT EXISTS idx_log_files_upload_time_log_id ON log_files (upload_time, log_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_stack_traces_log_id ON stack_traces (log_id, start_line);
@@ -9,6 +9,14 @@ let currentLogState = {
     warningCount: 0
 };
 
+// Live build state
+let liveTail = {
+    fileId: null,
+    seq: 0,
+    timer: null,
+    criticalLines: []
+};
+
 // LLM connection state
 let llmState = {
     available: false,
@@ -932,6 +940,7 @@ function loadHistory() {
 
 // Function to load a log by ID from history
 function loadLogById(logId) {
+    stopLiveTail();
     fetch(`/log/${logId}`)
         .then(response => {
             if (!response.ok) {
@@ -1199,6 +1208,7 @@ function showLlmSection(result) {
 }
 
 async function analyzeLog(source) {
+    stopLiveTail();
     const formData = new FormData();
     let isValid = false;
     
@@ -1227,6 +1237,13 @@ async function analyzeLog(source) {
         const skipSSL = document.getElementById('skipSSLVerification').checked;
         formData.append('skip_ssl_verify', skipSSL);
         
+        // Running builds are followed incrementally instead of analyzed once
+        const followLive = document.getElementById('followLiveBuild');
+        if (followLive && followLive.checked) {
+            startLiveTail(url, skipSSL);
+            return;
+        }
+        
         isValid = true;
     }
     
@@ -1271,6 +1288,10 @@ async function analyzeLog(source) {
         }
         return response.json();
     })
+    .then(result => {
+        // Large logs are analyzed in the background; wait for the job to finish
+        return result.job_id ? waitForJob(result.job_id) : result;
+    })
     .then(result => {
         console.log("Analysis result:", result); // Debug
         
@@ -1346,3 +1367,132 @@ async function analyzeLog(source) {
         if (spinner) spinner.style.display = 'none';
     });
 }
+
+// Follow a running Jenkins build and apply analysis deltas as they arrive
+async function startLiveTail(url, skipSSL) {
+    stopLiveTail();
+    
+    try {
+        const response = await fetch('/tail', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ url: url, skip_ssl_verify: skipSSL })
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to start live analysis');
+        }
+        
+        currentLogState.fileId = data.file_id;
+        currentLogState.fileName = data.name;
+        currentLogState.totalLines = 0;
+        currentLogState.currentPosition = 0;
+        currentLogState.errorCount = 0;
+        currentLogState.warningCount = 0;
+        currentLogState.hasAnalysis = true;
+        
+        liveTail.fileId = data.file_id;
+        liveTail.seq = 0;
+        liveTail.criticalLines = [];
+        
+        const resultsCard = document.getElementById('resultsCard');
+        if (resultsCard) resultsCard.style.display = 'block';
+        
+        showToast('Following live build log...');
+        pollLiveTail();
+    } catch (error) {
+        console.error('Error starting live analysis:', error);
+        showToast(error.message, 'error');
+    }
+}
+
+function stopLiveTail() {
+    if (liveTail.timer) {
+        clearTimeout(liveTail.timer);
+    }
+    liveTail.timer = null;
+    liveTail.fileId = null;
+}
+
+async function pollLiveTail() {
+    const fileId = liveTail.fileId;
+    if (!fileId) return;
+    
+    try {
+        const response = await fetch(`/log/${fileId}/deltas?since=${liveTail.seq}`);
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Failed to fetch live updates');
+        }
+        
+        // Another log may have been loaded while the request was in flight
+        if (fileId !== liveTail.fileId) return;
+        
+        if (data.reset) {
+            // We fell too far behind; start over from the full result
+            liveTail.criticalLines = data.result.critical_lines;
+            applyLiveCounts(data.result.line_count, data.result.error_counts);
+        } else {
+            data.deltas.forEach(applyLiveDelta);
+        }
+        liveTail.seq = data.seq;
+        
+        if (data.done) {
+            showToast(data.error ? `Live analysis stopped: ${data.error}` : 'Build log complete', data.error ? 'error' : 'info');
+            liveTail.fileId = null;
+            loadHistory();
+            return;
+        }
+    } catch (error) {
+        console.error('Error polling live log:', error);
+    }
+    
+    liveTail.timer = setTimeout(pollLiveTail, 2000);
+}
+
+function applyLiveDelta(delta) {
+    // Keep the most important lines, errors ahead of warnings, as the server does
+    const merged = liveTail.criticalLines.concat(delta.critical_lines);
+    liveTail.criticalLines = merged.filter(item => item.type === 'error')
+        .concat(merged.filter(item => item.type !== 'error'))
+        .slice(0, 15);
+    applyLiveCounts(delta.line_count, delta.error_counts);
+}
+
+function applyLiveCounts(lineCount, errorCounts) {
+    currentLogState.totalLines = lineCount;
+    currentLogState.errorCount = errorCounts.Error || 0;
+    currentLogState.warningCount = errorCounts.Warning || 0;
+    
+    const result = { error_counts: errorCounts, critical_lines: liveTail.criticalLines };
+    renderSummary(result);
+    renderCharts(result);
+    loadLogPreview();
+}
+
+// Poll a background analysis job until it finishes and resolve with its result
+function waitForJob(jobId) {
+    showToast('Large log queued for background analysis...');
+    
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(`/jobs/${jobId}`)
+                .then(response => response.json())
+                .then(job => {
+                    if (job.status === 'completed') {
+                        resolve(job.result);
+                    } else if (job.status === 'failed' || job.error) {
+                        reject(new Error(job.error || 'Background analysis failed'));
+                    } else {
+                        const spinner = document.getElementById('analyzeSpinner');
+                        if (spinner && job.percent !== null && job.percent !== undefined) {
+                            spinner.title = `${job.percent}% (${job.progress.lines_processed || 0} lines)`;
+                        }
+                        setTimeout(poll, 1000);
+                    }
+                })
+                .catch(reject);
+        };
+        poll();
+    });
+}
@@ -0,0 +1,1015 @@
+"""
+Storage backends for WolfsLogDebugger
+Persistence of log analyses, error lines, chat history and error solutions behind one
+interface, with the default SQLite implementation and a PostgreSQL one for multi-node setups
+"""
+
+import io
+import json
+import time
+import functools
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import database
+from ingest import job_name
+from metrics import DB_QUERY_SECONDS
+from profiling import span
+
+logger = logging.getLogger(__name__)
+
+# (line_number, level) pairs as stored in log_errors
+ErrorRow = Tuple[int, str]
+
+# Operations whose duration backends report in the db_query_seconds metric and as
+# db.<operation> spans of profiled requests
+TIMED_OPERATIONS = (
+    "save_log_analysis", "update_log_analysis", "save_log_errors", "save_analyses",
+    "get_history", "get_log", "store_chat_message", "store_error_solution",
+    "expired_log_ids", "delete_logs", "database_size", "compact",
+    "save_job", "get_job", "delete_jobs",
+    "save_stack_traces", "get_stack_traces", "get_stack_trace",
+    "get_history_summary", "rebuild_history_summary",
+    "save_chat_context", "get_chat_context", "get_error_solution",
+)
+
+# Columns of stack_traces and the matching keys of a block from traces.py
+STACK_TRACE_COLUMNS = ("start_line", "end_line", "language", "exception", "root_cause",
+                       "root_frame", "root_frame_line")
+STACK_TRACE_FIELDS = ("start", "end", "language", "exception", "root_cause",
+                      "root_frame", "root_frame_line")
+
+
+def _instrumented(func, backend, operation):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(backend=backend, operation=operation), span(f"db.{operation}"):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class LogStorage:
+    """
+    Interface implemented by every storage backend.
+
+    Methods raise on failure; callers in app.py decide whether to log and carry on.
+    """
+
+    name = "base"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Time every operation a backend implements, labelled with the backend name
+        for operation in TIMED_OPERATIONS:
+            if operation in cls.__dict__:
+                setattr(cls, operation, _instrumented(cls.__dict__[operation], cls.name, operation))
+
+    def init_schema(self) -> None:
+        raise NotImplementedError
+
+    def save_log_analysis(self, file_id: str, file_name: str, source_type: str,
+                          error_count: int, warning_count: int, content: Any) -> None:
+        """Save a log's analysis and add it to the history summary tables"""
+        raise NotImplementedError
+
+    def update_log_analysis(self, file_id: str, error_count: int, warning_count: int, content: Any) -> None:
+        """
+        Replace the counts and content of a log that is still growing; the history
+        summary tables get the difference
+        """
+        raise NotImplementedError
+
+    def save_log_errors(self, file_id: str, rows: Iterable[ErrorRow]) -> None:
+        raise NotImplementedError
+
+    def save_analyses(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Save several analyzed logs and their error lines in one transaction. Each record
+        has the save_log_analysis() fields plus "error_rows" and optionally "stack_traces"
+        and "chat_context".
+        """
+        raise NotImplementedError
+
+    def get_history(self, limit: int = 10, before: Optional[Tuple[str, str]] = None,
+                    source_type: Optional[str] = None, name: Optional[str] = None,
+                    since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Newest logs first, up to limit. Pages are keyset paginated: each record has a
+        "position", and passing the last one as before returns the next page. Filters:
+        exact source_type, name contained in the file name, upload_time in [since, until).
+        """
+        raise NotImplementedError
+
+    def get_history_summary(self, since: Optional[str] = None, until: Optional[str] = None,
+                            top_error_types: int = 10, jobs: int = 20) -> Dict[str, Any]:
+        """
+        Precomputed totals: logs, errors and warnings per day in [since, until] (days
+        as YYYY-MM-DD), the most frequent error types over those days, and totals of
+        the most recently built jobs
+        """
+        raise NotImplementedError
+
+    def rebuild_history_summary(self) -> int:
+        """
+        Recompute the history summary tables from the stored logs, returning how many
+        were counted. Summaries outlive the logs retention deletes, so this also drops
+        the totals of deleted logs.
+        """
+        raise NotImplementedError
+
+    def get_log(self, log_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored log_files record for log_id with its decoded content and
+        an "errors" list of (line_number, level) rows, or None if it doesn't exist
+        """
+        raise NotImplementedError
+
+    def store_chat_message(self, file_id: str, user_message: str, llm_message: str) -> None:
+        raise NotImplementedError
+
+    def store_error_solution(self, file_id: str, line_number: int, error_text: str, solution: str) -> None:
+        raise NotImplementedError
+
+    def get_error_solution(self, file_id: str, line_number: int) -> Optional[str]:
+        """The solution stored last for a line of file_id, or None"""
+        raise NotImplementedError
+
+    def expired_log_ids(self, max_age_days: Optional[float] = None, max_count: Optional[int] = None,
+                        max_bytes: Optional[int] = None) -> List[str]:
+        """
+        Return the log_ids, oldest first, that fall outside any of the given limits:
+        uploaded more than max_age_days ago, beyond the newest max_count logs, or
+        beyond the newest logs whose stored content adds up to max_bytes
+        """
+        raise NotImplementedError
+
+    def delete_logs(self, log_ids: List[str]) -> int:
+        """
+        Delete log_ids and every row that references them in a single transaction,
+        returning the number of log_files rows removed
+        """
+        raise NotImplementedError
+
+    def database_size(self) -> int:
+        """Size of the stored data in bytes"""
+        raise NotImplementedError
+
+    def compact(self) -> None:
+        """Return space freed by deletions to the filesystem (or to the database for reuse)"""
+        raise NotImplementedError
+
+    def save_job(self, job_id: str, kind: str, status: str, state: Dict[str, Any]) -> None:
+        """Insert or replace the shared state of a background job (see jobs.py)"""
+        raise NotImplementedError
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the state saved by save_job() for job_id, or None if it doesn't exist"""
+        raise NotImplementedError
+
+    def delete_jobs(self, updated_before: float) -> int:
+        """Delete jobs last saved before the given Unix time, returning how many were removed"""
+        raise NotImplementedError
+
+    def save_stack_traces(self, file_id: str, traces: List[Dict[str, Any]]) -> None:
+        """
+        Save stack trace blocks found in a log (see traces.py), replacing any saved
+        earlier with the same start line
+        """
+        raise NotImplementedError
+
+    def get_stack_traces(self, log_id: str) -> List[Dict[str, Any]]:
+        """Every stack trace block of log_id, in order"""
+        raise NotImplementedError
+
+    def get_stack_trace(self, log_id: str, line: int, lookahead: int = 0) -> Optional[Dict[str, Any]]:
+        """
+        The stack trace block of log_id containing line, or else the first one starting
+        at most lookahead lines after it; None if there's neither
+        """
+        raise NotImplementedError
+
+    def save_chat_context(self, file_id: str, context: Dict[str, Any]) -> None:
+        """Insert or replace the chat context of a log (see chatcontext.py)"""
+        raise NotImplementedError
+
+    def get_chat_context(self, log_id: str) -> Optional[Dict[str, Any]]:
+        """The chat context saved for log_id, or None"""
+        raise NotImplementedError
+
+
+def _stack_trace_rows(file_id: str, traces: Iterable[Dict[str, Any]]) -> List[tuple]:
+    return [(file_id,) + tuple(trace[field] for field in STACK_TRACE_FIELDS) for trace in traces]
+
+
+def _stack_trace(row) -> Dict[str, Any]:
+    return dict(zip(STACK_TRACE_FIELDS, row))
+
+
+# Tables holding rows keyed by a log's ID, removed together with its log_files row
+DEPENDENT_TABLES: List[Tuple[str, str]] = [
+    ("log_errors", "log_id"),
+    ("error_solutions", "file_id"),
+    ("chat_history", "file_id"),
+    ("stack_traces", "log_id"),
+    ("chat_contexts", "log_id"),
+]
+
+# Upserts of one stack_traces row; a block still growing at the end of a live log is
+# saved again once complete
+SQLITE_SAVE_STACK_TRACE = f'''
+    INSERT INTO stack_traces (log_id, {", ".join(STACK_TRACE_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (log_id, start_line) DO UPDATE SET
+        {", ".join(f"{column} = excluded.{column}" for column in STACK_TRACE_COLUMNS[1:])}
+'''
+POSTGRES_SAVE_STACK_TRACE = SQLITE_SAVE_STACK_TRACE.replace("?", "%s")
+
+SQLITE_SAVE_CHAT_CONTEXT = '''
+    INSERT INTO chat_contexts (log_id, context) VALUES (?, ?)
+    ON CONFLICT (log_id) DO UPDATE SET context = excluded.context
+'''
+POSTGRES_SAVE_CHAT_CONTEXT = SQLITE_SAVE_CHAT_CONTEXT.replace("?", "%s")
+
+
+def _summary_change(file_name: str, error_count: int, warning_count: int, content: Any,
+                    logs: int = 1) -> Dict[str, Any]:
+    """A log's contribution to the history summary tables"""
+    error_types = content.get("error_types") if isinstance(content, dict) else None
+    return {
+        "job": job_name(file_name),
+        "logs": logs,
+        "errors": error_count,
+        "warnings": warning_count,
+        "error_types": dict(error_types or {}),
+    }
+
+
+def _summary_difference(new: Dict[str, Any], old: Dict[str, Any]) -> Dict[str, Any]:
+    error_types = dict(new["error_types"])
+    for error_type, count in old["error_types"].items():
+        error_types[error_type] = error_types.get(error_type, 0) - count
+    return dict(
+        new,
+        logs=new["logs"] - old["logs"],
+        errors=new["errors"] - old["errors"],
+        warnings=new["warnings"] - old["warnings"],
+        error_types={error_type: count for error_type, count in error_types.items() if count},
+    )
+
+
+def _summary_statements(placeholder: str, day: str) -> Dict[str, str]:
+    """
+    Upserts adding a log's contribution to the summary tables, given a backend's
+    parameter placeholder and its SQL for the day of upload_time. The day and job
+    come from the log's log_files row.
+    """
+    statements = {
+        "day": f'''
+            INSERT INTO history_daily (day, logs, errors, warnings)
+            SELECT {day}, ?, ?, ? FROM log_files WHERE log_id = ?
+            ON CONFLICT (day) DO UPDATE SET
+                logs = history_daily.logs + excluded.logs,
+                errors = history_daily.errors + excluded.errors,
+                warnings = history_daily.warnings + excluded.warnings''',
+        "job": '''
+            INSERT INTO history_jobs (job, logs, errors, warnings, last_upload_time)
+            SELECT ?, ?, ?, ?, upload_time FROM log_files WHERE log_id = ?
+            ON CONFLICT (job) DO UPDATE SET
+                logs = history_jobs.logs + excluded.logs,
+                errors = history_jobs.errors + excluded.errors,
+                warnings = history_jobs.warnings + excluded.warnings,
+                last_upload_time = CASE WHEN excluded.last_upload_time > history_jobs.last_upload_time
+                                        THEN excluded.last_upload_time ELSE history_jobs.last_upload_time END''',
+        "error_type": f'''
+            INSERT INTO history_error_types (day, error_type, count)
+            SELECT {day}, ?, ? FROM log_files WHERE log_id = ?
+            ON CONFLICT (day, error_type) DO UPDATE SET
+                count = history_error_types.count + excluded.count''',
+    }
+    return {name: sql.replace("?", placeholder) for name, sql in statements.items()}
+
+
+# Whether there are logs but no summaries yet, i.e. the tables were just added
+HISTORY_SUMMARY_MISSING = (
+    "SELECT EXISTS (SELECT 1 FROM log_files) AND NOT EXISTS (SELECT 1 FROM history_daily)"
+)
+SQLITE_SUMMARY = _summary_statements("?", "date(upload_time)")
+POSTGRES_SUMMARY = _summary_statements("%s", "to_char(upload_time, 'YYYY-MM-DD')")
+
+
+def _add_to_summary(execute, statements: Dict[str, str], log_id: str, change: Dict[str, Any]) -> None:
+    """Apply a change from _summary_change() with execute (a connection's or cursor's)"""
+    if change["logs"] or change["errors"] or change["warnings"]:
+        execute(statements["day"], (change["logs"], change["errors"], change["warnings"], log_id))
+        execute(statements["job"], (change["job"], change["logs"], change["errors"], change["warnings"], log_id))
+    for error_type, count in change["error_types"].items():
+        execute(statements["error_type"], (error_type, count, log_id))
+
+
+def _aggregate_summary(rows: Iterable[tuple]) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+    """
+    Rows for history_daily, history_jobs and history_error_types from (day, file_name,
+    upload_time, error_count, warning_count, content) rows of log_files
+    """
+    days: Dict[str, List[int]] = {}
+    jobs: Dict[str, list] = {}
+    error_types: Dict[Tuple[str, str], int] = {}
+    for day, file_name, upload_time, error_count, warning_count, content in rows:
+        try:
+            content = json.loads(content)
+        except ValueError:
+            content = None
+        change = _summary_change(file_name, error_count, warning_count, content)
+        totals = days.setdefault(day, [0, 0, 0])
+        job = jobs.setdefault(change["job"], [0, 0, 0, upload_time])
+        for index, field in enumerate(("logs", "errors", "warnings")):
+            totals[index] += change[field]
+            job[index] += change[field]
+        job[3] = max(job[3], upload_time)
+        for error_type, count in change["error_types"].items():
+            error_types[(day, error_type)] = error_types.get((day, error_type), 0) + count
+    return ([(day,) + tuple(totals) for day, totals in days.items()],
+            [(job,) + tuple(totals) for job, totals in jobs.items()],
+            [key + (count,) for key, count in error_types.items()])
+
+
+def _history_filters(placeholder: str, like: str, before=None, source_type=None, name=None,
+                     since=None, until=None) -> Tuple[str, list]:
+    """WHERE clause and parameters for get_history()'s filters"""
+    conditions = []
+    params: list = []
+    if before is not None:
+        conditions.append("(upload_time, log_id) < (?, ?)")
+        params.extend(before)
+    if source_type:
+        conditions.append("source_type = ?")
+        params.append(source_type)
+    if name:
+        conditions.append(f"file_name {like} ? ESCAPE '\\'")
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    if since:
+        conditions.append("upload_time >= ?")
+        params.append(since)
+    if until:
+        conditions.append("upload_time < ?")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return where.replace("?", placeholder), params
+
+
+class SQLiteStorage(LogStorage):
+    """
+    Storage in a local SQLite file using the tuned per-thread connections from database.py
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, schema_path: str):
+        self.path = path
+        self.schema_path = schema_path
+
+    def connection(self):
+        return database.get_connection(self.path)
+
+    def init_schema(self) -> None:
+        db = self.connection()
+        # Only takes effect on a new, empty database; lets retention free pages
+        # incrementally instead of rebuilding the file
+        db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        with open(self.schema_path, encoding='utf8') as f:
+            db.executescript(f.read())
+        db.commit()
+        database.migrate(db)
+        # Logs stored before the summary tables existed
+        if db.execute(HISTORY_SUMMARY_MISSING).fetchone()[0]:
+            self.rebuild_history_summary()
+
+    def save_log_analysis(self, file_id, file_name, source_type, error_count, warning_count, content):
+        db = self.connection()
+        with db:
+            db.execute(
+                '''INSERT INTO log_files
+                   (log_id, file_name, source_type, error_count, warning_count, content)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (file_id, file_name, source_type, error_count, warning_count, json.dumps(content))
+            )
+            _add_to_summary(db.execute, SQLITE_SUMMARY, file_id,
+                            _summary_change(file_name, error_count, warning_count, content))
+
+    def update_log_analysis(self, file_id, error_count, warning_count, content):
+        db = self.connection()
+        with db:
+            old = db.execute(
+                'SELECT file_name, error_count, warning_count, content FROM log_files WHERE log_id = ?', (file_id,)
+            ).fetchone()
+            db.execute(
+                'UPDATE log_files SET error_count = ?, warning_count = ?, content = ? WHERE log_id = ?',
+                (error_count, warning_count, json.dumps(content), file_id)
+            )
+            if old is not None:
+                _add_to_summary(db.execute, SQLITE_SUMMARY, file_id, _summary_difference(
+                    _summary_change(old["file_name"], error_count, warning_count, content, logs=0),
+                    _summary_change(old["file_name"], old["error_count"], old["warning_count"],
+                                    json.loads(old["content"]), logs=0)
+                ))
+
+    def save_log_errors(self, file_id, rows):
+        db = self.connection()
+        db.executemany(
+            'INSERT INTO log_errors (log_id, line_number, level) VALUES (?, ?, ?)',
+            ((file_id, line_number, level) for line_number, level in rows)
+        )
+        db.commit()
+
+    def save_analyses(self, records):
+        db = self.connection()
+        with db:
+            db.executemany(
+                '''INSERT INTO log_files
+                   (log_id, file_name, source_type, error_count, warning_count, content)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                [(r["file_id"], r["file_name"], r["source_type"], r["error_count"], r["warning_count"],
+                  json.dumps(r["content"])) for r in records]
+            )
+            db.executemany(
+                'INSERT INTO log_errors (log_id, line_number, level) VALUES (?, ?, ?)',
+                ((r["file_id"], line_number, level) for r in records for line_number, level in r["error_rows"])
+            )
+            db.executemany(
+                SQLITE_SAVE_STACK_TRACE,
+                [row for r in records for row in _stack_trace_rows(r["file_id"], r.get("stack_traces", []))]
+            )
+            db.executemany(
+                SQLITE_SAVE_CHAT_CONTEXT,
+                [(r["file_id"], json.dumps(r["chat_context"])) for r in records if r.get("chat_context")]
+            )
+            for r in records:
+                _add_to_summary(db.execute, SQLITE_SUMMARY, r["file_id"], _summary_change(
+                    r["file_name"], r["error_count"], r["warning_count"], r["content"]))
+
+    def get_history(self, limit=10, before=None, source_type=None, name=None, since=None, until=None):
+        where, params = _history_filters("?", "LIKE", before, source_type, name, since, until)
+        cursor = self.connection().execute(f'''
+            SELECT log_id, file_name, source_type, upload_time, error_count, warning_count
+            FROM log_files
+            {where}
+            ORDER BY upload_time DESC, log_id DESC
+            LIMIT ?
+        ''', params + [limit])
+        return [dict(row, position=(row["upload_time"], row["log_id"])) for row in cursor.fetchall()]
+
+    def get_history_summary(self, since=None, until=None, top_error_types=10, jobs=20):
+        db = self.connection()
+        day_range = (since or "", until or "9999-12-31")
+        days = db.execute(
+            'SELECT day, logs, errors, warnings FROM history_daily WHERE day BETWEEN ? AND ? ORDER BY day',
+            day_range
+        ).fetchall()
+        error_types = db.execute(
+            '''SELECT error_type, SUM(count) AS count FROM history_error_types
+               WHERE day BETWEEN ? AND ?
+               GROUP BY error_type HAVING SUM(count) > 0 ORDER BY count DESC, error_type LIMIT ?''',
+            day_range + (top_error_types,)
+        ).fetchall()
+        job_rows = db.execute(
+            '''SELECT job, logs, errors, warnings, last_upload_time FROM history_jobs
+               ORDER BY last_upload_time DESC LIMIT ?''',
+            (jobs,)
+        ).fetchall()
+        return {
+            "days": [dict(row) for row in days],
+            "error_types": [dict(row) for row in error_types],
+            "jobs": [dict(row) for row in job_rows],
+        }
+
+    def rebuild_history_summary(self):
+        db = self.connection()
+        with db:
+            rows = db.execute(
+                '''SELECT date(upload_time), file_name, upload_time, error_count, warning_count, content
+                   FROM log_files'''
+            ).fetchall()
+            days, jobs, error_types = _aggregate_summary(rows)
+            for table in ("history_daily", "history_jobs", "history_error_types"):
+                db.execute(f'DELETE FROM {table}')
+            db.executemany('INSERT INTO history_daily (day, logs, errors, warnings) VALUES (?, ?, ?, ?)', days)
+            db.executemany(
+                'INSERT INTO history_jobs (job, logs, errors, warnings, last_upload_time) VALUES (?, ?, ?, ?, ?)', jobs
+            )
+            db.executemany('INSERT INTO history_error_types (day, error_type, count) VALUES (?, ?, ?)', error_types)
+        return len(rows)
+
+    def get_log(self, log_id):
+        db = self.connection()
+        record = db.execute('''
+            SELECT log_id, file_name, source_type, upload_time, error_count, warning_count, content
+            FROM log_files
+            WHERE log_id = ?
+        ''', (log_id,)).fetchone()
+        if not record:
+            return None
+
+        result = dict(record)
+        result["content"] = json.loads(record["content"])
+        result["errors"] = [
+            (row[0], row[1]) for row in db.execute(
+                'SELECT line_number, level FROM log_errors WHERE log_id = ?', (log_id,)
+            )
+        ]
+        return result
+
+    def store_chat_message(self, file_id, user_message, llm_message):
+        db = self.connection()
+        db.execute(
+            'INSERT INTO chat_history (file_id, user_message, llm_message) VALUES (?, ?, ?)',
+            (file_id, user_message, llm_message)
+        )
+        db.commit()
+
+    def store_error_solution(self, file_id, line_number, error_text, solution):
+        db = self.connection()
+        db.execute(
+            'INSERT INTO error_solutions (file_id, line_number, error_text, solution) VALUES (?, ?, ?, ?)',
+            (file_id, line_number, error_text, solution)
+        )
+        db.commit()
+
+    def get_error_solution(self, file_id, line_number):
+        record = self.connection().execute(
+            'SELECT solution FROM error_solutions WHERE file_id = ? AND line_number = ? ORDER BY id DESC LIMIT 1',
+            (file_id, line_number)
+        ).fetchone()
+        return record[0] if record else None
+
+    def expired_log_ids(self, max_age_days=None, max_count=None, max_bytes=None):
+        conditions = []
+        params = []
+        if max_age_days is not None:
+            conditions.append("upload_time < datetime('now', ?)")
+            params.append(f"-{max_age_days} days")
+        if max_count is not None:
+            conditions.append("position > ?")
+            params.append(max_count)
+        if max_bytes is not None:
+            conditions.append("running_bytes > ?")
+            params.append(max_bytes)
+        if not conditions:
+            return []
+
+        # Only measure content when a byte limit is set; it means reading every row
+        running_bytes = (
+            "SUM(length(CAST(content AS BLOB))) OVER (ORDER BY upload_time DESC, rowid DESC)"
+            if max_bytes is not None else "0"
+        )
+        cursor = self.connection().execute(f'''
+            SELECT log_id FROM (
+                SELECT log_id, upload_time,
+                       ROW_NUMBER() OVER (ORDER BY upload_time DESC, rowid DESC) AS position,
+                       {running_bytes} AS running_bytes
+                FROM log_files
+            )
+            WHERE {" OR ".join(conditions)}
+            ORDER BY upload_time
+        ''', params)
+        return [row[0] for row in cursor.fetchall()]
+
+    def delete_logs(self, log_ids):
+        if not log_ids:
+            return 0
+        db = self.connection()
+        placeholders = ",".join("?" * len(log_ids))
+        with db:
+            for table, column in DEPENDENT_TABLES:
+                db.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', log_ids)
+            cursor = db.execute(f'DELETE FROM log_files WHERE log_id IN ({placeholders})', log_ids)
+        return cursor.rowcount
+
+    def database_size(self):
+        db = self.connection()
+        page_count = db.execute('PRAGMA page_count').fetchone()[0]
+        page_size = db.execute('PRAGMA page_size').fetchone()[0]
+        return page_count * page_size
+
+    def compact(self):
+        db = self.connection()
+        db.commit()
+        if db.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            # auto_vacuum only changes on a full VACUUM, so the first compaction pays
+            # for one rebuild and every later run can free pages incrementally
+            db.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            db.execute('VACUUM')
+        else:
+            # Each step frees one page, so the cursor has to be drained
+            db.execute('PRAGMA incremental_vacuum').fetchall()
+        db.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchall()
+
+    def save_job(self, job_id, kind, status, state):
+        db = self.connection()
+        db.execute(
+            '''INSERT INTO jobs (job_id, kind, status, state, updated_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (job_id) DO UPDATE SET
+                   status = excluded.status, state = excluded.state, updated_at = excluded.updated_at''',
+            (job_id, kind, status, json.dumps(state), time.time())
+        )
+        db.commit()
+
+    def get_job(self, job_id):
+        record = self.connection().execute('SELECT state FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return json.loads(record[0]) if record else None
+
+    def delete_jobs(self, updated_before):
+        db = self.connection()
+        with db:
+            cursor = db.execute('DELETE FROM jobs WHERE updated_at < ?', (updated_before,))
+        return cursor.rowcount
+
+    def save_stack_traces(self, file_id, traces):
+        db = self.connection()
+        with db:
+            db.executemany(SQLITE_SAVE_STACK_TRACE, _stack_trace_rows(file_id, traces))
+
+    def get_stack_traces(self, log_id):
+        cursor = self.connection().execute(
+            f'SELECT {", ".join(STACK_TRACE_COLUMNS)} FROM stack_traces WHERE log_id = ? ORDER BY start_line',
+            (log_id,)
+        )
+        return [_stack_trace(row) for row in cursor.fetchall()]
+
+    def get_stack_trace(self, log_id, line, lookahead=0):
+        # The containing block starts before any block after the line, so it sorts first
+        row = self.connection().execute(
+            f'''SELECT {", ".join(STACK_TRACE_COLUMNS)} FROM stack_traces
+               WHERE log_id = ? AND start_line <= ? AND end_line >= ?
+               ORDER BY start_line LIMIT 1''',
+            (log_id, line + lookahead, line)
+        ).fetchone()
+        return _stack_trace(row) if row else None
+
+    def save_chat_context(self, file_id, context):
+        db = self.connection()
+        with db:
+            db.execute(SQLITE_SAVE_CHAT_CONTEXT, (file_id, json.dumps(context)))
+
+    def get_chat_context(self, log_id):
+        record = self.connection().execute('SELECT context FROM chat_contexts WHERE log_id = ?', (log_id,)).fetchone()
+        return json.loads(record[0]) if record else None
+
+
+class PostgresStorage(LogStorage):
+    """
+    Storage in a shared PostgreSQL database so several app nodes can write concurrently.
+
+    Connections come from a thread-safe pool; log_errors rows are bulk loaded with COPY.
+    Requires psycopg2 (pip install psycopg2-binary).
+    """
+
+    name = "postgres"
+
+    def __init__(self, dsn: str, schema_path: str, min_connections: int = 1, max_connections: int = 10):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError as e:
+            raise RuntimeError("PostgreSQL storage requires psycopg2. Install it with 'pip install psycopg2-binary'.") from e
+
+        self.schema_path = schema_path
+        self.pool = ThreadedConnectionPool(min_connections, max_connections, dsn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a pooled connection; commits on success and rolls back on error"""
+        conn = self.pool.getconn()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.pool.putconn(conn)
+
+    def close(self) -> None:
+        self.pool.closeall()
+
+    def init_schema(self) -> None:
+        with open(self.schema_path, encoding='utf8') as f:
+            schema = f.read()
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(schema)
+            cursor.execute(HISTORY_SUMMARY_MISSING)
+            missing = cursor.fetchone()[0]
+        # Logs stored before the summary tables existed
+        if missing:
+            self.rebuild_history_summary()
+
+    def save_log_analysis(self, file_id, file_name, source_type, error_count, warning_count, content):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                '''INSERT INTO log_files
+                   (log_id, file_name, source_type, error_count, warning_count, content)
+                   VALUES (%s, %s, %s, %s, %s, %s)''',
+                (file_id, file_name, source_type, error_count, warning_count, json.dumps(content))
+            )
+            _add_to_summary(cursor.execute, POSTGRES_SUMMARY, file_id,
+                            _summary_change(file_name, error_count, warning_count, content))
+
+    def update_log_analysis(self, file_id, error_count, warning_count, content):
+        with self.connection() as conn, conn.cursor() as cursor:
+            # Lock the row so concurrent updates of one log apply their differences in turn
+            cursor.execute(
+                'SELECT file_name, error_count, warning_count, content FROM log_files WHERE log_id = %s FOR UPDATE',
+                (file_id,)
+            )
+            old = cursor.fetchone()
+            cursor.execute(
+                'UPDATE log_files SET error_count = %s, warning_count = %s, content = %s WHERE log_id = %s',
+                (error_count, warning_count, json.dumps(content), file_id)
+            )
+            if old is not None:
+                file_name, old_errors, old_warnings, old_content = old
+                _add_to_summary(cursor.execute, POSTGRES_SUMMARY, file_id, _summary_difference(
+                    _summary_change(file_name, error_count, warning_count, content, logs=0),
+                    _summary_change(file_name, old_errors, old_warnings, json.loads(old_content), logs=0)
+                ))
+
+    def save_log_errors(self, file_id, rows):
+        with self.connection() as conn, conn.cursor() as cursor:
+            self._copy_log_errors(cursor, ((file_id, line_number, level) for line_number, level in rows))
+
+    def save_analyses(self, records):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.executemany(
+                '''INSERT INTO log_files
+                   (log_id, file_name, source_type, error_count, warning_count, content)
+                   VALUES (%s, %s, %s, %s, %s, %s)''',
+                [(r["file_id"], r["file_name"], r["source_type"], r["error_count"], r["warning_count"],
+                  json.dumps(r["content"])) for r in records]
+            )
+            self._copy_log_errors(cursor, (
+                (r["file_id"], line_number, level) for r in records for line_number, level in r["error_rows"]
+            ))
+            cursor.executemany(
+                POSTGRES_SAVE_STACK_TRACE,
+                [row for r in records for row in _stack_trace_rows(r["file_id"], r.get("stack_traces", []))]
+            )
+            cursor.executemany(
+                POSTGRES_SAVE_CHAT_CONTEXT,
+                [(r["file_id"], json.dumps(r["chat_context"])) for r in records if r.get("chat_context")]
+            )
+            for r in records:
+                _add_to_summary(cursor.execute, POSTGRES_SUMMARY, r["file_id"], _summary_change(
+                    r["file_name"], r["error_count"], r["warning_count"], r["content"]))
+
+    @staticmethod
+    def _copy_log_errors(cursor, rows):
+        # COPY expects tab separated text; log IDs are UUIDs and levels fixed words,
+        # so neither needs escaping
+        buffer = io.StringIO()
+        for log_id, line_number, level in rows:
+            buffer.write(f"{log_id}\t{line_number}\t{level}\n")
+        buffer.seek(0)
+        cursor.copy_expert('COPY log_errors (log_id, line_number, level) FROM STDIN', buffer)
+
+    def get_history(self, limit=10, before=None, source_type=None, name=None, since=None, until=None):
+        where, params = _history_filters("%s", "ILIKE", before, source_type, name, since, until)
+        with self.connection() as conn, conn.cursor() as cursor:
+            # upload_time has microseconds, which the displayed time drops but the position needs
+            cursor.execute(f'''
+                SELECT log_id, file_name, source_type, upload_time, error_count, warning_count,
+                       upload_time::text AS exact_upload_time
+                FROM log_files
+                {where}
+                ORDER BY upload_time DESC, log_id DESC
+                LIMIT %s
+            ''', params + [limit])
+            columns = [column.name for column in cursor.description]
+            records = []
+            for row in cursor.fetchall():
+                record = self._normalize(dict(zip(columns, row)))
+                record["position"] = (record.pop("exact_upload_time"), record["log_id"])
+                records.append(record)
+            return records
+
+    def get_history_summary(self, since=None, until=None, top_error_types=10, jobs=20):
+        day_range = (since or "", until or "9999-12-31")
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                'SELECT day, logs, errors, warnings FROM history_daily WHERE day BETWEEN %s AND %s ORDER BY day',
+                day_range
+            )
+            days = [dict(zip(("day", "logs", "errors", "warnings"), row)) for row in cursor.fetchall()]
+            cursor.execute(
+                '''SELECT error_type, SUM(count) AS count FROM history_error_types
+                   WHERE day BETWEEN %s AND %s
+                   GROUP BY error_type HAVING SUM(count) > 0 ORDER BY count DESC, error_type LIMIT %s''',
+                day_range + (top_error_types,)
+            )
+            error_types = [{"error_type": error_type, "count": int(count)} for error_type, count in cursor.fetchall()]
+            cursor.execute(
+                '''SELECT job, logs, errors, warnings, last_upload_time FROM history_jobs
+                   ORDER BY last_upload_time DESC LIMIT %s''',
+                (jobs,)
+            )
+            columns = ("job", "logs", "errors", "warnings", "upload_time")
+            job_rows = []
+            for row in cursor.fetchall():
+                record = self._normalize(dict(zip(columns, row)))
+                record["last_upload_time"] = record.pop("upload_time")
+                job_rows.append(record)
+        return {"days": days, "error_types": error_types, "jobs": job_rows}
+
+    def rebuild_history_summary(self):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                '''SELECT to_char(upload_time, 'YYYY-MM-DD'), file_name, upload_time, error_count, warning_count, content
+                   FROM log_files'''
+            )
+            rows = cursor.fetchall()
+            days, jobs, error_types = _aggregate_summary(rows)
+            cursor.execute('TRUNCATE history_daily, history_jobs, history_error_types')
+            cursor.executemany('INSERT INTO history_daily (day, logs, errors, warnings) VALUES (%s, %s, %s, %s)', days)
+            cursor.executemany(
+                'INSERT INTO history_jobs (job, logs, errors, warnings, last_upload_time) VALUES (%s, %s, %s, %s, %s)',
+                jobs
+            )
+            cursor.executemany(
+                'INSERT INTO history_error_types (day, error_type, count) VALUES (%s, %s, %s)', error_types
+            )
+        return len(rows)
+
+    def get_log(self, log_id):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('''
+                SELECT log_id, file_name, source_type, upload_time, error_count, warning_count, content
+                FROM log_files
+                WHERE log_id = %s
+            ''', (log_id,))
+            record = cursor.fetchone()
+            if not record:
+                return None
+
+            columns = [column.name for column in cursor.description]
+            result = self._normalize(dict(zip(columns, record)))
+            result["content"] = json.loads(result["content"])
+
+            cursor.execute('SELECT line_number, level FROM log_errors WHERE log_id = %s', (log_id,))
+            result["errors"] = [(row[0], row[1]) for row in cursor.fetchall()]
+            return result
+
+    def store_chat_message(self, file_id, user_message, llm_message):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO chat_history (file_id, user_message, llm_message) VALUES (%s, %s, %s)',
+                (file_id, user_message, llm_message)
+            )
+
+    def store_error_solution(self, file_id, line_number, error_text, solution):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO error_solutions (file_id, line_number, error_text, solution) VALUES (%s, %s, %s, %s)',
+                (file_id, line_number, error_text, solution)
+            )
+
+    def get_error_solution(self, file_id, line_number):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                'SELECT solution FROM error_solutions WHERE file_id = %s AND line_number = %s ORDER BY id DESC LIMIT 1',
+                (file_id, line_number)
+            )
+            record = cursor.fetchone()
+            return record[0] if record else None
+
+    def expired_log_ids(self, max_age_days=None, max_count=None, max_bytes=None):
+        conditions = []
+        params = []
+        if max_age_days is not None:
+            conditions.append("upload_time < now() - %s * interval '1 day'")
+            params.append(max_age_days)
+        if max_count is not None:
+            conditions.append("position > %s")
+            params.append(max_count)
+        if max_bytes is not None:
+            conditions.append("running_bytes > %s")
+            params.append(max_bytes)
+        if not conditions:
+            return []
+
+        running_bytes = (
+            "SUM(octet_length(content)) OVER (ORDER BY upload_time DESC, log_id DESC)"
+            if max_bytes is not None else "0"
+        )
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(f'''
+                SELECT log_id FROM (
+                    SELECT log_id, upload_time,
+                           ROW_NUMBER() OVER (ORDER BY upload_time DESC, log_id DESC) AS position,
+                           {running_bytes} AS running_bytes
+                    FROM log_files
+                ) ranked
+                WHERE {" OR ".join(conditions)}
+                ORDER BY upload_time
+            ''', params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def delete_logs(self, log_ids):
+        if not log_ids:
+            return 0
+        with self.connection() as conn, conn.cursor() as cursor:
+            for table, column in DEPENDENT_TABLES:
+                cursor.execute(f'DELETE FROM {table} WHERE {column} = ANY(%s)', (list(log_ids),))
+            cursor.execute('DELETE FROM log_files WHERE log_id = ANY(%s)', (list(log_ids),))
+            return cursor.rowcount
+
+    def database_size(self):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT pg_database_size(current_database())')
+            return cursor.fetchone()[0]
+
+    def compact(self):
+        # VACUUM can't run inside a transaction. Plain VACUUM (not FULL) avoids
+        # exclusive locks; freed space is reused by later inserts.
+        conn = self.pool.getconn()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                tables = ", ".join(["log_files"] + [table for table, _ in DEPENDENT_TABLES])
+                cursor.execute(f'VACUUM (ANALYZE) {tables}')
+        finally:
+            conn.autocommit = False
+            self.pool.putconn(conn)
+
+    def save_job(self, job_id, kind, status, state):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                '''INSERT INTO jobs (job_id, kind, status, state, updated_at)
+                   VALUES (%s, %s, %s, %s, %s)
+                   ON CONFLICT (job_id) DO UPDATE SET
+                       status = EXCLUDED.status, state = EXCLUDED.state, updated_at = EXCLUDED.updated_at''',
+                (job_id, kind, status, json.dumps(state), time.time())
+            )
+
+    def get_job(self, job_id):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT state FROM jobs WHERE job_id = %s', (job_id,))
+            record = cursor.fetchone()
+            return json.loads(record[0]) if record else None
+
+    def delete_jobs(self, updated_before):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('DELETE FROM jobs WHERE updated_at < %s', (updated_before,))
+            return cursor.rowcount
+
+    def save_stack_traces(self, file_id, traces):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.executemany(POSTGRES_SAVE_STACK_TRACE, _stack_trace_rows(file_id, traces))
+
+    def get_stack_traces(self, log_id):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                f'SELECT {", ".join(STACK_TRACE_COLUMNS)} FROM stack_traces WHERE log_id = %s ORDER BY start_line',
+                (log_id,)
+            )
+            return [_stack_trace(row) for row in cursor.fetchall()]
+
+    def get_stack_trace(self, log_id, line, lookahead=0):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(
+                f'''SELECT {", ".join(STACK_TRACE_COLUMNS)} FROM stack_traces
+                   WHERE log_id = %s AND start_line <= %s AND end_line >= %s
+                   ORDER BY start_line LIMIT 1''',
+                (log_id, line + lookahead, line)
+            )
+            row = cursor.fetchone()
+            return _stack_trace(row) if row else None
+
+    def save_chat_context(self, file_id, context):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute(POSTGRES_SAVE_CHAT_CONTEXT, (file_id, json.dumps(context)))
+
+    def get_chat_context(self, log_id):
+        with self.connection() as conn, conn.cursor() as cursor:
+            cursor.execute('SELECT context FROM chat_contexts WHERE log_id = %s', (log_id,))
+            record = cursor.fetchone()
+            return json.loads(record[0]) if record else None
+
+    @staticmethod
+    def _normalize(record: Dict[str, Any]) -> Dict[str, Any]:
+        # Match the 'YYYY-MM-DD HH:MM:SS' strings SQLite returns for upload_time
+        upload_time = record.get("upload_time")
+        if upload_time is not None and not isinstance(upload_time, str):
+            record["upload_time"] = upload_time.strftime('%Y-%m-%d %H:%M:%S')
+        return record
+
+
+def create_storage(backend: str, sqlite_path: str = None, sqlite_schema: str = None,
+                   database_url: str = None, postgres_schema: str = None,
+                   pool_size: int = 10) -> LogStorage:
+    """
+    Build the storage backend named by backend ('sqlite' or 'postgres')
+    """
+    backend = (backend or "sqlite").lower()
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path, sqlite_schema)
+    if backend in ("postgres", "postgresql"):
+        if not database_url:
+            raise ValueError("DATABASE_URL must be set to use the PostgreSQL storage backend")
+        return PostgresStorage(database_url, postgres_schema, max_connections=pool_size)
+    raise ValueError(f"Unknown storage backend: {backend}")
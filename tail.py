@@ -0,0 +1,122 @@
+"""
+Live log tailing for WolfsLogDebugger
+Feeds text appended to a growing log into its incremental analyzer and keeps the
+resulting deltas for clients to poll
+"""
+
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from analyzer import LogAnalyzer
+from ingest import LogFetchError, poll_progressive_text, split_lines
+
+logger = logging.getLogger(__name__)
+
+# Deltas kept per session; clients that fall further behind get a full reset instead
+MAX_DELTAS = 500
+
+
+class TailSession:
+    """
+    A log that is still being written, e.g. the console of a running Jenkins build.
+
+    Text can be pushed with append() or pulled from Jenkins with follow(); either way
+    only the new lines are analyzed, and each append produces a numbered delta.
+    """
+
+    def __init__(self, analyzer: LogAnalyzer, name: str,
+                 on_delta: Optional[Callable[["TailSession", Dict[str, Any]], None]] = None):
+        self.analyzer = analyzer
+        self.name = name
+        self.on_delta = on_delta
+        self.done = False
+        self.error: Optional[str] = None
+        self.offset = 0  # bytes read so far when following Jenkins
+        self.seq = 0
+        self.deltas = deque(maxlen=MAX_DELTAS)
+        self._pending = ''
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    @property
+    def file_id(self) -> str:
+        return self.analyzer.file_id
+
+    def append(self, text: str, final: bool = False) -> Dict[str, Any]:
+        """
+        Analyze text appended to the log; an unfinished last line waits for the next
+        append unless final is set, which also closes the session
+
+        Raises:
+            ValueError: The session has already finished
+        """
+        with self._lock:
+            if self.done:
+                raise ValueError("This log has finished and no longer accepts new lines")
+
+            lines, self._pending = split_lines(self._pending + text, final=final)
+            delta = self.analyzer.feed(lines, final=final)
+            self.done = final
+            if not lines and not final:
+                return dict(delta, seq=self.seq, done=False, line_count=len(self.analyzer.lines))
+
+            self.seq += 1
+            delta.update(seq=self.seq, done=self.done, line_count=len(self.analyzer.lines))
+            if self.on_delta:
+                try:
+                    self.on_delta(self, delta)
+                except Exception as e:
+                    logger.error(f"Failed to persist delta {self.seq} of {self.file_id}: {str(e)}")
+            self.deltas.append(delta)
+            return delta
+
+    def finish(self) -> Dict[str, Any]:
+        return self.append('', final=True)
+
+    def deltas_since(self, seq: int) -> Dict[str, Any]:
+        """
+        Deltas after seq; if some were already dropped the client gets the full result
+        with reset set instead
+        """
+        with self._lock:
+            reset = bool(self.deltas) and seq < self.deltas[0]["seq"] - 1
+            response = {
+                "file_id": self.file_id,
+                "seq": self.seq,
+                "done": self.done,
+                "error": self.error,
+                "reset": reset,
+                "deltas": [] if reset else [delta for delta in self.deltas if delta["seq"] > seq],
+            }
+            if reset:
+                response["result"] = self.analyzer.result()
+            return response
+
+    def follow(self, url: str, interval: float = 2.0, verify: bool = True) -> threading.Thread:
+        """
+        Poll a Jenkins progressiveText URL on a background thread until the build ends
+        """
+        thread = threading.Thread(
+            target=self._follow, args=(url, interval, verify),
+            name=f"tail-{self.file_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _follow(self, url, interval, verify):
+        try:
+            for text, offset in poll_progressive_text(url, start=self.offset, interval=interval,
+                                                      verify=verify, stop_event=self._stop):
+                self.offset = offset
+                self.append(text)
+        except LogFetchError as e:
+            logger.error(f"Stopped following {url}: {str(e)}")
+            self.error = str(e)
+        finally:
+            if not self.done:
+                self.finish()
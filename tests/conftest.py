@@ -0,0 +1,9 @@
+"""
+Test setup for WolfsLogDebugger
+The modules live at the repository root rather than in a package, so put it on the path
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,186 @@
+"""
+Tests for formats.py: the order formats are detected in and the stage, level and
+timestamp each format's parser gives a line
+"""
+
+import pytest
+
+import formats
+from formats import (
+    ERROR, WARNING, DEFAULT_FORMAT, FORMATS, GitHubActionsFormat, GitLabFormat, JenkinsFormat,
+    JsonLinesFormat, LogFormat, detect_format, get_format, register_format, take_sample,
+)
+
+
+JENKINS_LOG = [
+    "Started by user admin",
+    "[Pipeline] stage",
+    "[Build] mvn -B package",
+    "ERROR: Failed to execute goal",
+]
+GITHUB_LOG = [
+    "2024-01-15T10:00:00.1234567Z ##[group]Run actions/checkout@v4",
+    "2024-01-15T10:00:01.0000000Z Syncing repository",
+    "2024-01-15T10:00:02.0000000Z ##[endgroup]",
+]
+GITLAB_LOG = [
+    "Running with gitlab-runner 16.6.0",
+    "section_start:1705312800:prepare_script\r\x1b[0KPreparing environment",
+]
+JSON_LOG = [
+    '{"level": "info", "message": "starting", "timestamp": "2024-01-15T10:00:00Z"}',
+    '{"level": "error", "message": "failed", "timestamp": "2024-01-15T10:00:01Z"}',
+]
+
+
+def test_builtin_formats_are_tried_in_order():
+    assert list(FORMATS) == ['json', 'gitlab', 'github', 'jenkins']
+    assert DEFAULT_FORMAT == 'jenkins'
+
+
+@pytest.mark.parametrize("sample, expected", [
+    (JENKINS_LOG, JenkinsFormat),
+    (GITHUB_LOG, GitHubActionsFormat),
+    (["::error file=app.py,line=1::Missing import"], GitHubActionsFormat),
+    (GITLAB_LOG, GitLabFormat),
+    (JSON_LOG, JsonLinesFormat),
+    ([], JenkinsFormat),
+    (["", "   "], JenkinsFormat),
+])
+def test_detect_format(sample, expected):
+    assert detect_format(sample) is expected
+
+
+def test_earlier_formats_win_when_several_claim_a_log():
+    # A GitLab trace that runs a GitHub-style command is still GitLab...
+    assert detect_format(GITLAB_LOG + ["::error::from a script"]) is GitLabFormat
+    # ...and JSON records that mention either are still JSON lines
+    records = ['{"msg": "section_start:1705312800:build"}', '{"msg": "##[group]Build"}']
+    assert detect_format(records) is JsonLinesFormat
+
+
+def test_json_needs_most_lines_to_be_records():
+    assert detect_format(JSON_LOG * 4 + ["plain text"]) is JsonLinesFormat
+    assert detect_format(JSON_LOG + ["plain text", "more text"]) is JenkinsFormat
+    assert detect_format(['["a", "list"]', '"a string"']) is JenkinsFormat
+
+
+def test_registered_formats_are_tried_first(monkeypatch):
+    monkeypatch.setattr(formats, 'FORMATS', dict(FORMATS))
+
+    class BuildkiteFormat(JenkinsFormat):
+        name = 'buildkite'
+
+        @classmethod
+        def detect(cls, sample):
+            return any(line.startswith('~~~ ') for line in sample)
+
+    register_format(BuildkiteFormat)
+    assert list(formats.FORMATS)[0] == 'buildkite'
+    assert detect_format(["~~~ Running tests"] + JSON_LOG * 10) is BuildkiteFormat
+    assert detect_format(JSON_LOG) is JsonLinesFormat
+
+    # Registering a name again replaces it and moves it to the front
+    register_format(JsonLinesFormat)
+    assert list(formats.FORMATS)[:2] == ['json', 'buildkite']
+
+
+def test_get_format():
+    assert get_format('github') is GitHubActionsFormat
+    with pytest.raises(ValueError, match="Unknown log format: circleci"):
+        get_format('circleci')
+
+
+def test_take_sample_stops_at_the_size_limit(monkeypatch):
+    monkeypatch.setattr(formats, 'DETECT_SAMPLE_CHARS', 20)
+    monkeypatch.setattr(formats, 'DETECT_SAMPLE_LINES', 3)
+    assert take_sample(iter(["0123456789", "0123456789", "x"])) == ["0123456789", "0123456789"]
+    assert take_sample(iter(["a", "b", "c", "d"])) == ["a", "b", "c"]
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("[Build] compiling", ("Build", None, None)),
+    ("2024-01-15 10:00:00 ERROR: Failed to execute goal", (None, ERROR, "2024-01-15 10:00:00")),
+    ("Tests FAILED", (None, ERROR, None)),
+    ("[Test] WARNING: deprecated API", ("Test", WARNING, None)),
+    ("Finished: SUCCESS", (None, None, None)),
+])
+def test_jenkins_parse(line, expected):
+    assert JenkinsFormat().parse(line) == expected
+
+
+@pytest.mark.parametrize("line, level", [
+    ('{"level": "error", "message": "failed"}', ERROR),
+    ('{"severity": "CRITICAL", "msg": "down"}', ERROR),
+    ('{"levelname": "WARNING", "msg": "slow"}', WARNING),
+    ('{"level": "info", "message": "ERROR in a message at info level"}', None),
+    ('{"level": 50, "msg": "pino error"}', ERROR),
+    ('{"level": 40, "msg": "pino warn"}', WARNING),
+    ('{"level": 30, "msg": "pino info"}', None),
+    ('{"log": {"level": "warn"}, "message": "ecs"}', WARNING),
+    ('{"message": "ERROR: no level field"}', ERROR),
+    ('{"level": true, "message": "WARNING: odd level"}', WARNING),
+    ('not json at all, ERROR', ERROR),
+    ('{"truncated": ', None),
+])
+def test_json_parse_levels(line, level):
+    assert JsonLinesFormat().parse(line)[1] == level
+
+
+def test_json_parse_stage_and_timestamps():
+    parser = JsonLinesFormat()
+    assert parser.parse('{"stage": "deploy", "@timestamp": "2024-01-15T10:00:00.123Z"}') == \
+        ("deploy", None, "2024-01-15T10:00:00")
+    assert parser.parse('{"time": 1705312800}')[2] == "2024-01-15 10:00:00"
+    assert parser.parse('{"time": 1705312800500}')[2] == "2024-01-15 10:00:00"
+    assert parser.parse('{"ts": 1705312801.9}')[2] == "2024-01-15 10:00:01"
+    assert parser.parse('{"time": "yesterday"}')[2] is None
+
+
+def test_github_parse_tracks_groups_and_levels():
+    parser = GitHubActionsFormat()
+    parsed = [parser.parse(line) for line in GITHUB_LOG + [
+        "2024-01-15T10:00:03.0000000Z ##[error]Process completed with exit code 1.",
+        "2024-01-15T10:00:04.0000000Z ##[warning]Node 16 is deprecated",
+        "::error::without a timestamp",
+        "Plain line with 2024-01-15 10:00:05 in it",
+    ]]
+    assert parsed == [
+        ("Run actions/checkout@v4", None, "2024-01-15T10:00:00"),
+        ("Run actions/checkout@v4", None, "2024-01-15T10:00:01"),
+        ("Run actions/checkout@v4", None, "2024-01-15T10:00:02"),
+        (None, ERROR, "2024-01-15T10:00:03"),
+        (None, WARNING, "2024-01-15T10:00:04"),
+        (None, ERROR, None),
+        (None, None, "2024-01-15 10:00:05"),
+    ]
+
+
+def test_gitlab_parse_tracks_sections_and_strips_colors():
+    parser = GitLabFormat()
+    parsed = [parser.parse(line) for line in [
+        "section_start:1705312800:build_script\r\x1b[0K\x1b[0;m$ make",
+        "\x1b[31;1mERROR: Job failed: exit code 2\x1b[0;m",
+        "section_end:1705312830:build_script\r\x1b[0K",
+        "Cleaning up project directory",
+    ]]
+    assert parsed == [
+        ("build_script", None, "2024-01-15 10:00:00"),
+        ("build_script", ERROR, None),
+        ("build_script", None, "2024-01-15 10:00:30"),
+        (None, None, None),
+    ]
+
+
+def test_parsers_keep_their_stage_per_instance():
+    first, second = GitHubActionsFormat(), GitHubActionsFormat()
+    first.parse("##[group]Build")
+    assert first.parse("make")[0] == "Build"
+    assert second.parse("make")[0] is None
+
+
+def test_base_format_is_abstract():
+    with pytest.raises(NotImplementedError):
+        LogFormat.detect([])
+    with pytest.raises(NotImplementedError):
+        LogFormat().parse("line")
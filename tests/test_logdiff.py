@@ -0,0 +1,178 @@
+"""
+Tests for logdiff.py: common prefix and suffix, the first divergence and where the logs
+line up again, and the error signatures that changed
+"""
+
+import random
+from array import array
+
+import pytest
+
+import logdiff
+from logdiff import common_prefix, common_suffix, diff_logs, line_hashes, normalize
+
+
+def diff(base, target, base_errors=(), target_errors=(), **kwargs):
+    return diff_logs(base, line_hashes(base), base_errors, target, line_hashes(target), target_errors, **kwargs)
+
+
+def lines(prefix, count, start=0):
+    return [f"{prefix} step {chr(97 + (start + i) % 26)}{(start + i) // 26}x" for i in range(count)]
+
+
+def naive_prefix(a, b):
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+
+def naive_suffix(a, b, prefix):
+    n = 0
+    while n < min(len(a), len(b)) - prefix and a[len(a) - 1 - n] == b[len(b) - 1 - n]:
+        n += 1
+    return n
+
+
+def test_normalize_masks_volatile_tokens():
+    assert normalize("[2024-01-15 10:00:01] Build #123 took 4.2s on port 8080") == \
+        "[# #] Build ## took # on port #"
+    assert normalize("commit 3f2a9c1 by bob") == "commit # by bob"
+
+
+def test_identical_up_to_volatile_tokens():
+    base = ["Started by timer at 10:00:00", "Build #41", "Finished: SUCCESS"]
+    target = ["Started by timer at 11:30:12", "Build #42", "Finished: SUCCESS"]
+    result = diff(base, target)
+    assert result["identical"] is True
+    assert result["common_prefix"] == 3
+    assert result["first_divergence"] is None
+    assert result["added_count"] == result["removed_count"] == 0
+
+
+def test_appended_lines_diverge_to_the_end():
+    base = lines("common", 10)
+    target = base + ["ERROR: new failure", "Finished: FAILURE"]
+    result = diff(base, target, target_errors=[10])
+    assert (result["common_prefix"], result["common_suffix"]) == (10, 0)
+    assert result["first_divergence"]["base"] == [10, 10]
+    assert result["first_divergence"]["target"] == [10, 12]
+    assert result["first_divergence"]["resynced"] is False
+    assert [line["line"] for line in result["added_lines"]] == [10, 11]
+    assert result["removed_count"] == 0
+    assert [entry["example"] for entry in result["error_signatures"]["new"]] == ["ERROR: new failure"]
+
+
+def test_prepended_lines_resync_at_the_suffix():
+    base = lines("common", 10)
+    target = ["Checking out a new revision", "Fetching submodules"] + base
+    result = diff(base, target)
+    assert (result["common_prefix"], result["common_suffix"]) == (0, 10)
+    assert result["first_divergence"]["target"] == [0, 2]
+    assert result["first_divergence"]["base"] == [0, 0]
+    assert result["first_divergence"]["resynced"] is True
+    assert [line["content"] for line in result["added_lines"]] == target[:2]
+
+
+def test_changed_middle_between_prefix_and_suffix():
+    base = lines("head", 5) + ["Tests run: 120, Failures: 0", "BUILD SUCCESS"] + lines("tail", 5)
+    target = lines("head", 5) + ["ERROR: testLogin failed", "BUILD FAILURE"] + lines("tail", 5)
+    result = diff(base, target, base_errors=[], target_errors=[5])
+    assert (result["common_prefix"], result["common_suffix"]) == (5, 5)
+    assert result["first_divergence"]["base"] == [5, 7]
+    assert result["first_divergence"]["target"] == [5, 7]
+    assert result["first_divergence"]["resynced"] is True
+    assert [line["content"] for line in result["first_divergence"]["target_lines"]] == target[5:7]
+    assert [line["line"] for line in result["removed_lines"]] == [5, 6]
+    assert [line["line"] for line in result["added_lines"]] == [5, 6]
+
+
+def test_resync_after_divergence_inside_the_middle():
+    # The logs differ twice; the first region ends where three lines line up again,
+    # well before the common suffix
+    middle = lines("middle", 6)
+    base = lines("head", 3) + ["base only"] + middle + ["base again"] + lines("tail", 2)
+    target = lines("head", 3) + ["target only", "and more"] + middle + ["target again"] + lines("tail", 2)
+    result = diff(base, target)
+    assert (result["common_prefix"], result["common_suffix"]) == (3, 2)
+    assert result["first_divergence"]["base"] == [3, 4]
+    assert result["first_divergence"]["target"] == [3, 5]
+    assert result["first_divergence"]["resynced"] is True
+    assert result["removed_count"] == 2
+    assert result["added_count"] == 3
+
+
+def test_no_resync_when_the_rest_differs():
+    base = lines("head", 4) + lines("base", 20)
+    target = lines("head", 4) + lines("target", 25)
+    result = diff(base, target)
+    divergence = result["first_divergence"]
+    assert divergence["base"] == [4, 24] and divergence["target"] == [4, 29]
+    assert divergence["resynced"] is False
+
+
+def test_resync_search_stops_at_the_window(monkeypatch):
+    monkeypatch.setattr(logdiff, 'RESYNC_WINDOW', 5)
+    middle = lines("middle", 5)
+    base = ["start"] + lines("base", 10) + middle
+    target = ["start"] + lines("target", 10) + middle + ["end"]
+    divergence = diff(base, target)["first_divergence"]
+    assert divergence["base"] == [1, 6] and divergence["target"] == [1, 6]
+    assert divergence["resynced"] is False
+
+
+def test_repeated_lines_are_matched_one_for_one():
+    base = ["[Pipeline] }"] * 3 + ["done"]
+    target = ["[Pipeline] }"] * 5 + ["done"]
+    result = diff(base, target)
+    assert result["added_count"] == 2 and result["removed_count"] == 0
+
+
+def test_prefix_and_suffix_dont_overlap():
+    base = ["same"] * 2
+    target = ["same"] * 3
+    result = diff(base, target)
+    assert (result["common_prefix"], result["common_suffix"]) == (2, 0)
+    assert result["first_divergence"]["target"] == [2, 3]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_prefix_and_suffix_across_compare_chunks(monkeypatch, seed):
+    monkeypatch.setattr(logdiff, 'COMPARE_CHUNK', 4)
+    generator = random.Random(seed)
+    shared_head = [generator.randrange(3) for _ in range(generator.randrange(30))]
+    shared_tail = [generator.randrange(3) for _ in range(generator.randrange(30))]
+    a = array('Q', shared_head + [generator.randrange(3) for _ in range(generator.randrange(10))] + shared_tail)
+    b = array('Q', shared_head + [generator.randrange(3) for _ in range(generator.randrange(10))] + shared_tail)
+    prefix = common_prefix(a, b)
+    assert prefix == naive_prefix(a, b)
+    assert common_suffix(a, b, prefix) == naive_suffix(a, b, prefix)
+
+
+def test_error_signatures_new_disappeared_and_changed():
+    base = ["ERROR: timeout after 30s", "ERROR: timeout after 31s", "ERROR: disk full on /dev/sda1", "ok"]
+    target = ["ERROR: timeout after 30s", "ERROR: connection refused", "ok", "ok"]
+    signatures = diff(base, target, base_errors=[0, 1, 2], target_errors=[0, 1])["error_signatures"]
+    assert [entry["example"] for entry in signatures["new"]] == ["ERROR: connection refused"]
+    assert [entry["example"] for entry in signatures["disappeared"]] == ["ERROR: disk full on /dev/sda1"]
+    assert [(entry["signature"], entry["base_count"], entry["count"]) for entry in signatures["changed"]] == [
+        ("ERROR: timeout after #", 2, 1)
+    ]
+    assert signatures["new"][0]["error_type"] == "Generic Error"
+
+
+def test_max_lines_limits_each_list():
+    base = lines("head", 2)
+    target = base + lines("new", 50)
+    result = diff(base, target, max_lines=7)
+    assert result["added_count"] == 50
+    assert len(result["added_lines"]) == 7
+    assert len(result["first_divergence"]["target_lines"]) == 7
+
+
+def test_line_hashes_are_stable_and_chunked(monkeypatch):
+    log = lines("log", 25) + ["café \udcff"]
+    expected = line_hashes(log)
+    monkeypatch.setattr(logdiff, 'HASH_CHUNK_LINES', 4)
+    assert line_hashes(iter(log)) == expected
+    assert line_hashes(["Build 41"]) == line_hashes(["Build 42"])
@@ -0,0 +1,146 @@
+"""
+Tests for rules.py: the literal prefilter must never change which rule types a line
+"""
+
+import re
+import json
+import random
+
+import pytest
+
+from rules import ERROR_PATTERNS, Rule, RuleEngine, classify, load_rules, required_literals
+
+
+def first_match(line, patterns=ERROR_PATTERNS):
+    """The first-match loop over ERROR_PATTERNS that RuleEngine replaced"""
+    for pattern, error_type in patterns.items():
+        if re.search(pattern, line):
+            return error_type
+    return None
+
+
+# One line per built-in rule, then lines built to trip the prefilter: a rule's literal
+# appears but its pattern doesn't match, or literals of several rules overlap
+LINES = [
+    "Exception in thread main java.lang.NullPointerException",
+    "java.io.FileNotFoundException: /tmp/missing",
+    "java.net.ConnectException: Connection refused",
+    "org.springframework.BeanCreationException: boom",
+    "org.hibernate.LazyInitializationException: no session",
+    "javax.NamingException: not bound",
+    "com.amazonaws.SdkClientException: Unable to load credentials",
+    "Traceback (most recent call last):",
+    "ModuleNotFoundError: No module named 'yaml'",
+    "ImportError: cannot import name 'x'",
+    "  File \"x.py\", line 1\nSyntaxError: invalid syntax",
+    "KeyError: 'missing'",
+    "IndexError: list index out of range",
+    "npm ERR! code ELIFECYCLE",
+    "yarn error Command failed.",
+    "error: script 'build' failed with exit code 2",
+    "Execution failed for task ':app:compileJava'.",
+    "[ERROR] Failed to execute goal org.apache.maven.plugins:maven-compiler-plugin",
+    "FATAL: the build was aborted",
+    "ERROR: something broke",
+    "WARNING: deprecated option",
+    "docker: Error response from daemon: conflict.",
+    "kubectl apply failed with error: forbidden",
+    "SQLSTATE[23000]: Integrity constraint violation",
+    "ORA-00942: table or view does not exist",
+    "Error 1045 (28000): Access denied",
+    "error MSB3073: The command exited with code 1",
+    "Program.cs(3,1): error CS1002: ; expected",
+    "src/app.ts(1,7): error TS2322: Type 'string' is not assignable",
+    # Literal present, pattern doesn't match: must fall through to later rules
+    "java.lang.Exception thrown without a subclass name",
+    "java.lang.Exception then ERROR: later on the line",
+    "java.net. ERROR: dangling package",
+    "org.springframework. WARNING: half a class name",
+    "SQLSTATE[abc] FATAL: not a number",
+    "ORA- without digits",
+    "Error (1) without a code",
+    "error: the step failed with exit status 1",
+    "kubectl get pods",
+    "error MSB without digits, error TS1 follows",
+    "Traceback (most recent call last) without the colon still matches",
+    # Several rules' literals in one line, in either order
+    "WARNING: retrying after ERROR: timeout",
+    "ERROR: npm ERR! missing script",
+    "ValueError raised; java.lang.IllegalStateException",
+    "com.amazonaws.AmazonS3Exception and java.io.IOException",
+    "javax.servlet.ServletException",
+    "ExceptionException",
+    # Nothing to find
+    "",
+    "all good",
+    "error: lowercase is not ERROR",
+    "warning: lowercase",
+    "Exception",
+]
+
+
+@pytest.mark.parametrize("line", LINES)
+def test_classify_matches_first_match_loop(line):
+    engine = RuleEngine(load_rules())
+    assert engine.classify(line) == first_match(line)
+
+
+def test_classify_matches_first_match_loop_on_mixed_lines():
+    # Lines stitched together from pieces of the sample lines and rule literals, so
+    # literals land next to, inside and across each other
+    engine = RuleEngine(load_rules())
+    pieces = [word for line in LINES for word in line.split()] + [
+        literal for pattern in ERROR_PATTERNS for literal in (required_literals(pattern) or [])
+    ]
+    generator = random.Random(41)
+    for _ in range(5000):
+        line = (" " if generator.random() < 0.5 else "").join(
+            generator.choice(pieces) for _ in range(generator.randint(1, 6))
+        )
+        assert engine.classify(line) == first_match(line), line
+
+
+def test_module_classify_uses_builtin_rules(monkeypatch):
+    import rules
+    monkeypatch.delenv("ERROR_RULES_FILE", raising=False)
+    monkeypatch.setattr(rules, "_engine", None)
+    for line in LINES:
+        assert classify(line) == first_match(line)
+
+
+def test_prefilter_skips_rules_without_their_literal():
+    engine = RuleEngine(load_rules())
+    assert engine.candidates("all good") == 0
+    # Only the rules whose literal appears are candidates
+    candidates = engine.candidates("npm ERR! code 1")
+    types = [engine.rules[i].error_type for i in range(len(engine.rules)) if candidates >> i & 1]
+    assert types == ["NPM Error"]
+
+
+def test_required_literals():
+    assert required_literals(r"java\.net\.[A-Za-z]+Exception") == ["java.net."]
+    assert required_literals(r"TypeError|ValueError") == ["TypeError", "ValueError"]
+    # A branch without a literal, a case-insensitive pattern or a pattern that is all
+    # wildcards can't be prefiltered
+    assert required_literals(r"TypeError|\d+") is None
+    assert required_literals(r"(?i)error") is None
+    assert required_literals(r".*") is None
+
+
+def test_rules_without_literals_are_always_tried():
+    patterns = {r"\d{3} failures": "Failure Count", r"ERROR:": "Generic Error"}
+    engine = RuleEngine([Rule(pattern, error_type) for pattern, error_type in patterns.items()])
+    for line in ["412 failures", "ERROR: 412 failures", "ERROR: none", "12 failures"]:
+        assert engine.classify(line) == first_match(line, patterns)
+
+
+def test_custom_rules_come_first(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([
+        {"pattern": "connection reset", "type": "Network Flake", "ignore_case": True},
+        {"pattern": "ERROR: disk", "type": "Disk Error"},
+    ]))
+    engine = RuleEngine(load_rules(str(path)))
+    assert engine.classify("ERROR: Connection RESET by peer") == "Network Flake"
+    assert engine.classify("ERROR: disk full") == "Disk Error"
+    assert engine.classify("ERROR: other") == "Generic Error"
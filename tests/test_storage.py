@@ -0,0 +1,182 @@
+"""
+Tests for storage.py against a temporary SQLite database: keyset pagination of the
+history and the summary tables kept up to date as logs are saved and re-saved
+"""
+
+import os
+
+import pytest
+
+import database
+from storage import SQLiteStorage
+
+SCHEMA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql')
+
+
+@pytest.fixture
+def storage(tmp_path):
+    path = str(tmp_path / 'logs.db')
+    storage = SQLiteStorage(path, SCHEMA)
+    storage.init_schema()
+    yield storage
+    database.close_connection(path)
+
+
+def save(storage, log_id, upload_time, source_type='file'):
+    """Save a log uploaded at upload_time (summaries aren't moved along with it)"""
+    storage.save_log_analysis(log_id, 'build.log', source_type, 0, 0, {"line_count": 10})
+    db = storage.connection()
+    with db:
+        db.execute('UPDATE log_files SET upload_time = ? WHERE log_id = ?', (upload_time, log_id))
+
+
+def walk(storage, limit, **filters):
+    """Every page of the history, following each page's last position"""
+    pages, before = [], None
+    while True:
+        page = storage.get_history(limit=limit, before=before, **filters)
+        if not page:
+            return pages
+        pages.append([record["log_id"] for record in page])
+        before = page[-1]["position"]
+
+
+@pytest.fixture
+def history(storage):
+    # Several logs share an upload time, so pages have to break ties by log_id
+    times = ['2024-03-01 10:00:00', '2024-03-01 10:00:00', '2024-03-01 10:00:00',
+             '2024-03-02 08:30:00', '2024-03-02 08:30:00', '2024-03-03 12:00:00', '2024-03-04 09:15:00']
+    for index, upload_time in enumerate(times):
+        save(storage, f"log-{index:02d}", upload_time, source_type='url' if index % 2 else 'file')
+    return storage
+
+
+def test_history_is_newest_first_with_ties_by_log_id(history):
+    assert [record["log_id"] for record in history.get_history(limit=100)] == [
+        "log-06", "log-05", "log-04", "log-03", "log-02", "log-01", "log-00"
+    ]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 7, 10])
+def test_keyset_pages_cover_every_log_once(history, limit):
+    everything = [record["log_id"] for record in history.get_history(limit=100)]
+    pages = walk(history, limit)
+    assert [log_id for page in pages for log_id in page] == everything
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_keyset_pages_with_filters(history):
+    urls = [record["log_id"] for record in history.get_history(limit=100, source_type='url')]
+    assert urls == ["log-05", "log-03", "log-01"]
+    assert [log_id for page in walk(history, 2, source_type='url') for log_id in page] == urls
+    assert walk(history, 2, since='2024-03-02', until='2024-03-03') == [["log-04", "log-03"]]
+
+
+def test_position_round_trips_through_the_app_cursor(history):
+    app = pytest.importorskip('app')
+    for record in history.get_history(limit=100):
+        cursor = app.encode_history_cursor(record["position"])
+        assert app.decode_history_cursor(cursor) == tuple(record["position"])
+        assert history.get_history(limit=100, before=app.decode_history_cursor(cursor)) == \
+            history.get_history(limit=100, before=record["position"])
+    for cursor in ["not base64!", "bm90IGpzb24=", app.encode_history_cursor([1, 2])]:
+        with pytest.raises(ValueError):
+            app.decode_history_cursor(cursor)
+
+
+def test_history_endpoint_follows_next_cursor(history, monkeypatch):
+    app = pytest.importorskip('app')
+    monkeypatch.setattr(app, '_storage', history)
+    client = app.app.test_client()
+
+    seen, cursor = [], None
+    while True:
+        response = client.get('/history', query_string={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        assert response.status_code == 200
+        seen.extend(entry["id"] for entry in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+    assert seen == [record["log_id"] for record in history.get_history(limit=100)]
+    assert client.get('/history', query_string={"cursor": "garbage"}).status_code == 400
+
+
+def summary_by_job(storage):
+    """The summary with jobs in name order, as logs saved in the same second tie"""
+    summary = storage.get_history_summary()
+    summary["jobs"] = sorted(
+        ({key: value for key, value in job.items() if key != "last_upload_time"} for job in summary["jobs"]),
+        key=lambda job: job["job"]
+    )
+    return summary
+
+
+def upload_day(storage, log_id):
+    return storage.get_log(log_id)["upload_time"][:10]
+
+
+def test_summaries_are_added_on_save(storage):
+    storage.save_log_analysis('a', 'deploy-41.log', 'file', 2, 1, {"error_types": {"Generic Error": 2}})
+    storage.save_log_analysis('b', 'deploy-42.log', 'url', 1, 0, {"error_types": {"SQL Error": 1}})
+    storage.save_log_analysis('c', 'test-7.log', 'file', 0, 3, {"error_types": {}})
+    days = {}
+    for log_id, errors, warnings in (('a', 2, 1), ('b', 1, 0), ('c', 0, 3)):
+        totals = days.setdefault(upload_day(storage, log_id), {"logs": 0, "errors": 0, "warnings": 0})
+        totals["logs"] += 1
+        totals["errors"] += errors
+        totals["warnings"] += warnings
+
+    assert summary_by_job(storage) == {
+        "days": [dict(day=day, **totals) for day, totals in sorted(days.items())],
+        "error_types": [{"error_type": "Generic Error", "count": 2}, {"error_type": "SQL Error", "count": 1}],
+        "jobs": [
+            {"job": "deploy.log", "logs": 2, "errors": 3, "warnings": 1},
+            {"job": "test.log", "logs": 1, "errors": 0, "warnings": 3},
+        ],
+    }
+
+
+def test_resaving_a_log_upserts_its_difference(storage):
+    storage.save_log_analysis('live', 'nightly-5.log', 'live', 1, 0, {"error_types": {"Generic Error": 1}})
+    storage.save_log_analysis('other', 'nightly-6.log', 'file', 4, 0, {"error_types": {"Generic Error": 4}})
+
+    # A live log is saved again as it grows: its counts are replaced, not added
+    storage.update_log_analysis('live', 3, 2, {"error_types": {"Generic Error": 1, "Java Exception": 2}})
+    storage.update_log_analysis('live', 5, 2, {"error_types": {"Java Exception": 5}})
+
+    summary = summary_by_job(storage)
+    assert sum(day["logs"] for day in summary["days"]) == 2
+    assert sum(day["errors"] for day in summary["days"]) == 9
+    assert sum(day["warnings"] for day in summary["days"]) == 2
+    assert summary["jobs"] == [{"job": "nightly.log", "logs": 2, "errors": 9, "warnings": 2}]
+    assert summary["error_types"] == [
+        {"error_type": "Java Exception", "count": 5}, {"error_type": "Generic Error", "count": 4}
+    ]
+    assert storage.get_log('live')["error_count"] == 5
+
+    # The upserted totals are what recounting the stored logs gives
+    assert storage.rebuild_history_summary() == 2
+    assert summary_by_job(storage) == summary
+
+
+def test_resaving_an_unknown_log_changes_nothing(storage):
+    storage.save_log_analysis('a', 'build.log', 'file', 1, 0, {"error_types": {}})
+    before = storage.get_history_summary()
+    storage.update_log_analysis('missing', 9, 9, {"error_types": {"Generic Error": 9}})
+    assert storage.get_history_summary() == before
+
+
+def test_batch_save_adds_summaries(storage):
+    records = [
+        {"file_id": f"bulk-{index}", "file_name": f"ci-{index}.log", "source_type": "bulk",
+         "error_count": index, "warning_count": 1, "content": {"error_types": {"NPM Error": index}},
+         "error_rows": [(line, "Error") for line in range(index)]}
+        for index in range(1, 4)
+    ]
+    storage.save_analyses(records)
+    summary = storage.get_history_summary()
+    assert sum(day["logs"] for day in summary["days"]) == 3
+    assert sum(day["errors"] for day in summary["days"]) == 6
+    assert summary["error_types"] == [{"error_type": "NPM Error", "count": 6}]
+    assert summary["jobs"][0]["job"] == "ci.log"
+    assert storage.get_log("bulk-3")["errors"] == [(0, "Error"), (1, "Error"), (2, "Error")]
@@ -0,0 +1,175 @@
+"""
+Tests for traces.py: exception blocks of each language, Caused by chains and traces
+that run to the end of the log
+"""
+
+from analyzer import LogAnalyzer
+from traces import TraceDetector, find_block
+
+JAVA = '''Build step failed
+Exception in thread "main" java.lang.IllegalStateException: Failed to start
+\tat com.example.App.start(App.java:42)
+\tat com.example.App.main(App.java:10)
+Caused by: java.io.IOException: Disk quota exceeded
+\tat java.io.FileOutputStream.write(FileOutputStream.java:326)
+\tat com.example.Store.save(Store.java:88)
+\t... 2 more
+Caused by: java.net.SocketTimeoutException: Read timed out
+\tat java.net.SocketInputStream.read(SocketInputStream.java:150)
+\t... 5 more
+Finished: FAILURE'''
+
+PYTHON = '''Running tests
+Traceback (most recent call last):
+  File "run.py", line 10, in <module>
+    main()
+  File "run.py", line 6, in main
+    load()
+  File "/app/loader.py", line 3, in load
+    import yaml
+ModuleNotFoundError: No module named 'yaml'
+done'''
+
+NODE = '''npm run build
+TypeError: Cannot read properties of undefined (reading 'map')
+    at render (/app/src/list.js:12:15)
+    at Object.<anonymous> (/app/src/index.js:5:1)
+    at Module._compile (node:internal/modules/cjs/loader:1105:14)
+npm ERR! code 1'''
+
+GO = '''go test ./...
+panic: runtime error: index out of range [3] with length 3
+
+goroutine 1 [running]:
+main.lookup(...)
+\t/app/main.go:12
+main.main()
+\t/app/main.go:7 +0x1d
+exit status 2'''
+
+
+def detect(text):
+    detector = TraceDetector()
+    blocks = []
+    for number, line in enumerate(text.split('\n')):
+        block = detector.feed(number, line)
+        if block:
+            blocks.append(block)
+    block = detector.close()
+    if block:
+        blocks.append(block)
+    return blocks
+
+
+def without_last_line(text):
+    return text.rsplit('\n', 1)[0]
+
+
+def test_java_trace_follows_caused_by_chain():
+    assert detect(JAVA) == [{
+        "start": 1,
+        "end": 10,
+        "language": "java",
+        "exception": "java.lang.IllegalStateException",
+        "root_cause": "java.net.SocketTimeoutException",
+        "root_frame": "java.net.SocketInputStream.read(SocketInputStream.java:150)",
+        "root_frame_line": 9,
+    }]
+
+
+def test_java_trace_without_cause_uses_first_frame():
+    [block] = detect('\n'.join(JAVA.split('\n')[:4] + ["Finished: FAILURE"]))
+    assert (block["start"], block["end"]) == (1, 3)
+    assert block["root_cause"] == block["exception"] == "java.lang.IllegalStateException"
+    assert block["root_frame"] == "com.example.App.start(App.java:42)"
+
+
+def test_python_traceback():
+    assert detect(PYTHON) == [{
+        "start": 1,
+        "end": 8,
+        "language": "python",
+        "exception": "ModuleNotFoundError",
+        "root_cause": "ModuleNotFoundError",
+        "root_frame": 'File "/app/loader.py", line 3, in load',
+        "root_frame_line": 6,
+    }]
+
+
+def test_node_trace():
+    assert detect(NODE) == [{
+        "start": 1,
+        "end": 4,
+        "language": "node",
+        "exception": "TypeError",
+        "root_cause": "TypeError",
+        "root_frame": "render (/app/src/list.js:12:15)",
+        "root_frame_line": 2,
+    }]
+
+
+def test_go_panic_skips_runtime_frames():
+    assert detect(GO) == [{
+        "start": 1,
+        "end": 7,
+        "language": "go",
+        "exception": "runtime error",
+        "root_cause": "runtime error",
+        "root_frame": "main.lookup",
+        "root_frame_line": 4,
+    }]
+
+
+def test_traces_at_end_of_log_are_closed():
+    for text, end in ((JAVA, 10), (PYTHON, 8), (NODE, 4), (GO, 7)):
+        [block] = detect(without_last_line(text))
+        assert block["end"] == end
+    # Nothing follows the last Caused by frame but the end of the log
+    [block] = detect('\n'.join(JAVA.split('\n')[:10]))
+    assert (block["end"], block["root_cause"]) == (9, "java.net.SocketTimeoutException")
+
+
+def test_consecutive_traces_are_separate_blocks():
+    blocks = detect('\n'.join([without_last_line(NODE), without_last_line(PYTHON), GO]))
+    assert [(block["language"], block["start"], block["end"]) for block in blocks] == [
+        ("node", 1, 4), ("python", 6, 13), ("go", 15, 21)
+    ]
+
+
+def test_timestamped_lines():
+    text = '\n'.join([
+        "2024-01-15T10:00:00Z ERROR: upload failed",
+        "2024-01-15T10:00:00Z java.lang.RuntimeException: boom",
+        "2024-01-15T10:00:00Z \tat com.example.Upload.run(Upload.java:5)",
+        "2024-01-15T10:00:00Z \tat java.lang.Thread.run(Thread.java:750)",
+    ])
+    [block] = detect(text)
+    assert (block["start"], block["end"], block["exception"]) == (1, 3, "java.lang.RuntimeException")
+
+
+def test_lines_that_only_look_like_traces():
+    assert detect("prose\n  at the end of the day we stopped") == []
+    assert detect("panic: no frames follow\nnext line") == []
+    assert detect("Traceback (most recent call last):\nnot a frame") == []
+
+
+def test_analyzer_finds_the_same_traces_fed_in_pieces():
+    text = '\n'.join([JAVA, PYTHON, NODE, GO])
+    lines = text.split('\n')
+    whole = LogAnalyzer('whole')
+    whole.feed(lines, final=True)
+    pieces = LogAnalyzer('pieces')
+    for start in range(0, len(lines), 3):
+        pieces.feed(lines[start:start + 3])
+    pieces.feed([], final=True)
+    assert pieces.stack_traces == whole.stack_traces
+    assert [block["language"] for block in whole.stack_traces] == ["java", "python", "node", "go"]
+
+
+def test_find_block_with_lookahead():
+    blocks = detect('\n'.join([without_last_line(NODE), without_last_line(PYTHON)]))
+    starts = [block["start"] for block in blocks]
+    assert find_block(blocks, starts, 3)["language"] == "node"
+    assert find_block(blocks, starts, 5) is None
+    assert find_block(blocks, starts, 5, lookahead=1)["language"] == "python"
+    assert find_block(blocks, starts, 0) is None
@@ -0,0 +1,120 @@
+"""
+Build timeline for WolfsLogDebugger
+Parses log timestamps into seconds without strptime and keeps lines, errors and warnings
+per time bucket in bounded memory, for a timeline of builds of any length
+"""
+
+import datetime
+from array import array
+from typing import Any, Dict, Optional
+
+# Buckets kept while analyzing; when a log outgrows them the bucket width doubles
+MAX_BUCKETS = 4096
+# Buckets in a summary, at most
+SUMMARY_BUCKETS = 240
+# Minutes whose start is cached by the parser before the cache is cleared
+MAX_CACHED_MINUTES = 4096
+
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+class TimestampParser:
+    """
+    Seconds since the epoch of 'YYYY-MM-DD HH:MM:SS' (or 'T'-separated) timestamps, as
+    matched by formats.TIMESTAMP_PATTERN and read as UTC. The start of each minute is
+    computed once and cached, so a timestamp usually costs a dict lookup and one int().
+    """
+
+    def __init__(self):
+        self._minutes: Dict[str, int] = {}
+
+    def __call__(self, timestamp: str) -> Optional[int]:
+        """Seconds of timestamp, or None if it isn't a valid date and time"""
+        minute = timestamp[:16]
+        start = self._minutes.get(minute)
+        if start is None:
+            try:
+                day = datetime.date(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]))
+            except ValueError:
+                return None
+            hours, minutes = int(timestamp[11:13]), int(timestamp[14:16])
+            if hours > 23 or minutes > 59:
+                return None
+            start = (day.toordinal() - _EPOCH_ORDINAL) * 86400 + hours * 3600 + minutes * 60
+            if len(self._minutes) >= MAX_CACHED_MINUTES:
+                self._minutes.clear()
+            self._minutes[minute] = start
+        return start + int(timestamp[17:19])
+
+
+class Timeline:
+    """
+    Lines, errors and warnings per time bucket, counted as a log is analyzed. Buckets
+    start at the log's first timestamp; times before it count towards the first bucket.
+    At most MAX_BUCKETS are kept: when a later time doesn't fit, neighbouring buckets
+    are merged and the width doubles, so a long build costs as little memory as a
+    short one.
+    """
+
+    def __init__(self):
+        self.origin: Optional[int] = None
+        self.width = 1
+        self.lines = array('q')
+        self.errors = array('q')
+        self.warnings = array('q')
+
+    def _bucket(self, seconds: int) -> int:
+        if self.origin is None:
+            self.origin = seconds
+        index = max(0, seconds - self.origin) // self.width
+        while index >= MAX_BUCKETS:
+            self._coarsen()
+            index //= 2
+        if index >= len(self.lines):
+            grow = index + 1 - len(self.lines)
+            for counts in (self.lines, self.errors, self.warnings):
+                counts.extend(array('q', bytes(8 * grow)))
+        return index
+
+    def _coarsen(self):
+        self.width *= 2
+        for name in ('lines', 'errors', 'warnings'):
+            counts = getattr(self, name)
+            merged = array('q', (sum(counts[i:i + 2]) for i in range(0, len(counts), 2)))
+            setattr(self, name, merged)
+
+    def add(self, seconds: int, lines: int = 0, errors: int = 0, warnings: int = 0) -> None:
+        index = self._bucket(seconds)
+        self.lines[index] += lines
+        self.errors[index] += errors
+        self.warnings[index] += warnings
+
+    def summary(self, stage_times: Optional[Dict[str, list]] = None,
+                buckets: int = SUMMARY_BUCKETS) -> Optional[Dict[str, Any]]:
+        """
+        At most buckets buckets of lines, errors and warnings, as lists, and the offset
+        and duration in seconds of each stage with timestamps (stage_times maps stage
+        names to their first and last time); None if the log had no timestamps
+        """
+        if self.origin is None:
+            return None
+        factor = -(-len(self.lines) // buckets) if len(self.lines) > buckets else 1
+
+        def merged(counts):
+            if factor == 1:
+                return counts.tolist()
+            return [sum(counts[i:i + factor]) for i in range(0, len(counts), factor)]
+
+        stage_times = stage_times or {}
+        return {
+            "start": datetime.datetime.fromtimestamp(self.origin, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            "bucket_seconds": self.width * factor,
+            "lines": merged(self.lines),
+            "errors": merged(self.errors),
+            "warnings": merged(self.warnings),
+            "stages": {
+                "names": list(stage_times),
+                "offsets": [first - self.origin for first, _ in stage_times.values()],
+                "durations": [last - first for first, last in stage_times.values()],
+            },
+        }
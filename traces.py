@@ -0,0 +1,182 @@
+"""
+Stack trace detection for WolfsLogDebugger
+Finds complete multi-line exception blocks (Java, Python, Node.js, Go panics) while lines
+are analyzed, recording each as a line range with its exception type and root-cause frame
+"""
+
+import re
+import bisect
+from typing import Any, Dict, List, Optional
+
+# Optional timestamp a CI server puts in front of every line (e.g. Jenkins' timestamper)
+PREFIX = r'(?:\[?\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?Z?\]?\s)?'
+
+# Any line that can start a block; checked first so ordinary lines cost one match
+BLOCK_START = re.compile(PREFIX + r'(?:\s+at\s|Traceback \(most recent call last\):|panic: )')
+
+FRAME_AT = re.compile(PREFIX + r'\s+at\s+(\S.*?)\s*$')  # Java and Node.js frames
+JAVA_FRAME = re.compile(r'[\w$./<>-]+\([^()]*\)$')
+NODE_FRAME = re.compile(r'.*(?::\d+:\d+\)?|\((?:native|<anonymous>)\))$')
+CAUSED_BY = re.compile(PREFIX + r'\s*Caused by:\s*([\w$.]+)')
+JAVA_CONTINUATION = re.compile(PREFIX + r'\s+(?:Suppressed: |\.\.\. \d+ (?:more|common frames omitted))')
+EXCEPTION_NAME = re.compile(r'(?:[\w$]+\.)*[\w$]*(?:Exception|Error|Throwable)\b')
+
+PYTHON_START = re.compile(PREFIX + r'Traceback \(most recent call last\):')
+PYTHON_FRAME = re.compile(PREFIX + r'\s+(File "[^"]+", line \d+.*)$')
+PYTHON_INDENTED = re.compile(PREFIX + r'\s+\S')
+PYTHON_EXCEPTION = re.compile(PREFIX + r'((?:\w+\.)*\w+)(?::|$)')
+
+GO_PANIC = re.compile(PREFIX + r'panic: (runtime error)?')
+GO_FUNCTION = re.compile(PREFIX + r'(\S+)\(.*\)(?: \+0x[0-9a-f]+)?$')
+GO_BLOCK_LINE = re.compile(PREFIX + r'(?:goroutine \d+ \[[^\]]+\]:|\t\S+:\d+|created by |panic: |\[recovered\]|\s*$)')
+
+
+class TraceDetector:
+    """
+    Incremental detection of exception blocks. feed() takes each line with its line
+    number, in order, and returns the block that line completed, if any; close() ends
+    a block still open at the end of the log. State carries over between calls, so a
+    log can be fed in chunks (as tails are).
+
+    Blocks are dicts with the inclusive line range (start, end), the language, the
+    exception that was raised, its root cause (the last "Caused by:" of a Java trace)
+    and the frame where the root cause was thrown.
+    """
+
+    def __init__(self):
+        self._block: Optional[Dict[str, Any]] = None
+        self._frames = 0
+        self._awaiting_root_frame = False
+        self._complete = False
+        self._previous: Optional[str] = None
+        self._previous_number = -1
+
+    def feed(self, number: int, line: str) -> Optional[Dict[str, Any]]:
+        finished = None
+        consumed = False
+        if self._block is not None:
+            consumed = self._continue(number, line)
+            if not consumed or self._complete:
+                finished = self._finish()
+        if not consumed and BLOCK_START.match(line):
+            self._start(number, line)
+        self._previous, self._previous_number = line, number
+        return finished
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        """Finish the open block, if any"""
+        return self._finish() if self._block is not None else None
+
+    def _start(self, number, line):
+        if PYTHON_START.match(line):
+            self._open('python', number)
+            return
+        panic = GO_PANIC.match(line)
+        if panic:
+            self._open('go', number, exception=panic.group(1) or 'panic')
+            return
+
+        frame = FRAME_AT.match(line).group(1)
+        if JAVA_FRAME.match(frame):
+            language = 'java'
+        elif NODE_FRAME.match(frame):
+            language = 'node'
+        else:
+            return  # indented prose that happens to start with "at"
+
+        # The message line right before the first frame names the exception
+        header = None
+        if self._previous is not None and self._previous_number == number - 1:
+            header = max(EXCEPTION_NAME.findall(self._previous), key=len, default=None)
+        if header:
+            self._open(language, number - 1, exception=header)
+        else:
+            self._open(language, number)
+        self._frame(number, frame)
+
+    def _open(self, language, number, exception='Unknown'):
+        self._block = {
+            "start": number,
+            "end": number,
+            "language": language,
+            "exception": exception,
+            "root_cause": exception,
+            "root_frame": None,
+            "root_frame_line": None,
+        }
+        self._frames = 0
+        self._awaiting_root_frame = True
+        self._complete = False
+
+    def _frame(self, number, frame):
+        self._frames += 1
+        if self._awaiting_root_frame:
+            self._block["root_frame"] = frame
+            self._block["root_frame_line"] = number
+            self._awaiting_root_frame = False
+
+    def _continue(self, number, line) -> bool:
+        """Extend the open block with line, returning False if line isn't part of it"""
+        block = self._block
+        language = block["language"]
+
+        if language == 'python':
+            frame = PYTHON_FRAME.match(line)
+            if frame:
+                # Innermost frame last: the latest one is where the exception was raised
+                self._frames += 1
+                block["root_frame"] = frame.group(1)
+                block["root_frame_line"] = number
+            elif not PYTHON_INDENTED.match(line):
+                # The first unindented line is the exception and ends the traceback
+                exception = PYTHON_EXCEPTION.match(line)
+                if not (exception and self._frames):
+                    return False
+                block["exception"] = block["root_cause"] = exception.group(1)
+                self._complete = True
+
+        elif language == 'go':
+            function = GO_FUNCTION.match(line)
+            if function:
+                self._frames += 1
+                name = function.group(1)
+                if self._awaiting_root_frame and name != 'panic' and not name.startswith('runtime.'):
+                    block["root_frame"] = name
+                    block["root_frame_line"] = number
+                    self._awaiting_root_frame = False
+            elif not GO_BLOCK_LINE.match(line) or (self._frames and not line.strip()):
+                return False
+
+        else:
+            frame = FRAME_AT.match(line)
+            cause = None if frame else CAUSED_BY.match(line)
+            if frame:
+                self._frame(number, frame.group(1))
+            elif cause:
+                block["root_cause"] = cause.group(1)
+                self._awaiting_root_frame = True
+            elif not JAVA_CONTINUATION.match(line):
+                return False
+
+        block["end"] = number
+        return True
+
+    def _finish(self) -> Optional[Dict[str, Any]]:
+        block, self._block = self._block, None
+        # A block without a single frame (a stray "panic:" line, say) isn't a trace
+        return block if self._frames else None
+
+
+def find_block(blocks: List[Dict[str, Any]], starts: List[int], line: int,
+               lookahead: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    The block containing a line in [line, line + lookahead], given blocks sorted by
+    start and their start lines, e.g. the trace an error message introduces a few
+    lines before it starts
+    """
+    index = bisect.bisect_right(starts, line) - 1
+    if index >= 0 and blocks[index]["end"] >= line:
+        return blocks[index]
+    if index + 1 < len(blocks) and starts[index + 1] <= line + lookahead:
+        return blocks[index + 1]
+    return None